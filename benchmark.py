@@ -0,0 +1,367 @@
+"""
+Synthetic instances and benchmarks for the exam timetable genetic algorithm.
+
+Generates problems of any size, times each constraint, each phase of a generation and full runs
+across a grid of sizes, and writes the timings as JSON so results can be compared between commits.
+
+    python benchmark.py --output results.json
+    python benchmark.py --output new.json --compare results.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from array import array
+
+import exam_timetable as et
+
+
+# Sizes benchmarked by default - units, students, tutors, rooms, days.
+SIZE_GRID = [
+    {"num_units": 30, "num_students": 300, "num_tutors": 30, "num_rooms": 10, "num_days": 5},
+    {"num_units": 100, "num_students": 2000, "num_tutors": 60, "num_rooms": 20, "num_days": 10},
+    {"num_units": 300, "num_students": 10000, "num_tutors": 150, "num_rooms": 40, "num_days": 15},
+]
+QUICK_GRID = SIZE_GRID[:1]
+EVALUATIONS = ["scalar", "delta", "batch"]
+RESULTS_VERSION = 1
+
+
+class Instance:
+    """
+    A class used to represent a synthetic problem - units, tutors, students, classrooms and exam days.
+    """
+    __slots__ = ("units", "tutors", "students", "classrooms", "exam_days", "parameters")
+
+    def __init__(self, units, tutors, students, classrooms, exam_days, parameters):
+        self.units = units
+        self.tutors = tutors
+        self.students = students
+        self.classrooms = classrooms
+        self.exam_days = exam_days
+        self.parameters = parameters
+
+    def __repr__(self):
+        output = f"Units: {len(self.units)}, Students: {len(self.students)}, Tutors: {len(self.tutors)}, Rooms: {len(self.classrooms)}, Days: {len(self.exam_days)}"
+        return output
+
+
+def generate_instance(num_units=30, num_students=300, num_tutors=30, num_rooms=10, num_days=5, units_per_student=(1, 4), seed=None):
+    """
+    Generate a random problem.
+    Each student is enrolled in between units_per_student[0] and units_per_student[1] distinct units,
+    so units_per_student sets the enrollment density.
+    num_units should be even, as each exam room holds a morning and an afternoon unit.
+    :return: Instance object.
+    """
+    rng = random.Random(seed)
+    min_units, max_units = units_per_student
+    if not 1 <= min_units <= max_units <= num_units:
+        raise ValueError(f"units_per_student must be within 1 and {num_units}: {units_per_student}")
+
+    units = [(f"U{i:04d}", f"Unit {i}") for i in range(num_units)]
+    tutors = [f"Tutor{i + 1}" for i in range(num_tutors)]
+    classrooms = [f"R{i + 1:03d}" for i in range(num_rooms)]
+    exam_days = [f"Day{i + 1}" for i in range(num_days)]
+
+    # Students are stored the same way as load_students, unit ids indexing into the unit codes.
+    codes = [code for code, _ in units]
+    offsets = array("q", [0])
+    unit_ids = array("i")
+    for _ in range(num_students):
+        unit_ids.extend(sorted(rng.sample(range(num_units), rng.randint(min_units, max_units))))
+        offsets.append(len(unit_ids))
+    students = et.StudentTable([str(i) for i in range(num_students)], [f"Student{i + 1}" for i in range(num_students)], codes, offsets, unit_ids)
+
+    parameters = {"num_units": num_units, "num_students": num_students, "num_tutors": num_tutors, "num_rooms": num_rooms,
+        "num_days": num_days, "units_per_student": list(units_per_student), "seed": seed}
+
+    return Instance(units, tutors, students, classrooms, exam_days, parameters)
+
+
+def write_instance(instance, directory):
+    """
+    Save an instance as CSV files in the same layout as the sample data, so load_data can read it.
+    :return: The units, tutors, and students + units file paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    units_path = os.path.join(directory, "units.csv")
+    tutors_path = os.path.join(directory, "tutors.csv")
+    students_path = os.path.join(directory, "student_units.csv")
+
+    with open(units_path, "w", newline="") as csvfile:
+        csvfile.write("Unitcode,Name\r\n")
+        for code, title in instance.units:
+            csvfile.write(f"{code},{title}\r\n")
+
+    with open(tutors_path, "w", newline="") as csvfile:
+        csvfile.write("Tutor_Name\r\n")
+        for tutor in instance.tutors:
+            csvfile.write(f"{tutor}\r\n")
+
+    with open(students_path, "w", newline="") as csvfile:
+        csvfile.write("ID,Student Name,Unitcode\r\n")
+        for student in instance.students:
+            for code in sorted(student.units):
+                csvfile.write(f"{student.student_id},{student.name},{code}\r\n")
+
+    return units_path, tutors_path, students_path
+
+
+@contextlib.contextmanager
+def use_instance(instance):
+    """
+    Point the genetic algorithm at an instance's classrooms and exam days while benchmarking it.
+    :return: None
+    """
+    classrooms, exam_days = et.CLASSROOMS, et.EXAM_DAYS
+    et.CLASSROOMS, et.EXAM_DAYS = instance.classrooms, instance.exam_days
+    try:
+        yield
+    finally:
+        et.CLASSROOMS, et.EXAM_DAYS = classrooms, exam_days
+
+
+def time_call(function, repeats=5):
+    """
+    Time a function, keeping the best and mean of several calls.
+    The best time is the least affected by other load on the machine, so it is what comparisons use.
+    :return: A dictionary of the best and mean times in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return {"best": min(times), "mean": sum(times) / len(times), "repeats": repeats}
+
+
+def fresh_copies(population):
+    """
+    Helper function.
+    Copies of a population without fitness scores, so evaluators can't reuse earlier results.
+    :return: A list of solutions.
+    """
+    copies = [solution.copy() for solution in population]
+    for solution in copies:
+        solution.invalidate()
+
+    return copies
+
+
+def benchmark_constraints(instance, population, conflict_index, repeats):
+    """
+    Time each hard and soft constraint over a population.
+    :return: A dictionary of timings by constraint name.
+    """
+    units, tutors, students = instance.units, instance.tutors, instance.students
+    constraints = {
+        "hard_constraint_all_units": lambda: [et.hard_constraint_all_units(s, units) for s in population],
+        "hard_constraint_unit_count": lambda: et.hard_constraint_unit_count(students),
+        "hard_constraint_exam_clash": lambda: [et.hard_constraint_exam_clash(s, students, conflict_index) for s in population],
+        "hard_constraint_tutor_clash": lambda: [et.hard_constraint_tutor_clash(s) for s in population],
+        "hard_constraint_duplicate_exams": lambda: [et.hard_constraint_duplicate_exams(s) for s in population],
+        "soft_constraint_two_exams": lambda: [et.soft_constraint_two_exams(s, students, conflict_index) for s in population],
+        "soft_constraint_invigilation_duties": lambda: [et.soft_constraint_invigilation_duties(s, units, tutors) for s in population],
+        "build_conflict_index": lambda: et.build_conflict_index(students),
+    }
+
+    return {name: time_call(function, repeats) for name, function in constraints.items()}
+
+
+def benchmark_phases(instance, population, conflict_index, repeats, crossover_probability=0.8, mutation_probability=0.5):
+    """
+    Time each phase of a generation - generating, scoring with each evaluation, selection, crossover, and mutation.
+    Each evaluation is timed on unscored copies of the population.
+    :return: A dictionary of timings by phase name.
+    """
+    units, tutors, students = instance.units, instance.tutors, instance.students
+    phases = {"generate_population": time_call(lambda: et.generate_population(len(population), units, tutors), repeats)}
+
+    for evaluation in EVALUATIONS:
+        if evaluation == "batch" and et.np is None:
+            continue
+        fitness_function = et.make_fitness_function(evaluation, units, tutors, students, conflict_index)
+        phases[f"fitness_{evaluation}"] = time_call(lambda: fitness_function(fresh_copies(population)), repeats)
+
+    parents = et.selection(population)
+    phases["selection"] = time_call(lambda: et.selection(population), repeats)
+    for method in ("tournament", "sus"):
+        phases[f"selection_{method}"] = time_call(lambda: et.selection(population, method), repeats)
+    phases["crossover"] = time_call(lambda: et.apply_crossover(parents, crossover_probability), repeats)
+    phases["mutation"] = time_call(lambda: et.apply_mutation(population, mutation_probability, tutors), repeats)
+
+    # The vectorized operators, on the same population as arrays.
+    if et.np is not None:
+        rng = et.np.random.default_rng(0)
+        array_population = et.encode_population(population, et.Encoding(units, tutors))
+        array_parents = et.array_selection(array_population, rng)
+        phases["selection_vectorized"] = time_call(lambda: et.array_selection(array_population, rng), repeats)
+        phases["crossover_vectorized"] = time_call(lambda: et.array_crossover(array_parents, crossover_probability, rng), repeats)
+        phases["mutation_vectorized"] = time_call(lambda: et.array_mutation(array_population, mutation_probability, len(tutors), rng), repeats)
+
+    return phases
+
+
+def benchmark_runs(instance, conflict_index, population_size, max_generations, repeats, crossover_probability=0.8, mutation_probability=0.5):
+    """
+    Time full runs of the genetic algorithm with each evaluation.
+    Runs with QuietTelemetry so printing isn't timed.
+    :return: A dictionary of timings by evaluation.
+    """
+    units, tutors, students = instance.units, instance.tutors, instance.students
+    runs = {}
+
+    for evaluation in EVALUATIONS:
+        if evaluation == "batch" and et.np is None:
+            continue
+
+        def run():
+            et.genetic_algorithm(population_size, max_generations, crossover_probability, mutation_probability,
+                units, tutors, students, conflict_index, evaluation=evaluation, telemetry=et.QuietTelemetry())
+
+        runs[f"genetic_algorithm_{evaluation}"] = time_call(run, repeats)
+
+    if et.np is not None:
+        runs["vectorized_algorithm"] = time_call(lambda: et.vectorized_algorithm(population_size, max_generations, crossover_probability,
+            mutation_probability, units, tutors, students, conflict_index, telemetry=et.QuietTelemetry()), repeats)
+
+    return runs
+
+
+def benchmark_instance(parameters, population_size=50, max_generations=5, repeats=5, seed=0):
+    """
+    Generate an instance and run every benchmark on it.
+    The random number generator is seeded, so each commit benchmarks the same populations.
+    :return: A dictionary of the instance parameters and timings.
+    """
+    instance = generate_instance(**parameters, seed=seed)
+
+    with use_instance(instance):
+        random.seed(seed)
+        conflict_index = et.build_conflict_index(instance.students)
+        population = et.generate_population(population_size, instance.units, instance.tutors)
+        et.calculate_fitness(population, instance.units, instance.students, instance.tutors, conflict_index)
+
+        timings = {}
+        timings.update(benchmark_constraints(instance, population, conflict_index, repeats))
+        timings.update(benchmark_phases(instance, population, conflict_index, repeats))
+        timings.update(benchmark_runs(instance, conflict_index, population_size, max_generations, max(1, repeats // 2)))
+
+    return {"instance": instance.parameters, "population_size": population_size, "max_generations": max_generations, "timings": timings}
+
+
+def git_commit():
+    """
+    Helper function.
+    The commit being benchmarked, if run inside a git checkout.
+    :return: The commit hash, or None.
+    """
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return output.stdout.strip()
+
+
+def run_benchmarks(grid=SIZE_GRID, population_size=50, max_generations=5, repeats=5, seed=0):
+    """
+    Benchmark each size in the grid.
+    :return: A dictionary of the results and the environment they were measured in.
+    """
+    results = []
+    for parameters in grid:
+        print(f"Benchmarking {parameters}")
+        results.append(benchmark_instance(parameters, population_size, max_generations, repeats, seed))
+
+    return {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": None if et.np is None else et.np.__version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def result_key(result):
+    """
+    Helper function.
+    Identifies a result by its instance and GA parameters, so matching results can be compared.
+    :return: A hashable key.
+    """
+    return json.dumps([result["instance"], result["population_size"], result["max_generations"]], sort_keys=True)
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Compare the best times of two benchmark runs.
+    A benchmark is a regression when it is more than threshold slower than the baseline, e.g. 0.1 is 10%.
+    :return: A list of (instance, benchmark, baseline time, current time) regressions.
+    """
+    baseline_results = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+
+    for result in current["results"]:
+        previous = baseline_results.get(result_key(result))
+        if previous is None:
+            continue
+        for name, timing in result["timings"].items():
+            if name not in previous["timings"]:
+                continue
+            before, after = previous["timings"][name]["best"], timing["best"]
+            change = (after - before) / before if before else 0.0
+            print(f"{result['instance']['num_units']:>5} units  {name:<36} {before:10.5f}s {after:10.5f}s {change:+8.1%}")
+            if change > threshold:
+                regressions.append((result["instance"], name, before, after))
+
+    return regressions
+
+
+def main():
+    """
+    Main function.
+    Runs the benchmarks, saves the results, and compares them with a baseline if given.
+    :return: The exit status - 1 if there are regressions.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the exam timetable genetic algorithm.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to save the results.")
+    parser.add_argument("--compare", help="A baseline results file to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown counted as a regression, e.g. 0.1 for 10%%.")
+    parser.add_argument("--quick", action="store_true", help="Only benchmark the smallest size.")
+    parser.add_argument("--population-size", type=int, default=50)
+    parser.add_argument("--max-generations", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    grid = QUICK_GRID if args.quick else SIZE_GRID
+    results = run_benchmarks(grid, args.population_size, args.max_generations, args.repeats, args.seed)
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(baseline, results, args.threshold)
+        for instance, name, before, after in regressions:
+            print(f"Regression: {name} on {instance['num_units']} units - {before:.5f}s to {after:.5f}s")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
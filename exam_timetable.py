@@ -1,70 +1,1965 @@
+import cProfile
 import csv
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
+import pickle
+import queue
 import random
+import struct
+import threading
+import traceback
+import warnings
+from array import array
 from math import ceil
-from collections import Counter, defaultdict
-from copy import deepcopy
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 # Global Variables
 CLASSROOMS = ["P411", "P412", "P413", "P414", "P415", "P416", "P417", "P418", "P419", "P420"]
 EXAM_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+SESSIONS = ["morning", "afternoon"]
+UNITS_FILE = "units.csv.csv"
+TUTORS_FILE = "tutor.csv.csv"
+STUDENT_UNITS_FILE = "student_units.csv.csv"
+SNAPSHOT_FILE = "exam_data.snapshot"
+SNAPSHOT_MAGIC = b"ETSNAP02"
+CHECKPOINT_MAGIC = b"ETCKPT01"
+GENOME_FIELDS = 5
+EXAM_FIELDS = 4
+CONSTRAINT_NAMES = ["All Units", "Duplicate Exams", "Exam Clash", "Tutor Clash", "Unit Count", "Consecutive Exams", "Equal Invigilators"]
+
+
+class InternTable:
+    """
+    A class used to intern identifiers (units, tutors, rooms) to small ints.
+    Shared by every ExamRoom, so each distinct identifier is stored once.
+    """
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self.ids[value] = value_id
+
+        return value_id
+
+
+class InternedAttribute:
+    """
+    A descriptor used to expose an interned id attribute as its value.
+    e.g. ExamRoom.morning_unit reads and writes ExamRoom.morning_unit_id through UNIT_TABLE.
+    """
+    def __init__(self, id_attribute, table):
+        self.id_attribute = id_attribute
+        self.table = table
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return self.table.values[getattr(instance, self.id_attribute)]
+
+    def __set__(self, instance, value):
+        setattr(instance, self.id_attribute, self.table.intern(value))
+
+
+# Intern tables shared by every ExamRoom in the process.
+UNIT_TABLE = InternTable()
+TUTOR_TABLE = InternTable()
+ROOM_TABLE = InternTable()
 
 
 class Solution:
     """
     A class used to represent a solution.
+    Each day of the schedule is an immutable tuple of ExamRoom objects, so solutions can share days and rooms.
+    occupancy is the solution's OccupancyIndex, see occupancy_index. The operators keep it in sync as they change the schedule.
     """
+    __slots__ = ("schedule", "fitness", "fitness_state", "touched_slots", "schedule_key", "occupancy")
+
     def __init__(self, fitness=0):
-        self.schedule = {day: [] for day in EXAM_DAYS}
+        self.schedule = {day: () for day in EXAM_DAYS}
         self.fitness = fitness
+
+        # Cached constraint counts, and the (day, session) slots changed since they were counted.
+        self.fitness_state = None
+        self.touched_slots = set()
+
+        # Cached canonical key of the schedule, see schedule_key.
+        self.schedule_key = None
+
+        # Who is busy in each timeslot, built when first needed.
+        self.occupancy = None
     
     def __str__(self):
-        return "Best Solution: {}".format(self.schedule)
+        return "Best Solution: {}".format({day: list(room_list) for day, room_list in self.schedule.items()})
+
+    def copy(self):
+        """
+        A copy of the solution that shares its day schedules and rooms.
+        :return: Solution object.
+        """
+        solution = Solution(self.fitness)
+        solution.schedule = dict(self.schedule)
+        solution.schedule_key = self.schedule_key
+        if self.fitness_state is not None:
+            solution.fitness_state = self.fitness_state.copy()
+            solution.touched_slots = set(self.touched_slots)
+        if self.occupancy is not None:
+            solution.occupancy = self.occupancy.copy()
+
+        return solution
+
+    def invalidate(self, slots=None):
+        """
+        Mark the schedule as changed in place, dropping the cached key.
+        slots limits the change to those (day, session) timeslots for incremental evaluation,
+        and the operator that changed them has kept the occupancy in sync. Otherwise the occupancy is dropped too.
+        """
+        self.schedule_key = None
+        if slots is None:
+            self.fitness_state = None
+            self.occupancy = None
+        else:
+            self.touched_slots |= set(slots)
+
+    def occupancy_index(self):
+        """
+        The solution's OccupancyIndex, built from the schedule without the students if it has none.
+        :return: OccupancyIndex object.
+        """
+        if self.occupancy is None:
+            self.occupancy = OccupancyIndex(self)
+
+        return self.occupancy
 
 
 class StudentData:
     """
     A class used to represent a student and their units.
+    units is the set of unit codes the student is enrolled in.
     """
-    def __init__(self, name, units=None):
+    __slots__ = ("name", "units", "student_id")
+
+    def __init__(self, name, units=None, student_id=None):
         self.name = name
+        self.student_id = student_id
         if units is None:
-            self.units = []
+            self.units = set()
+        elif isinstance(units, str):
+            self.units = {units}
         else:
-            self.units = units
+            self.units = set(units)
 
     def add_unit(self, unit):
-        self.units.append(unit)
+        self.units.add(unit)
 
     def __repr__(self):                                               
         output = f"Name: {self.name}\tUnits: {self.units}\n"
         return output
 
 
+class StudentTable:
+    """
+    A class used to hold the students and their units as arrays, e.g. memory-mapped from a snapshot.
+    The units of student i are codes[unit_ids[offsets[i]:offsets[i + 1]]]. Each row is a different student, as load_students merges them.
+    Behaves as a read-only list of StudentData, creating each one when it is accessed.
+    """
+    __slots__ = ("student_ids", "names", "codes", "offsets", "unit_ids")
+
+    def __init__(self, student_ids, names, codes, offsets, unit_ids):
+        self.student_ids = student_ids
+        self.names = names
+        self.codes = codes
+        self.offsets = offsets
+        self.unit_ids = unit_ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        units = {self.codes[unit_id] for unit_id in self.unit_ids[self.offsets[index]:self.offsets[index + 1]]}
+        return StudentData(self.names[index], units, self.student_ids[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reduce__(self):
+        # A memory-mapped table is copied into arrays when sent to another process.
+        return StudentTable, (self.student_ids, self.names, self.codes, array("q", self.offsets), array("i", self.unit_ids))
+
+    def __repr__(self):
+        output = f"Students: {len(self.names)}, Enrollments: {len(self.unit_ids)}, Unit Codes: {len(self.codes)}"
+        return output
+
+
 class ExamRoom:
     """
     A class used to represent an exam room and its properties.
+    The room, units and invigilators are stored as ids into the shared intern tables.
+    room_name, morning_unit, etc. read and write the values, room_id, morning_unit_id, etc. the ids.
     """
+    __slots__ = ("room_id", "morning_unit_id", "morning_invigilator_id", "afternoon_unit_id", "afternoon_invigilator_id")
+
+    room_name = InternedAttribute("room_id", ROOM_TABLE)
+    morning_unit = InternedAttribute("morning_unit_id", UNIT_TABLE)
+    morning_invigilator = InternedAttribute("morning_invigilator_id", TUTOR_TABLE)
+    afternoon_unit = InternedAttribute("afternoon_unit_id", UNIT_TABLE)
+    afternoon_invigilator = InternedAttribute("afternoon_invigilator_id", TUTOR_TABLE)
+
     def __init__(self, room_name, morning_unit, morning_invigilator, afternoon_unit, afternoon_invigilator):
         self.room_name = room_name
         self.morning_unit = morning_unit
         self.morning_invigilator = morning_invigilator
         self.afternoon_unit = afternoon_unit
         self.afternoon_invigilator = afternoon_invigilator
+
+    def __reduce__(self):
+        # Ids are only meaningful within a process, so rooms are pickled by value.
+        return ExamRoom, (self.room_name, self.morning_unit, self.morning_invigilator, self.afternoon_unit, self.afternoon_invigilator)
     
     def __repr__(self):
         output = f"Room Name: {self.room_name}, Morning Unit: {self.morning_unit}, Morning Invigilator: {self.morning_invigilator}, Afternoon Unit: {self.afternoon_unit}, Afternoon Invigilator: {self.afternoon_invigilator}"
         return output
+
+    def replace(self, **changes):
+        """
+        Copy-on-write.
+        Rooms are shared between solutions, so they are never changed in place - a changed room is a new ExamRoom.
+        :return: ExamRoom object.
+        """
+        room = ExamRoom.__new__(ExamRoom)
+        room.room_id = self.room_id
+        room.morning_unit_id = self.morning_unit_id
+        room.morning_invigilator_id = self.morning_invigilator_id
+        room.afternoon_unit_id = self.afternoon_unit_id
+        room.afternoon_invigilator_id = self.afternoon_invigilator_id
+        for name, value in changes.items():
+            setattr(room, name, value)
+
+        return room
+
+
+class ConflictIndex:
+    """
+    A class used to index the students enrolled in each unit.
+    unit_students maps a unit code to the enrolled student ids.
+    conflicts maps a unit code to the other unit codes that share students, and how many.
+    student_bits maps a student id to its bit, and unit_masks a unit code to the int bitmask of its students, see OccupancyIndex.
+    A StudentTable is indexed straight from its arrays with NumPy, so no StudentData is created per student,
+    and unit_students and student_bits are only built if they are used.
+    """
+    def __init__(self, unit_allocation):
+        self.conflicts = defaultdict(Counter)
+        self.unit_masks = {}
+        self.table = None
+        self._unit_students = None
+        self._student_bits = None
+
+        if isinstance(unit_allocation, StudentTable) and np is not None:
+            self.index_table(unit_allocation)
+        else:
+            self.index_students(unit_allocation)
+
+    def __repr__(self):
+        output = f"Units: {len(self.unit_masks)}, Conflicting Pairs: {sum(len(c) for c in self.conflicts.values()) // 2}"
+        return output
+
+    def index_students(self, unit_allocation):
+        """
+        Index a list of StudentData, one at a time.
+        :return: None
+        """
+        self._unit_students = defaultdict(set)
+
+        # Rows with the same student id (or name, without an id) are the same student.
+        student_codes = defaultdict(set)
+        for student in unit_allocation:
+            key = student_key(student)
+            codes = student_unit_codes(student)
+            student_codes[key].update(codes)
+
+            for code in codes:
+                self._unit_students[code].add(key)
+
+        # Every pair of units taken by the same student is a potential clash.
+        for codes in student_codes.values():
+            for code in codes:
+                for other in codes:
+                    if other != code:
+                        self.conflicts[code][other] += 1
+
+        # Set the bits in a bytearray per unit, building the int bitmasks bit by bit would copy them each time.
+        self.num_students = len(student_codes)
+        self._student_bits = {key: bit for bit, key in enumerate(student_codes)}
+        unit_bytes = defaultdict(lambda: bytearray((len(student_codes) + 7) // 8))
+        for key, codes in student_codes.items():
+            bit = self._student_bits[key]
+            for code in codes:
+                unit_bytes[code][bit >> 3] |= 1 << (bit & 7)
+        self.unit_masks = {code: int.from_bytes(mask, "little") for code, mask in unit_bytes.items()}
+
+    def index_table(self, table):
+        """
+        Index a StudentTable from its offsets and unit ids arrays. Student i is bit i.
+        :return: None
+        """
+        self.table = table
+        self.num_students = len(table)
+        num_codes = max(len(table.codes), 1)
+
+        # One (student, unit) enrollment per row, sorted by student. load_students already stores them that way.
+        students = np.repeat(np.arange(self.num_students), np.diff(np.asarray(table.offsets, dtype=np.int64)))
+        enrollments = students * num_codes + np.asarray(table.unit_ids, dtype=np.int64)
+        if not (enrollments[1:] > enrollments[:-1]).all():
+            enrollments, _ = run_lengths(enrollments)
+        students, unit_ids = enrollments // num_codes, enrollments % num_codes
+
+        # Every pair of units taken by the same student is a potential clash - pair each enrollment with the student's later ones.
+        pairs = []
+        shift = 1
+        while shift < len(students):
+            same = students[shift:] == students[:-shift]
+            if not same.any():
+                break
+            first, second = unit_ids[:-shift][same], unit_ids[shift:][same]
+            pairs.extend((first * num_codes + second, second * num_codes + first))
+            shift += 1
+        if pairs:
+            pairs = np.concatenate(pairs)
+            if num_codes <= 1 << 12:
+                counts = np.bincount(pairs, minlength=num_codes * num_codes)
+                pairs = np.flatnonzero(counts)
+                counts = counts[pairs]
+            else:
+                pairs, counts = run_lengths(pairs)
+            others = np.array(table.codes, dtype=object)[pairs % num_codes].tolist()
+            counts = counts.tolist()
+            bounds = np.searchsorted(pairs // num_codes, np.arange(num_codes + 1)).tolist()
+            for unit, code in enumerate(table.codes):
+                if bounds[unit] < bounds[unit + 1]:
+                    self.conflicts[code] = Counter(dict(zip(others[bounds[unit]:bounds[unit + 1]], counts[bounds[unit]:bounds[unit + 1]])))
+
+        # Each unit's students as a bitmask. Sorted by unit, keeping the students in order (a radix sort for small ids),
+        # then the bits of the students sharing a byte are summed into that byte.
+        order = np.argsort(unit_ids.astype(np.uint16) if num_codes <= 1 << 16 else unit_ids, kind="stable")
+        unit_students, unit_ids = students[order], unit_ids[order]
+        byte_keys = unit_ids * ((self.num_students + 7) // 8) + (unit_students >> 3)
+        starts = np.flatnonzero(np.concatenate(([True], byte_keys[1:] != byte_keys[:-1])))
+        byte_values = np.add.reduceat(np.left_shift(1, unit_students & 7).astype(np.uint8), starts)
+        byte_units, byte_indices = unit_ids[starts], unit_students[starts] >> 3
+        bounds = np.searchsorted(byte_units, np.arange(num_codes + 1)).tolist()
+        for unit, code in enumerate(table.codes):
+            if bounds[unit] < bounds[unit + 1]:
+                mask = np.zeros((self.num_students + 7) // 8, dtype=np.uint8)
+                mask[byte_indices[bounds[unit]:bounds[unit + 1]]] = byte_values[bounds[unit]:bounds[unit + 1]]
+                self.unit_masks[code] = int.from_bytes(mask.tobytes(), "little")
+
+    def student_keys(self):
+        """
+        Helper function.
+        The id of each student of a StudentTable, by bit.
+        :return: A list of student ids (or names, without an id).
+        """
+        table = self.table
+        return [name if student_id is None else student_id for student_id, name in zip(table.student_ids, table.names)]
+
+    @property
+    def student_bits(self):
+        if self._student_bits is None:
+            self._student_bits = {key: bit for bit, key in enumerate(self.student_keys())}
+
+        return self._student_bits
+
+    @property
+    def unit_students(self):
+        if self._unit_students is None:
+            keys = self.student_keys()
+            table = self.table
+            self._unit_students = defaultdict(set)
+            for position, key in enumerate(keys):
+                for unit_id in table.unit_ids[table.offsets[position]:table.offsets[position + 1]]:
+                    self._unit_students[table.codes[unit_id]].add(key)
+
+        return self._unit_students
+
+
+class OccupancyIndex:
+    """
+    A class used to record who is busy in each (day, session) timeslot of a solution, as int bitmasks.
+    A room or tutor is the bit of its interned id, and a unit's students are ConflictIndex.unit_masks.
+    Each of rooms, tutors and students maps a timeslot to (busy, clashes) - the bits of everyone in at least one exam,
+    and of everyone in more than one. "Is X free" is a bit test, and clash counts are popcounts.
+    An exam room holds both timeslots of its day, so their room masks are the same.
+    Students are only recorded with a conflict_index.
+    Operators keep a solution's index in sync as they change it - add_room, remove_room and replace_room for single rooms,
+    update to re-record whole timeslots.
+    """
+    __slots__ = ("conflict_index", "rooms", "tutors", "students")
+
+    def __init__(self, solution=None, conflict_index=None):
+        self.conflict_index = conflict_index
+        self.rooms = {}
+        self.tutors = {}
+        self.students = {}
+        if solution is not None:
+            self.update(solution)
+
+    def __repr__(self):
+        output = f"Timeslots: {len(self.rooms)}, Room Clashes: {self.room_clashes()}, Tutor Clashes: {self.tutor_clashes()}, Exam Clashes: {self.exam_clashes()}"
+        return output
+
+    def copy(self):
+        """
+        A copy with its own timeslots. The masks are ints, so they are shared.
+        :return: OccupancyIndex object.
+        """
+        occupancy = OccupancyIndex(conflict_index=self.conflict_index)
+        occupancy.rooms = dict(self.rooms)
+        occupancy.tutors = dict(self.tutors)
+        occupancy.students = dict(self.students)
+
+        return occupancy
+
+    def crossed(self, other, days):
+        """
+        A copy with the timeslots of the given days taken from another index, for a crossover child.
+        :return: OccupancyIndex object.
+        """
+        occupancy = self.copy()
+        for masks, other_masks in ((occupancy.rooms, other.rooms), (occupancy.tutors, other.tutors), (occupancy.students, other.students)):
+            for day in days:
+                for session in SESSIONS:
+                    if (day, session) in other_masks:
+                        masks[(day, session)] = other_masks[(day, session)]
+                    else:
+                        masks.pop((day, session), None)
+
+        return occupancy
+
+    def update(self, solution, slots=None):
+        """
+        Re-record the given (day, session) timeslots from the solution, or every timeslot.
+        :return: None
+        """
+        if slots is None:
+            slots = [(day, session) for day in solution.schedule for session in SESSIONS]
+
+        for day, session in slots:
+            room_list = solution.schedule[day]
+            self.rooms[(day, session)] = occupancy_masks(1 << room.room_id for room in room_list)
+            if session == "morning":
+                self.tutors[(day, session)] = occupancy_masks(1 << room.morning_invigilator_id for room in room_list)
+            else:
+                self.tutors[(day, session)] = occupancy_masks(1 << room.afternoon_invigilator_id for room in room_list)
+
+        if self.conflict_index is not None:
+            self.update_students(solution, slots)
+
+    def update_students(self, solution, slots=None):
+        """
+        Re-record only the students of the given timeslots, or every timeslot.
+        Used to add the students to an index built without a conflict_index.
+        :return: None
+        """
+        if slots is None:
+            slots = [(day, session) for day in solution.schedule for session in SESSIONS]
+
+        unit_masks = self.conflict_index.unit_masks
+        for day, session in slots:
+            self.students[(day, session)] = occupancy_masks(unit_masks.get(getattr(room, f"{session}_unit")[0], 0)
+                for room in solution.schedule[day])
+
+    def exam_bits(self, room, session):
+        """
+        Helper function.
+        The bits an exam room sets in one of its timeslots.
+        :return: The room, tutor and, with a conflict_index, student bits, in the order of the masks they are set in.
+        """
+        if session == "morning":
+            exam_bits = [1 << room.room_id, 1 << room.morning_invigilator_id]
+            code = room.morning_unit[0]
+        else:
+            exam_bits = [1 << room.room_id, 1 << room.afternoon_invigilator_id]
+            code = room.afternoon_unit[0]
+        if self.conflict_index is not None:
+            exam_bits.append(self.conflict_index.unit_masks.get(code, 0))
+
+        return exam_bits
+
+    def add_bits(self, masks, slot, bits):
+        busy, clashes = masks.get(slot, (0, 0))
+        masks[slot] = busy | bits, clashes | busy & bits
+
+    def remove_bits(self, masks, slot, bits, k, room_list, i):
+        """
+        Helper function.
+        Clear the bits of room_list[i] from a timeslot's masks, the k-th of its exam_bits.
+        A bit that was set more than once may still be set by another room, so then the masks are re-recorded from the other rooms.
+        :return: None
+        """
+        busy, clashes = masks[slot]
+        if clashes & bits:
+            masks[slot] = occupancy_masks(self.exam_bits(other, slot[1])[k] for j, other in enumerate(room_list) if j != i)
+        else:
+            masks[slot] = busy & ~bits, clashes
+
+    def add_room(self, day, room):
+        """
+        Record an exam room added to the day, in both of its timeslots.
+        :return: None
+        """
+        for session in SESSIONS:
+            for masks, bits in zip((self.rooms, self.tutors, self.students), self.exam_bits(room, session)):
+                self.add_bits(masks, (day, session), bits)
+
+    def remove_room(self, day, room_list, i):
+        """
+        Record the exam room room_list[i] removed from the day, in both of its timeslots.
+        room_list is the day's rooms as recorded, before the removal.
+        :return: None
+        """
+        for session in SESSIONS:
+            for k, (masks, bits) in enumerate(zip((self.rooms, self.tutors, self.students), self.exam_bits(room_list[i], session))):
+                self.remove_bits(masks, (day, session), bits, k, room_list, i)
+
+    def replace_room(self, day, room_list, i, room):
+        """
+        Record the exam room room_list[i] replaced with room, e.g. with another invigilator.
+        Only the masks whose bits change are touched.
+        :return: None
+        """
+        for session in SESSIONS:
+            old_bits, new_bits = self.exam_bits(room_list[i], session), self.exam_bits(room, session)
+            for k, masks in enumerate((self.rooms, self.tutors, self.students)[:len(old_bits)]):
+                if old_bits[k] != new_bits[k]:
+                    self.remove_bits(masks, (day, session), old_bits[k], k, room_list, i)
+                    self.add_bits(masks, (day, session), new_bits[k])
+
+    def room_free(self, slot, room_name):
+        room_id = ROOM_TABLE.ids.get(room_name)
+        return room_id is None or not self.rooms.get(slot, (0, 0))[0] >> room_id & 1
+
+    def tutor_free(self, slot, tutor):
+        tutor_id = TUTOR_TABLE.ids.get(tutor)
+        return tutor_id is None or not self.tutors.get(slot, (0, 0))[0] >> tutor_id & 1
+
+    def student_free(self, slot, student):
+        bit = self.conflict_index.student_bits.get(student)
+        return bit is None or not self.students.get(slot, (0, 0))[0] >> bit & 1
+
+    def free_rooms(self, day):
+        """
+        The classrooms not used by an exam room on the day.
+        :return: A list of classrooms.
+        """
+        return free_classrooms(self.rooms.get((day, SESSIONS[0]), (0, 0))[0] | self.rooms.get((day, SESSIONS[1]), (0, 0))[0])
+
+    def room_clashes(self, slot=None):
+        return sum(clashes.bit_count() for _, clashes in (self.rooms.values() if slot is None else [self.rooms[slot]]))
+
+    def tutor_clashes(self, slot=None):
+        return sum(clashes.bit_count() for _, clashes in (self.tutors.values() if slot is None else [self.tutors[slot]]))
+
+    def exam_clashes(self, slot=None):
+        return sum(clashes.bit_count() for _, clashes in (self.students.values() if slot is None else [self.students[slot]]))
+
+    def day_clashes(self, day):
+        """
+        Counting the number of students with more than one exam in the day - in both sessions, or twice in one.
+        :return: count
+        """
+        morning_busy, morning_clashes = self.students[(day, SESSIONS[0])]
+        afternoon_busy, afternoon_clashes = self.students[(day, SESSIONS[1])]
+
+        return (morning_clashes | afternoon_clashes | (morning_busy & afternoon_busy)).bit_count()
+
+
+class Encoding:
+    """
+    A class used to intern units, tutors, rooms and (day, session) slots to small ints.
+    Shared by every genome in a run.
+    """
+    def __init__(self, units, tutors, classrooms=None, exam_days=None):
+        self.units = list(units)
+        self.tutors = list(tutors)
+        self.rooms = list(CLASSROOMS if classrooms is None else classrooms)
+        self.days = list(EXAM_DAYS if exam_days is None else exam_days)
+        self.slots = [(day, session) for day in self.days for session in ("morning", "afternoon")]
+
+        self.unit_ids = {unit: i for i, unit in enumerate(self.units)}
+        self.tutor_ids = {tutor: i for i, tutor in enumerate(self.tutors)}
+        self.room_ids = {room: i for i, room in enumerate(self.rooms)}
+        self.day_ids = {day: i for i, day in enumerate(self.days)}
+
+        # The smallest array type that can hold every id.
+        largest = max(len(self.units), len(self.tutors), len(self.rooms), 1)
+        self.typecode = "B" if largest < 2 ** 8 else "H" if largest < 2 ** 16 else "L"
+
+    def __repr__(self):
+        output = f"Units: {len(self.units)}, Tutors: {len(self.tutors)}, Rooms: {len(self.rooms)}, Slots: {len(self.slots)}"
+        return output
+
+
+class Genome:
+    """
+    A class used to represent a solution as fixed-width integer arrays.
+    Each exam room is one row of GENOME_FIELDS ints in genes: room, morning unit, morning invigilator, afternoon unit, afternoon invigilator.
+    Rows are grouped by day, and day_offsets[d]:day_offsets[d + 1] are the rows of day d.
+    The (day, session) slot of a row's exam is day * 2 + session, matching Encoding.slots.
+    """
+    __slots__ = ("genes", "day_offsets", "fitness")
+
+    def __init__(self, genes, day_offsets, fitness=0):
+        self.genes = genes
+        self.day_offsets = day_offsets
+        self.fitness = fitness
+
+    def __len__(self):
+        return len(self.genes) // GENOME_FIELDS
+
+    def __eq__(self, other):
+        if not isinstance(other, Genome):
+            return NotImplemented
+        return self.day_offsets == other.day_offsets and self.genes == other.genes
+
+    def __repr__(self):
+        output = f"Rooms: {len(self)}, Day Offsets: {list(self.day_offsets)}, Fitness: {self.fitness}"
+        return output
+
+    def copy(self):
+        return Genome(array(self.genes.typecode, self.genes), array(self.day_offsets.typecode, self.day_offsets), self.fitness)
+
+    def day_rows(self, day_index):
+        """
+        The exam rooms of a day as (room, morning unit, morning invigilator, afternoon unit, afternoon invigilator) ids.
+        :return: A generator of tuples.
+        """
+        genes = self.genes
+        for row in range(self.day_offsets[day_index], self.day_offsets[day_index + 1]):
+            start = row * GENOME_FIELDS
+            yield tuple(genes[start:start + GENOME_FIELDS])
+
+
+class ArrayPopulation:
+    """
+    A class used to hold a whole population as one NumPy array, for the vectorized operators.
+    exams[i, d, r] is the exam in room r on day d of individual i, as EXAM_FIELDS ints:
+    morning unit, morning invigilator, afternoon unit, afternoon invigilator. Empty rooms are -1.
+    Indexing by room keeps each room to one exam a day.
+    fitness holds the fitness of each individual once it has been scored.
+    """
+    __slots__ = ("exams", "fitness")
+
+    def __init__(self, exams, fitness=None):
+        self.exams = exams
+        self.fitness = np.zeros(len(exams)) if fitness is None else fitness
+
+    def __len__(self):
+        return len(self.exams)
+
+    def __repr__(self):
+        output = f"Individuals: {len(self)}, Days: {self.exams.shape[1]}, Rooms: {self.exams.shape[2]}, Exams: {int(self.occupied().sum())}"
+        return output
+
+    def occupied(self):
+        """
+        The rooms that hold an exam.
+        :return: A boolean array of (individual, day, room).
+        """
+        return self.exams[..., 0] >= 0
+
+    def take(self, indices):
+        """
+        The individuals at indices, copied.
+        :return: ArrayPopulation object.
+        """
+        return ArrayPopulation(self.exams[indices], self.fitness[indices])
+
+
+class BatchEvaluator:
+    """
+    A class used to score a whole population at once with NumPy array operations.
+    Solution-independent data (the students of each unit as a bitset, unit conflicts, unit count score) is built once per run.
+    Memory is bounded by processing the population in chunks, whatever the number of students.
+    Scores match the scalar constraint functions.
+    """
+    def __init__(self, units, tutors, unit_allocation, conflict_index=None, encoding=None):
+        if np is None:
+            raise ImportError("Batch fitness evaluation requires NumPy.")
+
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+        if encoding is None:
+            encoding = Encoding(units, tutors)
+
+        self.encoding = encoding
+        self.num_units = len(encoding.units)
+        self.num_tutors = len(encoding.tutors)
+        self.num_days = len(encoding.days)
+        self.num_slots = len(encoding.slots)
+        code_ids = {unit[0]: i for i, unit in enumerate(encoding.units)}
+
+        # The students of each unit as a bitset of 64 bit words - units x words, from ConflictIndex.unit_masks.
+        self.num_words = max(1, (conflict_index.num_students + 63) // 64)
+        self.unit_words = np.zeros((self.num_units, self.num_words), dtype=np.uint64)
+        for code, mask in conflict_index.unit_masks.items():
+            if code in code_ids:
+                self.unit_words[code_ids[code]] = np.frombuffer(mask.to_bytes(8 * self.num_words, "little"), dtype=np.uint64)
+
+        # Units sharing a student, and units with anyone enrolled - used to skip timeslots that can't clash.
+        self.shared = np.zeros((self.num_units, self.num_units), dtype=np.float32)
+        for code, others in conflict_index.conflicts.items():
+            for other, students in others.items():
+                if code in code_ids and other in code_ids:
+                    self.shared[code_ids[code], code_ids[other]] = students
+        self.enrolled = np.array([bool(conflict_index.unit_masks.get(unit[0])) for unit in encoding.units], dtype=bool)
+
+        # Scores that don't depend on the solution.
+        self.uc_score, _ = hard_constraint_unit_count(unit_allocation)
+        self.desired_average = round(len(units) / len(tutors), 2)
+
+    def exam_arrays(self, population):
+        """
+        Flatten every exam in the population into parallel arrays.
+        :return: Individual, day, slot, unit and invigilator index arrays.
+        """
+        individuals, days, slots, exam_units, invigilators = [], [], [], [], []
+
+        for i, solution in enumerate(population):
+            genome = solution if isinstance(solution, Genome) else encode_solution(solution, self.encoding)
+            rows = np.asarray(genome.genes, dtype=np.int64).reshape(-1, GENOME_FIELDS)
+            row_days = np.repeat(np.arange(self.num_days), np.diff(np.asarray(genome.day_offsets, dtype=np.int64)))
+
+            individuals.append(np.full(2 * len(rows), i))
+            days.append(np.concatenate((row_days, row_days)))
+            slots.append(np.concatenate((row_days * 2, row_days * 2 + 1)))
+            exam_units.append(np.concatenate((rows[:, 1], rows[:, 3])))
+            invigilators.append(np.concatenate((rows[:, 2], rows[:, 4])))
+
+        return tuple(np.concatenate(values) for values in (individuals, days, slots, exam_units, invigilators))
+
+    def array_exams(self, population):
+        """
+        Flatten every exam in an ArrayPopulation into parallel arrays, as exam_arrays.
+        :return: Individual, day, slot, unit and invigilator index arrays.
+        """
+        individuals, days, rooms = np.nonzero(population.occupied())
+        exams = population.exams[individuals, days, rooms].astype(np.int64)
+
+        return (np.concatenate((individuals, individuals)), np.concatenate((days, days)), np.concatenate((days * 2, days * 2 + 1)),
+            np.concatenate((exams[:, 0], exams[:, 2])), np.concatenate((exams[:, 1], exams[:, 3])))
+
+    def student_clashes(self, individuals, groups, num_groups, exam_units, population_size):
+        """
+        Counting the students with more than one exam in a group of exams for each individual.
+        groups is the timeslot of each exam for exam clashes, or the day for consecutive exams.
+        Processed in chunks to bound the size of the (individual, group) x unit matrix.
+        :return: An array of clash counts.
+        """
+        clashes = np.zeros(population_size, dtype=np.int64)
+        chunk = max(1, 2 ** 22 // max(1, num_groups * self.num_units))
+
+        for start in range(0, population_size, chunk):
+            stop = min(population_size, start + chunk)
+            mask = (individuals >= start) & (individuals < stop)
+            rows = (individuals[mask] - start) * num_groups + groups[mask]
+            group_units = np.bincount(rows * self.num_units + exam_units[mask], minlength=(stop - start) * num_groups * self.num_units)
+            group_units = group_units.reshape(-1, self.num_units).astype(np.float32)
+
+            # Only groups holding two units that share a student, or a repeated unit, can clash.
+            possible = ((group_units @ self.shared) * group_units).sum(axis=1) > 0
+            possible |= ((group_units > 1) & self.enrolled).any(axis=1)
+            if not possible.any():
+                continue
+
+            possible_rows = np.nonzero(possible)[0]
+            group_clashes = self.group_clashes(np.searchsorted(possible_rows, rows[possible[rows]]), exam_units[mask][possible[rows]], len(possible_rows))
+            clashes[start:stop] += np.bincount(possible_rows // num_groups, weights=group_clashes, minlength=stop - start).astype(np.int64)
+
+        return clashes
+
+    def group_clashes(self, rows, exam_units, num_rows):
+        """
+        Counting the students with more than one exam in each group, from the students bitsets of its units.
+        Each group's exams are added one at a time, as occupancy_masks, with the groups processed in chunks
+        to bound the size of the group x word bitsets.
+        :return: An array of clash counts per group.
+        """
+        order = np.argsort(rows, kind="stable")
+        rows, exam_units = rows[order], exam_units[order]
+        counts = np.zeros(num_rows, dtype=np.int64)
+        chunk = max(1, 2 ** 21 // self.num_words)
+
+        for start in range(0, num_rows, chunk):
+            stop = min(num_rows, start + chunk)
+            first, last = np.searchsorted(rows, (start, stop))
+            chunk_rows = rows[first:last] - start
+            chunk_units = exam_units[first:last]
+
+            # The position of each exam within its group.
+            group_starts = np.searchsorted(chunk_rows, chunk_rows)
+            ranks = np.arange(len(chunk_rows)) - group_starts
+
+            busy = np.zeros((stop - start, self.num_words), dtype=np.uint64)
+            group_clashes = np.zeros_like(busy)
+            for rank in range(int(ranks.max(initial=-1)) + 1):
+                selected = ranks == rank
+                group = chunk_rows[selected]
+                students = self.unit_words[chunk_units[selected]]
+                group_clashes[group] |= busy[group] & students
+                busy[group] |= students
+
+            counts[start:stop] = popcount(group_clashes).sum(axis=1)
+
+        return counts
+
+    def constraint_scores(self, population):
+        """
+        Score every constraint for every solution in the population.
+        :return: A list of (au, de, ec, tc, uc, ce, ei) score tuples.
+        """
+        if len(population) == 0:
+            return []
+
+        return self.exam_scores(len(population), *self.exam_arrays(population))
+
+    def exam_scores(self, population_size, individuals, days, slots, exam_units, invigilators):
+        """
+        Score every constraint for every individual from its flattened exams, see exam_arrays.
+        :return: A list of (au, de, ec, tc, uc, ce, ei) score tuples.
+        """
+        num_units, num_tutors = self.num_units, self.num_tutors
+
+        # Missing and duplicate units.
+        unit_counts = np.bincount(individuals * num_units + exam_units, minlength=population_size * num_units).reshape(population_size, num_units)
+        present = (unit_counts > 0).sum(axis=1).tolist()
+        duplicates = (unit_counts > 1).sum(axis=1).tolist()
+
+        # Tutors invigilating more than one exam in a timeslot.
+        keys, counts = np.unique((individuals * self.num_slots + slots) * num_tutors + invigilators, return_counts=True)
+        tutor_clashes = np.bincount(keys[counts > 1] // (self.num_slots * num_tutors), minlength=population_size).tolist()
+
+        # Students sitting more than one exam in a timeslot, and more than one exam in a day.
+        exam_clashes = self.student_clashes(individuals, slots, self.num_slots, exam_units, population_size).tolist()
+        consecutive = self.student_clashes(individuals, days, self.num_days, exam_units, population_size).tolist()
+
+        # Invigilation duties - total and number of distinct invigilators.
+        duties = np.bincount(individuals, minlength=population_size).tolist()
+        keys = np.unique(individuals * num_tutors + invigilators)
+        distinct_tutors = np.bincount(keys // num_tutors, minlength=population_size).tolist()
+
+        scores = []
+        for i in range(population_size):
+            scores.append(constraint_scores_from_counts(num_units - present[i], duplicates[i], exam_clashes[i], tutor_clashes[i],
+                self.uc_score, consecutive[i], duties[i], distinct_tutors[i], self.desired_average))
+
+        return scores
+
+    def calculate_fitness(self, population):
+        """
+        Calculate fitness score for each solution in the population.
+        :return: The population with a fitness score on each solution.
+        """
+        for solution, scores in zip(population, self.constraint_scores(population)):
+            solution.fitness = sum_scores(scores)
+
+        return population
+
+    def array_fitness(self, population):
+        """
+        Calculate fitness score for each individual of an ArrayPopulation.
+        :return: The population with its fitness array filled in.
+        """
+        if len(population):
+            scores = self.exam_scores(len(population), *self.array_exams(population))
+            population.fitness = np.array([sum_scores(individual_scores) for individual_scores in scores])
+
+        return population
+
+
+class FitnessState:
+    """
+    A class used to cache the per-slot constraint counts of a solution.
+    slots maps (day, session) to (units, invigilators, exam clashes, tutor clashes).
+    day_clashes maps a day to the number of students with more than one exam that day.
+    The clashes are counted from the solution's OccupancyIndex.
+    The remaining counts are totals over every slot, kept up to date by DeltaEvaluator.
+    """
+    def __init__(self):
+        self.slots = {}
+        self.unit_counts = Counter()
+        self.duplicates = 0
+        self.duties = Counter()
+        self.total_duties = 0
+        self.day_clashes = {}
+        self.consecutive = 0
+        self.exam_clashes = 0
+        self.tutor_clashes = 0
+
+    def __repr__(self):
+        output = f"Slots: {len(self.slots)}, Units: {len(self.unit_counts)}, Exam Clashes: {self.exam_clashes}, Tutor Clashes: {self.tutor_clashes}"
+        return output
+
+    def copy(self):
+        """
+        A copy with its own totals. The per-slot entries are tuples, so they are shared.
+        :return: FitnessState object.
+        """
+        state = copy(self)
+        state.slots = dict(self.slots)
+        state.unit_counts = Counter(self.unit_counts)
+        state.duties = Counter(self.duties)
+        state.day_clashes = dict(self.day_clashes)
+
+        return state
+
+
+class DeltaEvaluator:
+    """
+    A class used to score solutions incrementally.
+    Each solution keeps a FitnessState, and only the (day, session) slots listed in solution.touched_slots are re-counted,
+    from the solution's OccupancyIndex, which the operators have kept in sync.
+    Scores match the scalar constraint functions.
+    """
+    def __init__(self, units, tutors, unit_allocation, conflict_index=None):
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+
+        self.units = units
+        self.conflict_index = conflict_index
+
+        # Scores that don't depend on the solution.
+        self.uc_score, _ = hard_constraint_unit_count(unit_allocation)
+        self.desired_average = round(len(units) / len(tutors), 2)
+
+    def slot_entry(self, solution, occupancy, day, session):
+        """
+        Count the exams, invigilators and clashes of a single timeslot.
+        :return: (units, invigilators, exam clashes, tutor clashes)
+        """
+        room_list = solution.schedule[day]
+        if session == "morning":
+            slot_units = tuple(room.morning_unit for room in room_list)
+            invigilators = tuple(room.morning_invigilator for room in room_list)
+        else:
+            slot_units = tuple(room.afternoon_unit for room in room_list)
+            invigilators = tuple(room.afternoon_invigilator for room in room_list)
+
+        exam_clashes = occupancy.exam_clashes((day, session))
+        tutor_clashes = occupancy.tutor_clashes((day, session))
+
+        return slot_units, invigilators, exam_clashes, tutor_clashes
+
+    def update_slots(self, state, solution, slots):
+        """
+        Replace the counts of the given (day, session) slots with the solution's current exams.
+        :return: None
+        """
+        occupancy = solution.occupancy
+        for slot in slots:
+            old_entry = state.slots.get(slot)
+            new_entry = self.slot_entry(solution, occupancy, *slot)
+            state.slots[slot] = new_entry
+
+            if old_entry is not None:
+                old_units, old_invigilators, old_exam_clashes, old_tutor_clashes = old_entry
+                for unit in old_units:
+                    state.unit_counts[unit] -= 1
+                    if state.unit_counts[unit] == 1:
+                        state.duplicates -= 1
+                    elif state.unit_counts[unit] == 0:
+                        del state.unit_counts[unit]
+                for tutor in old_invigilators:
+                    state.duties[tutor] -= 1
+                    if state.duties[tutor] == 0:
+                        del state.duties[tutor]
+                state.total_duties -= len(old_invigilators)
+                state.exam_clashes -= old_exam_clashes
+                state.tutor_clashes -= old_tutor_clashes
+
+            new_units, new_invigilators, new_exam_clashes, new_tutor_clashes = new_entry
+            for unit in new_units:
+                state.unit_counts[unit] += 1
+                if state.unit_counts[unit] == 2:
+                    state.duplicates += 1
+            state.duties.update(new_invigilators)
+            state.total_duties += len(new_invigilators)
+            state.exam_clashes += new_exam_clashes
+            state.tutor_clashes += new_tutor_clashes
+
+        # Students with more than one exam in a day, for soft_constraint_two_exams.
+        for day in {day for day, _ in slots}:
+            day_clashes = occupancy.day_clashes(day)
+            state.consecutive += day_clashes - state.day_clashes.get(day, 0)
+            state.day_clashes[day] = day_clashes
+
+    def evaluate(self, solution):
+        """
+        Build the solution's FitnessState if it has none, or update its touched slots.
+        :return: The fitness of the solution.
+        """
+        if solution.occupancy is None:
+            solution.occupancy = OccupancyIndex(solution, self.conflict_index)
+        elif solution.occupancy.conflict_index is None:
+            # Built by an operator without the students.
+            solution.occupancy.conflict_index = self.conflict_index
+            solution.occupancy.update_students(solution)
+
+        if solution.fitness_state is None:
+            solution.fitness_state = FitnessState()
+            slots = [(day, session) for day in solution.schedule for session in SESSIONS]
+        else:
+            slots = solution.touched_slots
+
+        state = solution.fitness_state
+        if slots:
+            self.update_slots(state, solution, slots)
+        solution.touched_slots = set()
+
+        scores = constraint_scores_from_counts(len(self.units) - len(state.unit_counts), state.duplicates, state.exam_clashes, state.tutor_clashes,
+            self.uc_score, state.consecutive, state.total_duties, len(state.duties), self.desired_average)
+
+        return sum_scores(scores)
+
+    def calculate_fitness(self, population):
+        """
+        Calculate fitness score for each solution in the population.
+        :return: The population with a fitness score on each solution.
+        """
+        for solution in population:
+            solution.fitness = self.evaluate(solution)
+
+        return population
+
+
+class CrossoverRepair:
+    """
+    A class used to repair the duplicate and missing units of crossover children.
+    Every duplicate but the one in the least clashing timeslot is removed, leaving holes in its exam room.
+    Missing units fill the holes in the least clashing timeslots, measured with the students they share with the units already there.
+    Leftover holes are closed by merging half-empty rooms, and leftover missing units are paired into new rooms on the least clashing day.
+    Exams of units that are no longer in units are removed the same way, e.g. when re-solving after a change, see adapt_solution.
+    Linear in the units and their conflicts - the holes are bucketed by timeslot, so a missing unit only compares the timeslots.
+    """
+    def __init__(self, units, tutors, unit_allocation, conflict_index=None):
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+
+        self.units = units
+        self.tutors = tutors
+        self.conflict_index = conflict_index
+        self.children = 0
+        self.repaired = 0
+        self.duplicates_removed = 0
+        self.missing_placed = 0
+
+    def __repr__(self):
+        output = (f"Crossover Repair - Children: {self.children}, Repaired: {self.repaired}, "
+            f"Duplicates Removed: {self.duplicates_removed}, Missing Placed: {self.missing_placed}")
+        return output
+
+    def slot_costs(self, code, positions):
+        """
+        Helper function.
+        The number of the unit's students sitting another exam in each timeslot.
+        :return: A Counter of (day, session) to students.
+        """
+        costs = Counter()
+        for other, students in self.conflict_index.conflicts.get(code, {}).items():
+            for day, _, session in positions.get(other, ()):
+                costs[(day, session)] += students
+
+        return costs
+
+    def repair(self, solution):
+        """
+        Repair a solution's duplicate and missing units.
+        :return: The repaired solution, or the solution if it had nothing to repair.
+        """
+        self.children += 1
+        unit_lookup = {unit[0]: unit for unit in self.units}
+
+        # Where each unit's exams are, as (day, room index, session).
+        positions = defaultdict(list)
+        for day in EXAM_DAYS:
+            for i, room in enumerate(solution.schedule[day]):
+                for session in SESSIONS:
+                    positions[getattr(room, f"{session}_unit")[0]].append((day, i, session))
+
+        missing = [unit[0] for unit in self.units if unit[0] not in positions]
+        duplicated = [code for code, exams in positions.items() if len(exams) > 1 and code in unit_lookup]
+        stale = [code for code in positions if code not in unit_lookup]
+        if not missing and not duplicated and not stale:
+            return solution
+        self.repaired += 1
+
+        # Keep each duplicated unit in its least clashing timeslot, the other exams become holes.
+        holes = {}
+        for code in duplicated:
+            costs = self.slot_costs(code, positions)
+            keep = min(positions[code], key=lambda exam: costs[(exam[0], exam[2])])
+            for exam in positions[code]:
+                if exam != keep:
+                    holes[exam] = code
+            positions[code] = [keep]
+        self.duplicates_removed += len(holes)
+
+        # Units that are no longer in units leave holes too.
+        for code in stale:
+            for exam in positions.pop(code):
+                holes[exam] = code
+
+        # Bucket the holes by timeslot, in the order they were made.
+        slot_holes = {}
+        for exam in holes:
+            slot_holes.setdefault((exam[0], exam[2]), deque()).append(exam)
+
+        # Fill a hole in the least clashing timeslot with each missing unit.
+        filled = {}
+        unplaced = []
+        for code in missing:
+            if not slot_holes:
+                unplaced.append(code)
+                continue
+            costs = self.slot_costs(code, positions)
+            slot = min(slot_holes, key=costs.__getitem__)
+            exam = slot_holes[slot].popleft()
+            if not slot_holes[slot]:
+                del slot_holes[slot]
+            del holes[exam]
+            filled[exam] = code
+            positions[code] = [exam]
+            self.missing_placed += 1
+
+        # Build the changed days as lists of room fields, None marking a hole.
+        days = {}
+        for exam, code in filled.items():
+            days.setdefault(exam[0], list(solution.schedule[exam[0]]))
+        for exam in holes:
+            days.setdefault(exam[0], list(solution.schedule[exam[0]]))
+        for (day, i, session), code in filled.items():
+            days[day][i] = days[day][i].replace(**{f"{session}_unit": unit_lookup[code]})
+
+        # Close leftover holes - drop rooms with two, and merge pairs of rooms with one.
+        room_holes = defaultdict(list)
+        for day, i, session in holes:
+            room_holes[(day, i)].append(session)
+        removed = {room for room, sessions in room_holes.items() if len(sessions) == 2}
+        half_rooms = [(room, sessions[0]) for room, sessions in room_holes.items() if len(sessions) == 1]
+        for ((day_a, i_a), session_a), ((day_b, i_b), session_b) in zip(half_rooms[::2], half_rooms[1::2]):
+            other_session = SESSIONS[1 - SESSIONS.index(session_b)]
+            unit = getattr(days[day_b][i_b], f"{other_session}_unit")
+            days[day_a][i_a] = days[day_a][i_a].replace(**{f"{session_a}_unit": unit})
+            removed.add((day_b, i_b))
+        # An odd room out keeps its duplicate, or takes the least clashing unit as a duplicate in place of a unit no longer in units.
+        if len(half_rooms) % 2:
+            (day, i), session = half_rooms[-1]
+            if holes[(day, i, session)] in unit_lookup:
+                self.duplicates_removed -= 1
+            else:
+                other = getattr(days[day][i], f"{SESSIONS[1 - SESSIONS.index(session)]}_unit")[0]
+                code = min((code for code in unit_lookup if code != other), key=lambda code: self.slot_costs(code, positions)[(day, session)])
+                days[day][i] = days[day][i].replace(**{f"{session}_unit": unit_lookup[code]})
+
+        # An odd missing unit out is paired with the least conflicting unit, as a duplicate.
+        if len(unplaced) % 2:
+            partner = min((code for code in unit_lookup if code != unplaced[-1]), key=lambda code: len(self.conflict_index.conflicts.get(code, ())), default=None)
+            if partner is not None:
+                unplaced.append(partner)
+                self.missing_placed -= 1
+
+        # Pair leftover missing units into new rooms on the least clashing day, in a classroom the occupancy index has free.
+        occupancy = solution.occupancy_index().copy()
+        for morning_code, afternoon_code in zip(unplaced[::2], unplaced[1::2]):
+            morning_costs = self.slot_costs(morning_code, positions)
+            afternoon_costs = self.slot_costs(afternoon_code, positions)
+            day = min(EXAM_DAYS, key=lambda d: morning_costs[(d, SESSIONS[0])] + afternoon_costs[(d, SESSIONS[1])])
+            rooms = days.setdefault(day, list(solution.schedule[day]))
+            room = ExamRoom(room_name=random.choice(occupancy.free_rooms(day) or CLASSROOMS),
+                morning_unit=unit_lookup[morning_code],
+                morning_invigilator=random.choice(self.tutors),
+                afternoon_unit=unit_lookup[afternoon_code],
+                afternoon_invigilator=random.choice(self.tutors))
+            occupancy.add_room(day, room)
+            rooms.append(room)
+            positions[morning_code] = [(day, len(rooms) - 1, SESSIONS[0])]
+            positions[afternoon_code] = [(day, len(rooms) - 1, SESSIONS[1])]
+            self.missing_placed += 2
+
+        # Unchanged days are shared with the original, and the changed days are re-recorded in the occupancy index.
+        repaired = Solution(solution.fitness)
+        repaired.schedule = dict(solution.schedule)
+        for day, rooms in days.items():
+            repaired.schedule[day] = tuple(room for i, room in enumerate(rooms) if (day, i) not in removed)
+        occupancy.update(repaired, [(day, session) for day in days for session in SESSIONS])
+        repaired.occupancy = occupancy
+
+        return repaired
+
+
+class DataChanges:
+    """
+    A class used to represent the changes between two sets of problem data, see diff_data.
+    Units are held as unit codes and tutors as names. changed_units are the units whose enrolled students changed.
+    """
+    def __init__(self, added_units=(), removed_units=(), added_tutors=(), removed_tutors=(), changed_units=()):
+        self.added_units = set(added_units)
+        self.removed_units = set(removed_units)
+        self.added_tutors = set(added_tutors)
+        self.removed_tutors = set(removed_tutors)
+        self.changed_units = set(changed_units)
+
+    def __bool__(self):
+        return any((self.added_units, self.removed_units, self.added_tutors, self.removed_tutors, self.changed_units))
+
+    def __repr__(self):
+        output = (f"Added Units: {sorted(self.added_units)}, Removed Units: {sorted(self.removed_units)}, "
+            f"Added Tutors: {sorted(self.added_tutors)}, Removed Tutors: {sorted(self.removed_tutors)}, Changed Units: {sorted(self.changed_units)}")
+        return output
+
+    def affected_units(self):
+        """
+        The units whose exams are expected to move - new units, and units whose students changed.
+        :return: A set of unit codes.
+        """
+        return self.added_units | self.changed_units
+
+
+class StabilityPenalty:
+    """
+    A class used to score solutions with a penalty for straying from a previous timetable, e.g. the published one.
+    Wraps a fitness function. Each exam in a different timeslot than before costs slot_penalty,
+    and each exam in the same timeslot but a different room or with a different invigilator costs change_penalty.
+    Exams of the exempt units, e.g. DataChanges.affected_units, can move freely.
+    Fitness never goes below 0, so it can still be used as a selection weight.
+    """
+    def __init__(self, previous_solution, fitness_function, slot_penalty=0.5, change_penalty=0.1, exempt=()):
+        self.fitness_function = fitness_function
+        self.slot_penalty = slot_penalty
+        self.change_penalty = change_penalty
+        self.exempt = set(exempt)
+
+        # Where each unit's exam was, as (day, session, room, invigilator).
+        self.previous = {}
+        for day, room_list in previous_solution.schedule.items():
+            for room in room_list:
+                for session in SESSIONS:
+                    unit = getattr(room, f"{session}_unit")
+                    self.previous.setdefault(unit[0], (day, session, room.room_name, getattr(room, f"{session}_invigilator")))
+
+    def distance(self, solution):
+        """
+        How far a solution is from the previous timetable.
+        :return: The number of exams that moved timeslot, and the number that changed room or invigilator.
+        """
+        moved = changed = 0
+        for day, room_list in solution.schedule.items():
+            for room in room_list:
+                for session in SESSIONS:
+                    code = getattr(room, f"{session}_unit")[0]
+                    previous = self.previous.get(code)
+                    if previous is None or code in self.exempt:
+                        continue
+                    if previous[0] != day or previous[1] != session:
+                        moved += 1
+                    elif previous[2] != room.room_name or previous[3] != getattr(room, f"{session}_invigilator"):
+                        changed += 1
+
+        return moved, changed
+
+    def penalty(self, solution):
+        moved, changed = self.distance(solution)
+        return moved * self.slot_penalty + changed * self.change_penalty
+
+    def calculate_fitness(self, population):
+        """
+        Calculate fitness score for each solution in the population, less its stability penalty.
+        :return: The population with a fitness score on each solution.
+        """
+        self.fitness_function(population)
+        for solution in population:
+            solution.fitness = max(0, round(solution.fitness - self.penalty(solution), 2))
+
+        return population
+
+
+class LocalSearch:
+    """
+    A class used to improve the best solutions of each generation with a budgeted local search.
+    method is "hill" for steepest-ascent hill climbing, or "tabu" for tabu search.
+    Each step samples `neighbours` moves - reassigning an invigilator, swapping the timeslots of two exams,
+    or moving an exam room to a free classroom on another day - scores them incrementally with a DeltaEvaluator, and takes the best.
+    An exam can't be moved to a free room on its own, as an ExamRoom always holds a morning and an afternoon exam,
+    so the room move takes both of its exams with it. Moving it to a free classroom on the same day would change no score.
+    Hill climbing only takes improving moves. Tabu search takes the best move that doesn't undo a recent one, even if it is worse,
+    and keeps the best solution seen. A move is tabu for `tenure` steps unless it beats that best solution.
+    budget caps the moves scored per solution.
+    """
+    def __init__(self, units, tutors, unit_allocation, conflict_index=None, top_k=2, budget=100, neighbours=10, method="hill", tenure=7):
+        if method not in ("hill", "tabu"):
+            raise ValueError(f"Unknown local search method: {method}")
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+
+        self.evaluator = DeltaEvaluator(units, tutors, unit_allocation, conflict_index)
+        self.tutors = tutors
+        self.top_k = top_k
+        self.budget = budget
+        self.neighbours = neighbours
+        self.method = method
+        self.tenure = tenure
+        self.moves = 0
+        self.improvements = 0
+
+    def __repr__(self):
+        output = f"Local Search - Method: {self.method}, Top K: {self.top_k}, Budget: {self.budget}, Moves: {self.moves}, Improvements: {self.improvements}"
+        return output
+
+    def random_move(self, solution):
+        """
+        Pick a random move for the solution.
+        :return: (kind, arguments, tabu attributes), or None if the move picked isn't possible.
+        """
+        exams = [(day, i, session) for day in EXAM_DAYS for i in range(len(solution.schedule[day])) for session in SESSIONS]
+        if not exams:
+            return None
+
+        move = random.randrange(3)
+        if move == 0:
+            # Reassign the invigilator of an exam.
+            day, i, session = random.choice(exams)
+            unit = getattr(solution.schedule[day][i], f"{session}_unit")
+            return "invigilator", (day, i, session, random.choice(self.tutors)), (("invigilator", unit[0]),)
+
+        if move == 1:
+            # Swap the units of two exams in different timeslots.
+            exam_a, exam_b = random.choice(exams), random.choice(exams)
+            if (exam_a[0], exam_a[2]) == (exam_b[0], exam_b[2]):
+                return None
+            unit_a = getattr(solution.schedule[exam_a[0]][exam_a[1]], f"{exam_a[2]}_unit")
+            unit_b = getattr(solution.schedule[exam_b[0]][exam_b[1]], f"{exam_b[2]}_unit")
+            return "swap", (exam_a, exam_b), (("unit", unit_a[0]), ("unit", unit_b[0]))
+
+        # Move an exam room, both of its exams, to a free classroom on another day.
+        day, i, _ = random.choice(exams)
+        new_day = random.choice([d for d in EXAM_DAYS if d != day])
+        free = solution.occupancy_index().free_rooms(new_day)
+        if not free:
+            return None
+        room = solution.schedule[day][i]
+        return "room", (day, i, new_day, random.choice(free)), (("unit", room.morning_unit[0]), ("unit", room.afternoon_unit[0]))
+
+    def apply_move(self, solution, move):
+        """
+        Apply a move to a copy of the solution, marking the timeslots it touched and keeping its OccupancyIndex in sync.
+        :return: Solution object.
+        """
+        kind, arguments, _ = move
+        moved = solution.copy()
+        occupancy = moved.occupancy_index()
+
+        if kind == "invigilator":
+            day, i, session, tutor = arguments
+            rooms = list(moved.schedule[day])
+            new_room = rooms[i].replace(**{f"{session}_invigilator": tutor})
+            occupancy.replace_room(day, rooms, i, new_room)
+            rooms[i] = new_room
+            moved.schedule[day] = tuple(rooms)
+            moved.invalidate([(day, session)])
+
+        elif kind == "swap":
+            (day_a, i_a, session_a), (day_b, i_b, session_b) = arguments
+            room_a, room_b = moved.schedule[day_a][i_a], moved.schedule[day_b][i_b]
+            unit_a, unit_b = getattr(room_a, f"{session_a}_unit"), getattr(room_b, f"{session_b}_unit")
+            if day_a == day_b and i_a == i_b:
+                changes = [(day_a, i_a, {f"{session_a}_unit": unit_b, f"{session_b}_unit": unit_a})]
+            else:
+                changes = [(day_a, i_a, {f"{session_a}_unit": unit_b}), (day_b, i_b, {f"{session_b}_unit": unit_a})]
+            for day, i, fields in changes:
+                rooms = list(moved.schedule[day])
+                new_room = rooms[i].replace(**fields)
+                occupancy.replace_room(day, rooms, i, new_room)
+                rooms[i] = new_room
+                moved.schedule[day] = tuple(rooms)
+            moved.invalidate([(day_a, session_a), (day_b, session_b)])
+
+        else:
+            day, i, new_day, classroom = arguments
+            rooms = list(moved.schedule[day])
+            occupancy.remove_room(day, rooms, i)
+            room = rooms.pop(i).replace(room_name=classroom)
+            occupancy.add_room(new_day, room)
+            moved.schedule[day] = tuple(rooms)
+            moved.schedule[new_day] = moved.schedule[new_day] + (room,)
+            moved.invalidate([(d, session) for d in (day, new_day) for session in SESSIONS])
+
+        return moved
+
+    def improve(self, solution):
+        """
+        Run the local search from a solution.
+        The solution itself isn't changed. It keeps no FitnessState or OccupancyIndex if it had none.
+        :return: The best solution found, or the solution if nothing better was found.
+        """
+        current = solution.copy()
+        current.fitness = self.evaluator.evaluate(current)
+        best = current
+        tabu = {}
+        step = 0
+        scored = 0
+
+        while scored < self.budget:
+            candidates = []
+            for _ in range(min(self.neighbours, self.budget - scored)):
+                scored += 1
+                move = self.random_move(current)
+                if move is None:
+                    continue
+                candidate = self.apply_move(current, move)
+                candidate.fitness = self.evaluator.evaluate(candidate)
+                if self.method == "tabu" and candidate.fitness <= best.fitness and any(tabu.get(attribute, -1) >= step for attribute in move[2]):
+                    continue
+                candidates.append((candidate, move))
+            self.moves += len(candidates)
+            step += 1
+
+            if not candidates:
+                continue
+            candidate, move = max(candidates, key=lambda c: c[0].fitness)
+
+            if self.method == "hill" and candidate.fitness <= current.fitness:
+                continue
+
+            current = candidate
+            for attribute in move[2]:
+                tabu[attribute] = step + self.tenure
+            if current.fitness > best.fitness:
+                best = current
+
+        if best.fitness <= solution.fitness:
+            return solution
+
+        self.improvements += 1
+        if solution.fitness_state is None:
+            best.fitness_state = None
+            best.touched_slots = set()
+        if solution.occupancy is None:
+            best.occupancy = None
+
+        return best
+
+    def apply(self, population):
+        """
+        Replace the top_k solutions of the population with their improved versions, in place.
+        :return: The population.
+        """
+        for i in heapq.nlargest(self.top_k, range(len(population)), key=lambda i: population[i].fitness):
+            population[i] = self.improve(population[i])
+
+        return population
+
+
+class ScalarEvaluator:
+    """
+    A class used to score solutions one at a time with the constraint functions, in tiers.
+    The unit count score and the desired invigilation average don't depend on the solution, so they are computed once.
+    The cheap constraints - all units, duplicate exams, tutor clashes and invigilation duties - run first, from the rooms and tutors alone.
+    The student-based constraints - exam clashes and two exams - then add the students to the solution's OccupancyIndex.
+    Scores are exactly those of the constraint functions, summed in the same order, so the ranking of solutions is unchanged.
+    Pass constraint_timings, a dictionary, to add the time taken by each constraint function to it.
+    """
+    # The highest scores of the student-based constraints, to bound a solution's fitness before they run.
+    EXAM_CLASH_MAX = 10
+    TWO_EXAMS_MAX = 5
+
+    def __init__(self, units, tutors, unit_allocation, conflict_index=None, constraint_timings=None):
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+
+        self.units = units
+        self.tutors = tutors
+        self.unit_allocation = unit_allocation
+        self.conflict_index = conflict_index
+        self.constraint_timings = constraint_timings
+        self.skipped = 0
+
+        # Scores that don't depend on the solution.
+        self.uc_score, self.uc_valid = hard_constraint_unit_count(unit_allocation)
+        self.desired_average = round(len(units) / len(tutors), 2)
+
+        # The last solution checked, as its schedule_key and constraint results.
+        self.last_key = None
+        self.last_results = None
+
+    def __repr__(self):
+        output = f"Unit Count Score: {self.uc_score}, Desired Average: {self.desired_average}, Skipped: {self.skipped}"
+        return output
+
+    def timed(self, constraint, *arguments):
+        """
+        Helper function.
+        Call a constraint, timing it if constraint_timings is set.
+        :return: The constraint's result.
+        """
+        if self.constraint_timings is None:
+            return constraint(*arguments)
+
+        start = perf_counter()
+        result = constraint(*arguments)
+        self.constraint_timings[getattr(constraint, "__name__", type(constraint).__name__)] += perf_counter() - start
+
+        return result
+
+    def cheap_results(self, solution):
+        """
+        The constraints that only need the rooms and tutors.
+        :return: A copy of the solution's OccupancyIndex, and the all units, duplicate exams, tutor clash and invigilation duties results.
+        """
+        occupancy = self.timed(OccupancyIndex, solution) if solution.occupancy is None else solution.occupancy.copy()
+        all_units = self.timed(hard_constraint_all_units, solution, self.units)
+        duplicate_exams = self.timed(hard_constraint_duplicate_exams, solution)
+        tutor_clash = self.timed(hard_constraint_tutor_clash, solution, occupancy)
+        equal_invigilators = self.timed(soft_constraint_invigilation_duties, solution, self.units, self.tutors, self.desired_average)
+
+        return occupancy, all_units, duplicate_exams, tutor_clash, equal_invigilators
+
+    def student_results(self, solution, occupancy):
+        """
+        The constraints that need the students, added to the occupancy index first if it has none.
+        :return: The exam clash and two exams results.
+        """
+        if occupancy.conflict_index is not self.conflict_index:
+            occupancy.conflict_index = self.conflict_index
+            self.timed(occupancy.update_students, solution)
+        exam_clash = self.timed(hard_constraint_exam_clash, solution, self.unit_allocation, self.conflict_index, occupancy)
+        two_exams = self.timed(soft_constraint_two_exams, solution, self.unit_allocation, self.conflict_index, occupancy)
+
+        return exam_clash, two_exams
+
+    def evaluate(self, solution, threshold=None):
+        """
+        Score a solution.
+        If the solution can't score above threshold, whatever its student-based constraints, they are skipped
+        and the bound is returned instead of its fitness.
+        :return: The fitness of the solution, or a bound no higher than threshold.
+        """
+        occupancy, (au_score, _), (de_score, _), (tc_score, _), (ei_score, _) = self.cheap_results(solution)
+
+        if threshold is not None:
+            bound = au_score + de_score + self.EXAM_CLASH_MAX + tc_score + self.uc_score + self.TWO_EXAMS_MAX + ei_score
+            if bound <= threshold:
+                self.skipped += 1
+                return bound
+
+        (ec_score, _), (ce_score, _) = self.student_results(solution, occupancy)
+
+        return au_score + de_score + ec_score + tc_score + self.uc_score + ce_score + ei_score
+
+    def calculate_fitness(self, population, threshold=None):
+        """
+        Calculate fitness score for each solution in the population.
+        Solutions that can't score above threshold are given a bound instead, see evaluate.
+        :return: The population with a fitness score on each solution.
+        """
+        for solution in population:
+            solution.fitness = self.evaluate(solution, threshold)
+
+        return population
+
+    def results(self, solution):
+        """
+        The result of each hard and soft constraint for a solution, reusing the last result if the schedule hasn't changed.
+        :return: A dictionary of constraint name to its score and if it is satisfied, in CONSTRAINT_NAMES order.
+        """
+        key = schedule_key(solution)
+        if key == self.last_key:
+            return self.last_results
+
+        occupancy, all_units, duplicate_exams, tutor_clash, equal_invigilators = self.cheap_results(solution)
+        exam_clash, two_exams = self.student_results(solution, occupancy)
+        unit_count = self.uc_score, self.uc_valid
+
+        results = {}
+        for name, (score, satisfied) in zip(CONSTRAINT_NAMES, (all_units, duplicate_exams, exam_clash, tutor_clash, unit_count, two_exams, equal_invigilators)):
+            results[name] = {"satisfied": satisfied, "score": score}
+        self.last_key, self.last_results = key, results
+
+        return results
+
+    def check(self, solution):
+        """
+        Checks if all hard and soft constraints are satisfied, stopping at the first that isn't.
+        The cheap constraints are checked first, and the last result is reused if the schedule hasn't changed.
+        :return: True if every constraint is satisfied.
+        """
+        key = schedule_key(solution)
+        if key == self.last_key:
+            return all(result["satisfied"] for result in self.last_results.values())
+
+        occupancy, all_units, duplicate_exams, tutor_clash, equal_invigilators = self.cheap_results(solution)
+        if not (all_units[1] and duplicate_exams[1] and tutor_clash[1] and self.uc_valid and equal_invigilators[1]):
+            return False
+
+        exam_clash, two_exams = self.student_results(solution, occupancy)
+
+        return exam_clash[1] and two_exams[1]
+
+
+class FitnessCache:
+    """
+    A class used to remember the fitness of schedules that have already been scored.
+    Bounded, least recently used entries are dropped first.
+    Keyed by schedule_key, so rooms listed in a different order within a day share an entry.
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        output = f"Fitness Cache - Entries: {len(self.entries)}, Hits: {self.hits}, Misses: {self.misses}, Hit Rate: {self.hit_rate():.2%}"
+        return output
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, solution):
+        """
+        Look up the fitness of a solution.
+        :return: The cached fitness, or None on a miss.
+        """
+        key = schedule_key(solution)
+        fitness = self.entries.get(key)
+
+        if fitness is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        return fitness
+
+    def put(self, solution, fitness):
+        key = schedule_key(solution)
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def calculate_fitness(self, population, fitness_function):
+        """
+        Calculate fitness score for each solution, only passing cache misses to fitness_function.
+        Repeats of a missed schedule within the population are scored once.
+        :return: The population with a fitness score on each solution.
+        """
+        misses = {}
+        for solution in population:
+            fitness = self.get(solution)
+            if fitness is not None:
+                solution.fitness = fitness
+            else:
+                misses.setdefault(schedule_key(solution), []).append(solution)
+
+        if misses:
+            fitness_function([solutions[0] for solutions in misses.values()])
+
+            for solutions in misses.values():
+                fitness = solutions[0].fitness
+                self.put(solutions[0], fitness)
+                for solution in solutions[1:]:
+                    solution.fitness = fitness
+
+        return population
+
+
+class ParallelEvaluator:
+    """
+    A class used to score a population across a process pool.
+    The units, tutors and students are sent to each worker once, when the pool starts.
+    Only genomes and fitness values cross the process boundary after that.
+    evaluation picks how each worker scores its share - "scalar" or "batch".
+    Close the pool when finished, or use it as a context manager.
+    """
+    def __init__(self, units, tutors, unit_allocation, workers=None, evaluation="scalar"):
+        self.encoding = Encoding(units, tutors)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_fitness_worker,
+            initargs=(units, tutors, unit_allocation, evaluation))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        output = f"Workers: {self.workers}"
+        return output
+
+    def close(self):
+        self.executor.shutdown()
+
+    def calculate_fitness(self, population):
+        """
+        Calculate fitness score for each solution in the population.
+        :return: The population with a fitness score on each solution.
+        """
+        if not population:
+            return population
+
+        genomes = [(genome.genes, genome.day_offsets) for genome in
+            (solution if isinstance(solution, Genome) else encode_solution(solution, self.encoding) for solution in population)]
+
+        # A few chunks per worker evens out the load without paying the task overhead per solution.
+        chunk_size = ceil(len(genomes) / (self.workers * 4))
+        chunks = [genomes[i:i + chunk_size] for i in range(0, len(genomes), chunk_size)]
+
+        results = (fitness for chunk_fitness in self.executor.map(fitness_worker, chunks) for fitness in chunk_fitness)
+        for solution, fitness in zip(population, results):
+            solution.fitness = fitness
+
+        return population
+
+
+class Checkpointer:
+    """
+    A class used to save the genetic algorithm's state every `every` generations and / or `seconds` seconds.
+    The state is captured in the generation loop, then pickled and written by a background thread so the loop doesn't wait on the disk.
+    Only one write is in flight at a time. Close to wait for the last write, or use it as a context manager.
+    """
+    def __init__(self, path, every=None, seconds=None):
+        if every is None and seconds is None:
+            raise ValueError("Checkpointer needs every and / or seconds")
+        self.path = path
+        self.every = every
+        self.seconds = seconds
+        self.last_save = perf_counter()
+        self.writer = None
+        self.saved = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        output = f"Checkpoint: {self.path}, Every: {self.every} generations, {self.seconds} seconds, Saved: {self.saved}"
+        return output
+
+    def due(self, generation):
+        """
+        Check if a checkpoint should be saved after the generation.
+        :return: True if it is due.
+        """
+        if self.every is not None and generation % self.every == 0:
+            return True
+
+        return self.seconds is not None and perf_counter() - self.last_save >= self.seconds
+
+    def save(self, state):
+        """
+        Write the state in the background, after any write still in flight.
+        :return: None
+        """
+        self.wait()
+        self.last_save = perf_counter()
+        self.saved += 1
+        self.writer = threading.Thread(target=write_checkpoint, args=(self.path, state))
+        self.writer.start()
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def close(self):
+        self.wait()
+
+
+class PhaseTimer:
+    """
+    A class used to total the wall time spent in each phase of a generation.
+    Use as timer("phase") in a with statement.
+    """
+    __slots__ = ("timings", "phase", "start")
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.phase = None
+        self.start = 0.0
+
+    def __call__(self, phase):
+        self.phase = phase
+        return self
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings[self.phase] += perf_counter() - self.start
+
+
+class NullTimer:
+    """
+    A class used in place of a PhaseTimer when nothing is being timed.
+    """
+    __slots__ = ()
+
+    def __call__(self, phase):
+        return self
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Telemetry:
+    """
+    A class used to receive the genetic algorithm's events.
+    Subclass and override on_start, on_generation and on_finish to handle them - each is passed a dictionary record.
+    Generation records hold the best fitness, the fitness min / mean / max, diversity, the wall time of each phase,
+    the time of each constraint (scalar evaluation only), each constraint's result for the best solution, and the cache hit rate.
+    If enabled is False, the genetic algorithm doesn't measure or build generation records at all.
+    If profile_path is set, the run is profiled with cProfile and the stats saved there.
+    """
+    enabled = True
+
+    def __init__(self, profile_path=None):
+        self.profile_path = profile_path
+        self.profiler = None
+
+    def on_start(self, record):
+        if self.profile_path is not None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def on_generation(self, record):
+        pass
+
+    def on_finish(self, record):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+
+
+class PrintTelemetry(Telemetry):
+    """
+    A class used to print the genetic algorithm's progress each generation.
+    """
+    def on_generation(self, record):
+        constraints = record["constraints"]
+        island = f"Island: {record['island']}, " if "island" in record else ""
+        print(f"\n{island}Generation: {record['generation']},Current best fitness: {record['best_fitness']},Stagnant: {record['stagnant']}")
+        print(", ".join(f"{name}: {result['satisfied']}" for name, result in constraints.items()))
+        print(", ".join(f"{name}: {result['score']}" for name, result in constraints.items()))
+
+    def on_finish(self, record):
+        super().on_finish(record)
+        if record["satisfied"]:
+            print("All hard constraints satisfied")
+
+
+class QuietTelemetry(Telemetry):
+    """
+    A class used to run the genetic algorithm silently, without measuring anything per generation.
+    """
+    enabled = False
+
+
+class JSONLinesTelemetry(Telemetry):
+    """
+    A class used to write the genetic algorithm's events to a file, one JSON object per line.
+    Each object has an "event" of "start", "generation" or "finish".
+    Close the file when finished, or use it as a context manager.
+    """
+    def __init__(self, path, profile_path=None):
+        super().__init__(profile_path)
+        self.file = open(path, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def write(self, event, record):
+        self.file.write(json.dumps({"event": event, **record}, default=str))
+        self.file.write("\n")
+
+    def on_start(self, record):
+        self.write("start", record)
+        super().on_start(record)
+
+    def on_generation(self, record):
+        self.write("generation", record)
+
+    def on_finish(self, record):
+        super().on_finish(record)
+        self.write("finish", record)
+        self.file.flush()
     
 
-def load_data():
+def load_data(units_path=UNITS_FILE, tutors_path=TUTORS_FILE, students_path=STUDENT_UNITS_FILE, snapshot_path=None):
     """
     Load in the units, tutors, and students + units. Append them to lists.
+    The students are grouped by ID into a StudentTable, see load_students.
+    If snapshot_path is set, the parsed data is saved there as a binary snapshot, and later calls memory-map
+    the snapshot instead of parsing while the CSV files are unchanged.
     :return: Three lists - units, tutors, and students + units.
     """
+    if snapshot_path is not None:
+        sources = [source_stamp(path) for path in (units_path, tutors_path, students_path)]
+        snapshot = read_snapshot(snapshot_path, sources)
+        if snapshot is not None:
+            return snapshot
+
     # Load in units.
     units = []
-    with open("units.csv.csv", "r") as csvfile:
+    with open(units_path, "r") as csvfile:
         reader = csv.reader(csvfile)
         next(reader)
         for row in reader:
@@ -73,24 +1968,401 @@ def load_data():
 
     # Load in tutors.
     tutors = []
-    with open("tutor.csv.csv", "r") as csvfile:
+    with open(tutors_path, "r") as csvfile:
         reader = csv.reader(csvfile)
         next(reader)
         for row in reader:
             tutors.append(row[0])
     
     # Load in student + units.
-    student_units = []
-    with open("student_units.csv.csv", "r") as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader)
-        for row in reader:
-            new_student = StudentData(row[1], row[2])
-            student_units.append(new_student)
+    student_units = load_students(students_path)
+
+    if snapshot_path is not None:
+        write_snapshot(snapshot_path, sources, units, tutors, student_units)
     
     return units, tutors, student_units
 
 
+def iter_enrollments(students_path):
+    """
+    Stream the student + units CSV file, grouping consecutive rows with the same student ID.
+    Only one student's rows are held in memory at a time.
+    :return: A generator of (student ID, name, set of unit codes).
+    """
+    with open(students_path, "r") as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        for student_id, rows in groupby(reader, key=itemgetter(0)):
+            rows = list(rows)
+            yield student_id, rows[0][1], {row[2] for row in rows}
+
+
+def load_students(students_path):
+    """
+    Load the students and their units in one pass over the CSV file.
+    Unit codes are interned, and each student's units are stored once in the table's arrays.
+    Rows for a student ID that reappears later in the file are merged into the first occurrence.
+    While the IDs arrive in increasing order none can reappear, so the IDs are only indexed once one is out of order.
+    The rows are streamed, but the table itself holds every student.
+    Students outside the 1 - 4 unit rule are reported with a UserWarning.
+    :return: StudentTable object.
+    """
+    student_ids = []
+    names = []
+    codes = InternTable()
+    offsets = array("q", [0])
+    unit_ids = array("i")
+    positions = None
+    last_key = None
+    reappearing = defaultdict(set)
+
+    for student_id, name, unit_codes in iter_enrollments(students_path):
+        # IDs are ordered by length then value, which is numeric order for numeric IDs.
+        position = None
+        if positions is None:
+            key = (len(student_id), student_id)
+            if last_key is not None and key <= last_key:
+                positions = {seen_id: i for i, seen_id in enumerate(student_ids)}
+            last_key = key
+        if positions is not None:
+            position = positions.get(student_id)
+
+        if position is None:
+            if positions is not None:
+                positions[student_id] = len(student_ids)
+            student_ids.append(student_id)
+            names.append(name)
+            unit_ids.extend(sorted(codes.intern(code) for code in unit_codes))
+            offsets.append(len(unit_ids))
+        else:
+            reappearing[position].update(codes.intern(code) for code in unit_codes)
+
+    # Rebuild the unit arrays if any student's rows weren't consecutive.
+    if reappearing:
+        merged_offsets = array("q", [0])
+        merged_ids = array("i")
+        for position in range(len(student_ids)):
+            student_units = set(unit_ids[offsets[position]:offsets[position + 1]]) | reappearing.get(position, set())
+            merged_ids.extend(sorted(student_units))
+            merged_offsets.append(len(merged_ids))
+        offsets, unit_ids = merged_offsets, merged_ids
+
+    # A student is enrolled in at least one unit, but can be enrolled in up to four units.
+    invalid = sum(1 for position in range(len(student_ids)) if not 1 <= offsets[position + 1] - offsets[position] <= 4)
+    if invalid:
+        warnings.warn(f"{invalid} students are not enrolled in 1 to 4 units.", stacklevel=2)
+
+    return StudentTable(student_ids, names, codes.values, offsets, unit_ids)
+
+
+def source_stamp(path):
+    """
+    Helper function.
+    Identifies the version of an input file for snapshot validation.
+    :return: (absolute path, modification time in ns, size)
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def write_snapshot(snapshot_path, sources, units, tutors, student_units):
+    """
+    Save the parsed data as a binary snapshot.
+    The layout is SNAPSHOT_MAGIC, the header length, a pickled header, then the student table's
+    offsets as raw 8 byte ints and unit ids as raw 4 byte ints.
+    Written to a temporary file and renamed, so a crash can't leave a partial snapshot.
+    :return: None
+    """
+    header = pickle.dumps({"sources": sources, "units": units, "tutors": tutors, "student_ids": student_units.student_ids,
+        "names": student_units.names, "codes": student_units.codes, "count": len(student_units.unit_ids)}, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Pad so the arrays start 8 byte aligned.
+    start = len(SNAPSHOT_MAGIC) + 8 + len(header)
+    padding = -start % 8
+
+    temporary_path = snapshot_path + ".tmp"
+    with open(temporary_path, "wb") as snapshot:
+        snapshot.write(SNAPSHOT_MAGIC)
+        snapshot.write(struct.pack("<Q", len(header)))
+        snapshot.write(header)
+        snapshot.write(bytes(padding))
+        snapshot.write(array("q", student_units.offsets).tobytes())
+        snapshot.write(array("i", student_units.unit_ids).tobytes())
+    os.replace(temporary_path, snapshot_path)
+
+
+def read_snapshot(snapshot_path, sources):
+    """
+    Memory-map a binary snapshot written by write_snapshot.
+    The snapshot is only a cache, so a truncated or corrupt one is treated like a missing one.
+    :return: units, tutors, and a StudentTable, or None if the snapshot is missing, unreadable, or the CSV files have changed.
+    """
+    try:
+        with open(snapshot_path, "rb") as snapshot:
+            buffer = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("Not a snapshot.")
+
+        start = len(SNAPSHOT_MAGIC) + 8
+        header_length, = struct.unpack_from("<Q", buffer, len(SNAPSHOT_MAGIC))
+        if start + header_length > len(buffer):
+            raise ValueError("Truncated snapshot header.")
+        header = pickle.loads(buffer[start:start + header_length])
+        if header["sources"] != sources:
+            raise ValueError("Stale snapshot.")
+
+        # Check the arrays are all there before mapping them.
+        start += header_length
+        start += -start % 8
+        offsets_length = 8 * (len(header["names"]) + 1)
+        unit_ids_length = 4 * header["count"]
+        if start + offsets_length + unit_ids_length > len(buffer):
+            raise ValueError("Truncated snapshot arrays.")
+        units, tutors, student_ids, names, codes = header["units"], header["tutors"], header["student_ids"], header["names"], header["codes"]
+    except (pickle.UnpicklingError, EOFError, struct.error, KeyError, ValueError, TypeError, AttributeError, IndexError):
+        buffer.close()
+        return None
+
+    view = memoryview(buffer)
+    offsets = view[start:start + offsets_length].cast("q")
+    unit_ids = view[start + offsets_length:start + offsets_length + unit_ids_length].cast("i")
+
+    return units, tutors, StudentTable(student_ids, names, codes, offsets, unit_ids)
+
+
+def write_checkpoint(checkpoint_path, state):
+    """
+    Save the genetic algorithm's state, see checkpoint_state.
+    The layout is CHECKPOINT_MAGIC then the pickled state, with each solution stored as its genome's arrays.
+    Written to a temporary file, synced, and renamed, so a crash can't leave a partial checkpoint.
+    :return: None
+    """
+    temporary_path = checkpoint_path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint:
+        checkpoint.write(CHECKPOINT_MAGIC)
+        pickle.dump(state, checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+    os.replace(temporary_path, checkpoint_path)
+
+
+def read_checkpoint(checkpoint_path):
+    """
+    Load a checkpoint saved by write_checkpoint.
+    :return: The state dictionary, or None if there's no checkpoint.
+    """
+    try:
+        with open(checkpoint_path, "rb") as checkpoint:
+            if checkpoint.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+                raise ValueError(f"Not a checkpoint file: {checkpoint_path}")
+            return pickle.load(checkpoint)
+    except FileNotFoundError:
+        return None
+
+
+def checkpoint_state(generation, population, best_solution, stagnant, previous_best, encoding, parameters):
+    """
+    Capture everything the genetic algorithm needs to continue after a generation, including the random number generator.
+    Solutions are stored as genomes, in population order.
+    :return: A dictionary of the state.
+    """
+    genomes = [encode_solution(solution, encoding) for solution in population]
+    best_genome = encode_solution(best_solution, encoding)
+
+    return {
+        "generation": generation,
+        "population": [(genome.genes, genome.day_offsets, genome.fitness) for genome in genomes],
+        "best_solution": (best_genome.genes, best_genome.day_offsets, best_genome.fitness),
+        "stagnant": stagnant,
+        "previous_best": previous_best,
+        "random_state": random.getstate(),
+        "parameters": parameters,
+    }
+
+
+def student_key(student):
+    """
+    Helper function.
+    Identifies a student - by ID when loaded from the CSV file, otherwise by name.
+    :return: The student ID or name.
+    """
+    return student.name if student.student_id is None else student.student_id
+
+
+def student_unit_codes(student):
+    """
+    Helper function.
+    The unit codes a student is enrolled in, student.units may be a single code or a collection of codes.
+    :return: A list of unit codes.
+    """
+    if isinstance(student.units, str):
+        return [student.units]
+
+    return list(student.units)
+
+
+def build_conflict_index(unit_allocation):
+    """
+    Build the unit to student conflict index once so clash checks don't loop over every student.
+    :return: ConflictIndex object.
+    """
+    return ConflictIndex(unit_allocation)
+
+
+def run_lengths(values):
+    """
+    Helper function.
+    The distinct values of a NumPy array and how many times each appears, as np.unique with return_counts but by sorting.
+    :return: The sorted distinct values and their counts.
+    """
+    values = np.sort(values)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+
+def popcount(words):
+    """
+    Helper function.
+    The number of bits set in each element of an unsigned NumPy array.
+    :return: An array of bit counts, the shape of words.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).astype(np.int64)
+
+    bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8).reshape(*words.shape, -1), axis=-1)
+    return bits.sum(axis=-1, dtype=np.int64)
+
+
+def occupancy_masks(bits):
+    """
+    Helper function.
+    Combine the bitmasks of each exam in a timeslot.
+    :return: (busy, clashes) - the bits set at least once, and the bits set more than once.
+    """
+    busy = 0
+    clashes = 0
+    for mask in bits:
+        clashes |= busy & mask
+        busy |= mask
+
+    return busy, clashes
+
+
+def free_classrooms(room_mask):
+    """
+    Helper function.
+    The classrooms whose bit isn't set in room_mask, a bitmask of interned room ids.
+    :return: A list of classrooms.
+    """
+    return [classroom for classroom in CLASSROOMS if not room_mask >> ROOM_TABLE.intern(classroom) & 1]
+
+
+def room_mask(room_list):
+    """
+    Helper function.
+    The bitmask of the classrooms used by a day's exam rooms.
+    :return: int
+    """
+    mask = 0
+    for room in room_list:
+        mask |= 1 << room.room_id
+
+    return mask
+
+
+def encode_solution(solution, encoding):
+    """
+    Convert a solution into its compact genome.
+    :return: Genome object.
+    """
+    genes = array(encoding.typecode)
+    day_offsets = array("L", [0])
+
+    for day in encoding.days:
+        for room in solution.schedule[day]:
+            genes.extend((
+                encoding.room_ids[room.room_name],
+                encoding.unit_ids[room.morning_unit],
+                encoding.tutor_ids[room.morning_invigilator],
+                encoding.unit_ids[room.afternoon_unit],
+                encoding.tutor_ids[room.afternoon_invigilator]))
+        day_offsets.append(len(genes) // GENOME_FIELDS)
+
+    return Genome(genes, day_offsets, solution.fitness)
+
+
+def decode_genome(genome, encoding):
+    """
+    Convert a genome back into a solution of ExamRoom objects, e.g. for printing.
+    :return: Solution object.
+    """
+    solution = Solution(genome.fitness)
+
+    for day_index, day in enumerate(encoding.days):
+        exam_day = []
+        for room, morning_unit, morning_tutor, afternoon_unit, afternoon_tutor in genome.day_rows(day_index):
+            exam_day.append(ExamRoom(room_name=encoding.rooms[room],
+                morning_unit=encoding.units[morning_unit],
+                morning_invigilator=encoding.tutors[morning_tutor],
+                afternoon_unit=encoding.units[afternoon_unit],
+                afternoon_invigilator=encoding.tutors[afternoon_tutor]))
+        solution.schedule[day] = tuple(exam_day)
+
+    return solution
+
+
+def encode_population(population, encoding):
+    """
+    Convert a population of solutions into an ArrayPopulation.
+    A room used twice on a day is moved to a free room that day, or on another day if the day is full.
+    :return: ArrayPopulation object.
+    """
+    num_days, num_rooms = len(encoding.days), len(encoding.rooms)
+    exams = np.full((len(population), num_days, num_rooms, EXAM_FIELDS), -1, dtype=np.int32)
+
+    for i, solution in enumerate(population):
+        individual = exams[i]
+        for day_index, day in enumerate(encoding.days):
+            for room in solution.schedule[day]:
+                cell = day_index, encoding.room_ids[room.room_name]
+                if individual[cell][0] >= 0:
+                    free = np.argwhere(individual[..., 0] < 0)
+                    if len(free) == 0:
+                        raise ValueError("More exams than rooms to hold them.")
+                    same_day = free[free[:, 0] == day_index]
+                    cell = tuple(same_day[0] if len(same_day) else free[0])
+                individual[cell] = (encoding.unit_ids[room.morning_unit], encoding.tutor_ids[room.morning_invigilator],
+                    encoding.unit_ids[room.afternoon_unit], encoding.tutor_ids[room.afternoon_invigilator])
+
+    return ArrayPopulation(exams, np.array([solution.fitness for solution in population], dtype=np.float64))
+
+
+def decode_array_solution(population, index, encoding):
+    """
+    Convert one individual of an ArrayPopulation back into a solution, e.g. for printing.
+    :return: Solution object.
+    """
+    solution = Solution(float(population.fitness[index]))
+
+    for day_index, day in enumerate(encoding.days):
+        exam_day = []
+        for room_index, (morning_unit, morning_tutor, afternoon_unit, afternoon_tutor) in enumerate(population.exams[index, day_index].tolist()):
+            if morning_unit >= 0:
+                exam_day.append(ExamRoom(room_name=encoding.rooms[room_index],
+                    morning_unit=encoding.units[morning_unit],
+                    morning_invigilator=encoding.tutors[morning_tutor],
+                    afternoon_unit=encoding.units[afternoon_unit],
+                    afternoon_invigilator=encoding.tutors[afternoon_tutor]))
+        solution.schedule[day] = tuple(exam_day)
+
+    return solution
+
+
 def generate_exam_room(units, tutors, classroom):
     """
     Selecting a random morning & afternoon unit and tutor and creating an exam room.
@@ -118,16 +2390,22 @@ def generate_exam_room(units, tutors, classroom):
     return exam_room
 
 
-def generate_population(population_size, units, tutors):
+def generate_population(population_size, units, tutors, conflict_index=None, seeded_fraction=0.0):
     """
     Generate a random population.
     Picks a random room and selects a random morning and afternoon unit and invigilator.
+    seeded_fraction of the population is built with seeded_solution instead, which needs the conflict_index.
     :return: A new population. 
     """
     new_population = []
 
+    # Start with the seeded solutions.
+    num_seeded = round(population_size * seeded_fraction)
+    for individual in range(num_seeded):
+        new_population.append(seeded_solution(units, tutors, conflict_index))
+
     # Create a solution for each population.
-    for individual in range(population_size):
+    for individual in range(population_size - num_seeded):
         solution = Solution()
         available_units = units.copy()
 
@@ -143,7 +2421,7 @@ def generate_population(population_size, units, tutors):
                 random_num_classrooms = len(available_units)
             
             # To avoid multiple exams falling into the same classroom at the same time.
-            available_classrooms = random.choices(CLASSROOMS, k=random_num_classrooms)
+            available_classrooms = random.sample(CLASSROOMS, random_num_classrooms)
 
             #For each day, assign a random morning and afternoon unit & tutor.
             for classroom in available_classrooms:
@@ -160,13 +2438,195 @@ def generate_population(population_size, units, tutors):
                 if exam_room.afternoon_unit in available_units:
                     available_units.remove(exam_room.afternoon_unit)
 
-            # Set the exam day to a day in the solution class.        
-            solution.schedule[day] = exam_day
+            # Set the exam day to a day in the solution class.        
+            solution.schedule[day] = tuple(exam_day)
+
+        # Append the schedule to the new population.
+        new_population.append(solution)
+
+    return new_population
+
+
+def color_units(units, conflict_index, capacity):
+    """
+    Randomised DSatur colouring of the units into (day, session) timeslots.
+    The unit with the most timeslots ruled out by its conflicting units is placed next, ties broken by the number of conflicting units, then at random.
+    It goes in a timeslot with no conflicting unit and under capacity, preferring days with fewer of its students already sitting an exam,
+    then the emptier session of the day. If there is none, it goes in the timeslot with the fewest clashing students.
+    :return: A dictionary of unit code to (day, session).
+    """
+    slots = [(day, session) for day in EXAM_DAYS for session in SESSIONS]
+    codes = [unit[0] for unit in units]
+    conflicts = {code: conflict_index.conflicts.get(code, Counter()) for code in codes}
+
+    assignment = {}
+    slot_codes = defaultdict(set)
+    saturation = {code: set() for code in codes}
+    tie_breaks = {code: random.random() for code in codes}
+    uncoloured = set(codes)
+
+    while uncoloured:
+        code = max(uncoloured, key=lambda c: (len(saturation[c]), len(conflicts[c]), tie_breaks[c]))
+        uncoloured.remove(code)
+        neighbours = conflicts[code]
+
+        # Students of this unit already sitting another exam on each day.
+        day_students = Counter()
+        for other, students in neighbours.items():
+            if other in assignment:
+                day_students[assignment[other][0]] += students
+
+        def slot_cost(slot):
+            day, session = slot
+            other_session = slot_codes[(day, SESSIONS[1 - SESSIONS.index(session)])]
+            return day_students[day], len(slot_codes[slot]) - len(other_session), random.random()
+
+        free_slots = [slot for slot in slots if slot not in saturation[code] and len(slot_codes[slot]) < capacity]
+        if free_slots:
+            slot = min(free_slots, key=slot_cost)
+        else:
+            slot = min(slots, key=lambda s: (sum(neighbours[other] for other in slot_codes[s]), len(slot_codes[s]), random.random()))
+
+        assignment[code] = slot
+        slot_codes[slot].add(code)
+        for other in neighbours:
+            if other in uncoloured:
+                saturation[other].add(slot)
+
+    return assignment
+
+
+def balance_sessions(assignment, conflict_index):
+    """
+    Moves units between timeslots so each day has as many morning as afternoon exams, as every exam room holds one of each.
+    Units with the fewest clashing students in their new timeslot are moved first.
+    :return: A dictionary of (day, session) to a list of unit codes.
+    """
+    slot_codes = {(day, session): [] for day in EXAM_DAYS for session in SESSIONS}
+    for code, slot in assignment.items():
+        slot_codes[slot].append(code)
+
+    def clashes(code, slot):
+        neighbours = conflict_index.conflicts.get(code, Counter())
+        return sum(neighbours[other] for other in slot_codes[slot])
+
+    def move(source, target):
+        code = min(slot_codes[source], key=lambda c: (clashes(c, target), random.random()))
+        slot_codes[source].remove(code)
+        slot_codes[target].append(code)
+
+    # Days with an odd number of exams give a unit to another such day.
+    odd_days = [day for day in EXAM_DAYS if sum(len(slot_codes[(day, session)]) for session in SESSIONS) % 2]
+    for source_day, target_day in zip(odd_days[::2], odd_days[1::2]):
+        source = max(((source_day, session) for session in SESSIONS), key=lambda s: len(slot_codes[s]))
+        target = min(((target_day, session) for session in SESSIONS), key=lambda s: len(slot_codes[s]))
+        move(source, target)
+
+    # Then move units from the fuller session to the other.
+    for day in EXAM_DAYS:
+        morning, afternoon = (day, SESSIONS[0]), (day, SESSIONS[1])
+        while abs(len(slot_codes[morning]) - len(slot_codes[afternoon])) > 1:
+            if len(slot_codes[morning]) > len(slot_codes[afternoon]):
+                move(morning, afternoon)
+            else:
+                move(afternoon, morning)
+
+    return slot_codes
+
+
+def assign_invigilators(count, duties, tutors):
+    """
+    Pick count different invigilators for a timeslot, the ones with the fewest duties so far, ties broken at random.
+    Reuses invigilators only if there are more exams than tutors.
+    :return: A list of tutors.
+    """
+    ranked = sorted(tutors, key=lambda tutor: (duties[tutor], random.random()))
+    chosen = [ranked[i % len(ranked)] for i in range(count)]
+    for tutor in chosen:
+        duties[tutor] += 1
+
+    return chosen
+
+
+def seeded_solution(units, tutors, conflict_index):
+    """
+    Build a solution from the student conflict graph rather than at random.
+    Units are coloured into timeslots with color_units, balanced into exam rooms with balance_sessions,
+    then given different rooms within each day and the least used invigilators in each timeslot.
+    Units that don't fit - a session with more units than the other, or than there are classrooms - are carried into
+    the same session of the next day. Any still left after the last day are paired into free classrooms on the least clashing day,
+    an odd one out with the least conflicting unit as a duplicate.
+    Starts with every unit scheduled and few, if any, exam, tutor or room clashes.
+    :return: Solution object.
+    """
+    unit_lookup = {unit[0]: unit for unit in units}
+    capacity = max(len(CLASSROOMS), ceil(len(units) / (2 * len(EXAM_DAYS))))
+    slot_codes = balance_sessions(color_units(units, conflict_index, capacity), conflict_index)
+
+    solution = Solution()
+    duties = Counter()
+    carried = {session: [] for session in SESSIONS}
+    for day in EXAM_DAYS:
+        morning_codes = slot_codes[(day, SESSIONS[0])]
+        afternoon_codes = slot_codes[(day, SESSIONS[1])]
+        random.shuffle(morning_codes)
+        random.shuffle(afternoon_codes)
+        morning_codes = carried[SESSIONS[0]] + morning_codes
+        afternoon_codes = carried[SESSIONS[1]] + afternoon_codes
+
+        num_rooms = min(len(morning_codes), len(afternoon_codes), len(CLASSROOMS))
+        carried = {SESSIONS[0]: morning_codes[num_rooms:], SESSIONS[1]: afternoon_codes[num_rooms:]}
+        rooms = random.sample(CLASSROOMS, num_rooms)
+        morning_tutors = assign_invigilators(num_rooms, duties, tutors)
+        afternoon_tutors = assign_invigilators(num_rooms, duties, tutors)
+
+        solution.schedule[day] = tuple(ExamRoom(room_name=room,
+                morning_unit=unit_lookup[morning_code],
+                morning_invigilator=morning_tutor,
+                afternoon_unit=unit_lookup[afternoon_code],
+                afternoon_invigilator=afternoon_tutor)
+            for room, morning_code, morning_tutor, afternoon_code, afternoon_tutor
+            in zip(rooms, morning_codes, morning_tutors, afternoon_codes, afternoon_tutors))
+
+    leftover = carried[SESSIONS[0]] + carried[SESSIONS[1]]
+    if leftover:
+        place_leftover_units(solution, leftover, unit_lookup, tutors, conflict_index, duties)
+
+    return solution
+
+
+def place_leftover_units(solution, codes, unit_lookup, tutors, conflict_index, duties):
+    """
+    Helper function for seeded_solution.
+    Pairs the units into new exam rooms, each on the day with a free classroom where its units share the fewest students
+    with the exams already there. An odd unit out is paired with the least conflicting unit, as a duplicate.
+    Only if every classroom of every day is taken do rooms share a classroom.
+    :return: None
+    """
+    if len(codes) % 2:
+        partner = min((code for code in unit_lookup if code != codes[-1]), key=lambda code: len(conflict_index.conflicts.get(code, ())), default=codes[-1])
+        codes.append(partner)
+
+    def clashes(code, day, session):
+        neighbours = conflict_index.conflicts.get(code, Counter())
+        return sum(neighbours[getattr(room, f"{session}_unit")[0]] for room in solution.schedule[day])
 
-        # Append the schedule to the new population.
-        new_population.append(solution)
+    for morning_code, afternoon_code in zip(codes[::2], codes[1::2]):
+        free_days = [day for day in EXAM_DAYS if free_classrooms(room_mask(solution.schedule[day]))] or EXAM_DAYS
+        day = min(free_days, key=lambda d: (clashes(morning_code, d, SESSIONS[0]) + clashes(afternoon_code, d, SESSIONS[1]), random.random()))
+        room_list = solution.schedule[day]
 
-    return new_population
+        # The least used invigilators that aren't already invigilating in the timeslot.
+        invigilators = []
+        for session in SESSIONS:
+            busy = {getattr(room, f"{session}_invigilator") for room in room_list}
+            invigilators.extend(assign_invigilators(1, duties, [tutor for tutor in tutors if tutor not in busy] or tutors))
+
+        solution.schedule[day] = room_list + (ExamRoom(room_name=random.choice(free_classrooms(room_mask(room_list)) or CLASSROOMS),
+            morning_unit=unit_lookup[morning_code],
+            morning_invigilator=invigilators[0],
+            afternoon_unit=unit_lookup[afternoon_code],
+            afternoon_invigilator=invigilators[1]),)
 
 
 def hard_constraint_all_units(solution, units):
@@ -209,11 +2669,16 @@ def hard_constraint_unit_count(unit_allocation):
     valid = True
     invalid_num_units = 0
 
-    # Iterating through students and checking the number of units.
-    for student in unit_allocation:
-        if 1 > len(student.units) > 4:
-            valid = False
-            invalid_num_units += 1
+    # A StudentTable's students are counted from its offsets, otherwise iterate through students and check the number of units.
+    if isinstance(unit_allocation, StudentTable) and np is not None:
+        counts = np.diff(np.asarray(unit_allocation.offsets, dtype=np.int64))
+        invalid_num_units = int(((counts < 1) | (counts > 4)).sum())
+        valid = invalid_num_units == 0
+    else:
+        for student in unit_allocation:
+            if not 1 <= len(student_unit_codes(student)) <= 4:
+                valid = False
+                invalid_num_units += 1
 
     if not valid:
         score = round((1 / (1 + invalid_num_units) * 10) / 2, 2)
@@ -223,34 +2688,24 @@ def hard_constraint_unit_count(unit_allocation):
     return score, valid
 
 
-def hard_constraint_exam_clash(solution, unit_allocation):
+def hard_constraint_exam_clash(solution, unit_allocation, conflict_index=None, occupancy=None):
     """
     Hard constraint.
     A student cannot appear in more than one exam at a time.
+    Counts the students with more than one exam in each (day, session) timeslot from the solution's OccupancyIndex.
     :return: The score of the constraint and valid.
     """
     valid = True
-    timeslot_clashes = 0
-
-    # Iterating through each day and room
-    exam_counts = Counter()
-    for day in solution.schedule:
-        room_list = solution.schedule[day]
 
-        for room in room_list:
+    if occupancy is None:
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+        occupancy = OccupancyIndex(solution, conflict_index)
 
-            # Iterating through each student and counting the number of exams they have at a given timeslot.
-            for student in unit_allocation:
-                if room.morning_unit[0] in student.units:
-                    exam_counts[(student.name, "morning")] += 1
-                if room.afternoon_unit[0] in student.units:
-                    exam_counts[(student.name, "afternoon")] += 1
+    timeslot_clashes = occupancy.exam_clashes()
 
-    # More than 1 would indicate a timeslot clash.
-    for count in exam_counts.values():
-        if count > 1:
-            timeslot_clashes += 1
-            valid = False
+    if timeslot_clashes > 0:
+        valid = False
 
     if not valid:
         score = round((1 / (1 + timeslot_clashes) * 10) / 2, 2)
@@ -260,40 +2715,20 @@ def hard_constraint_exam_clash(solution, unit_allocation):
     return score, valid
 
 
-def hard_constraint_tutor_clash(solution):
+def hard_constraint_tutor_clash(solution, occupancy=None):
     """
     Hard constraint.
     A tutor can only invigilate one exam at a time.
-    Counts the number of times a tutor invigilates more than 1 exam at each time slot.
+    Counts the number of times a tutor invigilates more than 1 exam at each time slot, from the solution's OccupancyIndex.
     :return: The score of the constraint and valid.
     """
-    # Counting the number of clashes.
-    clashes = 0
     valid = True
 
-    # Looping through each exam day.
-    for day in solution.schedule:
-        room_list = solution.schedule[day]
-        morning_list = []
-        afternoon_list = []
+    if occupancy is None:
+        occupancy = OccupancyIndex(solution)
 
-        # Store the assigned tutors in the morning and afternoon lists.
-        for room in room_list:
-            morning_list.append(room.morning_invigilator)
-            afternoon_list.append(room.afternoon_invigilator)
-        
-        # Count the number of times each tutor is in the lists.
-        morning_duplicates = Counter(morning_list)
-        afternoon_duplicates = Counter(afternoon_list)
-
-        # Add 1 to clashes for any duplicates.
-        for count in morning_duplicates.values():
-            if count > 1:
-                clashes += 1
-        
-        for count in afternoon_duplicates.values():
-            if count > 1:
-                clashes += 1
+    # Counting the number of clashes.
+    clashes = occupancy.tutor_clashes()
 
     # Invalid exam timetable if there's a clash.
     if clashes > 0:
@@ -339,47 +2774,24 @@ def hard_constraint_duplicate_exams(solution):
     return score, valid
 
 
-def count_student_exams(solution, student, day):
-    """
-    Helper function.
-    Counting the number of exams for each student on a given day.
-    :return: count
-    """
-    # Listing all exams in a day.
-    exam_list = []
-    for room in solution.schedule[day]:
-        exam_list.extend([room.morning_unit[0], room.afternoon_unit[0]])
-
-    # Counting the number of exams assigned to the student.
-    count = sum(1 for exam in [student.units] if exam in exam_list)
-
-    return count
-
-
-def soft_constraint_two_exams(solution, unit_allocation):
+def soft_constraint_two_exams(solution, unit_allocation, conflict_index=None, occupancy=None):
     """
     Soft constraint.
     A Student should not sit in more than one exam consecutively in a day. 
+    Counts the students with more than one exam on each day from the solution's OccupancyIndex,
+    whether in the morning and afternoon or both in the same timeslot.
     :return: The score of the constraint and valid.
     """
 
     valid = True
 
-    # Storing the number of clashes in a day.
-    exam_count = defaultdict(int)
-
-    # For each student in each unit on each day.
-    for day in solution.schedule:
-        for student in unit_allocation:
-            # Count the number of exams for the student on the current day.
-            exam_count[student.name] += count_student_exams(solution, student, day)
+    if occupancy is None:
+        if conflict_index is None:
+            conflict_index = build_conflict_index(unit_allocation)
+        occupancy = OccupancyIndex(solution, conflict_index)
 
-    consecutive_exams = 0
-
-    for count in exam_count.values():
-        if count > 1:
-                # Add 1 to timeslot_clashes if true.
-                consecutive_exams += 1
+    # For each day, count the students with more than one exam.
+    consecutive_exams = sum(occupancy.day_clashes(day) for day in solution.schedule)
 
     # Invalid exam timetable if there's a timeslot clash.
     if consecutive_exams > 0:
@@ -393,15 +2805,17 @@ def soft_constraint_two_exams(solution, unit_allocation):
     return score, valid
 
 
-def soft_constraint_invigilation_duties(solution, units, tutors):
+def soft_constraint_invigilation_duties(solution, units, tutors, desired_average=None):
     """
     Soft constraint.
     Tutors should have an equal number of invigilation duties.
+    desired_average can be passed in, as it's the same for every solution.
     :return: The score of the constraint and valid.
     """
     # Counting the number of clashes.
     invigilator_list = []
-    desired_average = round(len(units) / len(tutors), 2)
+    if desired_average is None:
+        desired_average = round(len(units) / len(tutors), 2)
     valid = True
 
     # Looping through each exam day.
@@ -441,6 +2855,56 @@ def soft_constraint_invigilation_duties(solution, units, tutors):
 
 
 
+def constraint_scores_from_counts(missing, duplicates, exam_clashes, tutor_clashes, uc_score, consecutive, duties, distinct_tutors, desired_average):
+    """
+    Helper function.
+    Turns the violation counts of a solution into the same scores as the constraint functions.
+    :return: (au, de, ec, tc, uc, ce, ei) scores.
+    """
+    au_score = round((1 / (1 + missing) * 10) / 2, 2) if missing > 0 else round((1 / (1 + missing) * 10), 2)
+    de_score = round((1 / (1 + duplicates) * 10) / 2, 2) if duplicates > 1 else round((1 / (1 + duplicates) * 10), 2)
+    ec_score = round((1 / (1 + exam_clashes) * 10) / 2, 2) if exam_clashes > 0 else round((1 / (1 + exam_clashes) * 10), 2)
+    tc_score = round((1 / (1 + tutor_clashes) * 10) / 2, 2) if tutor_clashes > 0 else (1 / (1 + tutor_clashes) * 10)
+    ce_score = round((1 / (1 + consecutive) * 5) / 2, 2) if consecutive > 0 else round((1 / (1 + consecutive)) * 5, 2)
+
+    # Crossover has a chance to delete all exam rooms, this is to prevent a divide by zero error.
+    average = 100 if distinct_tutors == 0 else duties / distinct_tutors
+    rounded_average = round(average, 2)
+    absolute = abs(rounded_average - desired_average)
+    if rounded_average != desired_average:
+        ei_score = round((1 / (1 + absolute) * 5) / 2, 2)
+    else:
+        ei_score = round((1 / (1 + absolute * 5)), 2)
+
+    return au_score, de_score, ec_score, tc_score, uc_score, ce_score, ei_score
+
+
+def sum_scores(scores):
+    """
+    Helper function.
+    Adds the constraint scores in the same order as calculate_fitness.
+    :return: fitness
+    """
+    au_score, de_score, ec_score, tc_score, uc_score, ce_score, ei_score = scores
+    return au_score + de_score + ec_score + tc_score + uc_score + ce_score + ei_score
+
+
+def schedule_key(solution):
+    """
+    Helper function.
+    A canonical, hashable form of the schedule that ignores the order of rooms within a day.
+    Cached on the solution until it is invalidated.
+    :return: A tuple of sorted room id tuples for each day.
+    """
+    if solution.schedule_key is None:
+        solution.schedule_key = tuple(
+            tuple(sorted((room.room_id, room.morning_unit_id, room.morning_invigilator_id, room.afternoon_unit_id, room.afternoon_invigilator_id)
+                for room in solution.schedule[day]))
+            for day in EXAM_DAYS)
+
+    return solution.schedule_key
+
+
 def get_fitness(solution):
     """
     Get the current fitness value from the solution.
@@ -448,28 +2912,93 @@ def get_fitness(solution):
     return solution.fitness
 
 
+def top_k(population, k):
+    """
+    The k solutions with the highest fitness values, highest first.
+    A partial selection with a heap, O(n log k), that leaves the population's order alone.
+    :return: A list of solutions.
+    """
+    return heapq.nlargest(k, population, key=get_fitness)
+
+
 def elitism(population):
     """
     Elitism - get the top two solutions with the highest fitness values.
     :return: The two solutions with the highest fitness values.
     """
-    population.sort(key=get_fitness, reverse=True)
+    solution1, solution2 = top_k(population, 2)
+
+    return solution1, solution2
+
+
+def roulette_selection(population, k):
+    """
+    Roulette Wheel Selection.
+    Solutions are selected at random, with the higher fitness values having a greater chance of being selected.
+    O(n + k log n).
+    :return: k solutions.
+    """
+    return random.choices(population, weights=[s.fitness for s in population], k=k)
+
+
+def tournament_selection(population, k, tournament_size=3):
+    """
+    Tournament Selection.
+    Each selection is the fittest of tournament_size random solutions, drawn with replacement. O(k * tournament_size).
+    :return: k solutions.
+    """
+    entrants = random.choices(population, k=k * tournament_size)
+
+    return [max(entrants[i:i + tournament_size], key=get_fitness) for i in range(0, len(entrants), tournament_size)]
+
+
+def sus_selection(population, k):
+    """
+    Stochastic Universal Sampling.
+    Like the roulette wheel, but with k evenly spaced pointers from one random start,
+    so each solution is selected close to its expected number of times. O(n + k).
+    :return: k solutions.
+    """
+    fitness = [s.fitness for s in population]
+    total = sum(fitness)
+    if total <= 0:
+        return random.choices(population, k=k)
+
+    spacing = total / k
+    pointer = random.random() * spacing
+    selected = []
+    cumulative = 0
+    for solution, solution_fitness in zip(population, fitness):
+        cumulative += solution_fitness
+        while pointer < cumulative and len(selected) < k:
+            selected.append(solution)
+            pointer += spacing
+
+    # Rounding can leave the last pointer just past the end.
+    selected.extend(population[-1:] * (k - len(selected)))
+
+    return selected
+
 
-    return population[0], population[1]
+SELECTION_METHODS = {"roulette": roulette_selection, "tournament": tournament_selection, "sus": sus_selection}
 
 
-def selection(population):
+def selection(population, method="roulette"):
     """
-    Elitism and Roulette Wheel Selection.
+    Elitism and Selection.
     Selecting parents with a length of half the population.
+    method is "roulette", "tournament", "sus", or a function(population, k) returning k solutions.
     :return: parents
     """
+    if isinstance(method, str):
+        method = SELECTION_METHODS[method]
+
     #Appending the two solutions with the highest fitness values.
     parents = []    
     parents.extend(elitism(population))
 
-    #The rest of the population are selected at random, with the higher fitness values having a greater chance of being selected.
-    parents[2:] = random.choices(population, weights=[s.fitness for s in population], k=ceil(len(population) / 2 - 2))
+    #The rest of the population are selected by the selection method.
+    parents[2:] = method(population, ceil(len(population) / 2 - 2))
     return parents
 
 
@@ -483,7 +3012,7 @@ def crossover(parent_a, parent_b):
     # Setting a random crossover point in EXAM_DAYS and creating child variables.
     crossover_point = random.randint(1, len(EXAM_DAYS))
     child_a = Solution()
-    child_b = deepcopy(child_a)
+    child_b = Solution()
 
     # For each exam day, get the exam list from both parents.
     for i, day in enumerate(EXAM_DAYS):
@@ -492,17 +3021,25 @@ def crossover(parent_a, parent_b):
 
         # Child_a gets the exam list before the crossover point from parent_a
         # The remaining exams are given from parent_b
-        child_a.schedule[day] = deepcopy(exams_list_a if i < crossover_point else exams_list_b)
+        # Day schedules are immutable, so the children share them with their parents.
+        child_a.schedule[day] = exams_list_a if i < crossover_point else exams_list_b
 
         # Child_b gets the opposite.
-        child_b.schedule[day] = deepcopy(exams_list_b if i < crossover_point else exams_list_a)
+        child_b.schedule[day] = exams_list_b if i < crossover_point else exams_list_a
+
+    # So do their OccupancyIndex timeslots, if the parents have them.
+    occupancy_a, occupancy_b = parent_a.occupancy, parent_b.occupancy
+    if occupancy_a is not None and occupancy_b is not None and occupancy_a.conflict_index is occupancy_b.conflict_index:
+        child_a.occupancy = occupancy_a.crossed(occupancy_b, EXAM_DAYS[crossover_point:])
+        child_b.occupancy = occupancy_b.crossed(occupancy_a, EXAM_DAYS[crossover_point:])
 
     return child_a, child_b
 
 
-def apply_crossover(population, crossover_probability):
+def apply_crossover(population, crossover_probability, repair=None):
     """
     Applies crossover to two random solutions dependent on the probability.
+    Pass a CrossoverRepair to repair the duplicate and missing units of the children.
     :return: A new population.
     """
     crossover_population = []
@@ -511,7 +3048,10 @@ def apply_crossover(population, crossover_probability):
     for i in range(len(population)):
         if random.random() < crossover_probability:
             parent_a, parent_b = random.sample(population, 2)
-            crossover_population.extend(crossover(parent_a, parent_b))
+            children = crossover(parent_a, parent_b)
+            if repair is not None:
+                children = [repair.repair(child) for child in children]
+            crossover_population.extend(children)
         else:
             solution_a, solution_b = random.sample(population, 2)
             crossover_population.extend([solution_a, solution_b])
@@ -530,37 +3070,62 @@ def mutation(solution, mutation_probability, tutors):
     :return: A mutated solution.
     """
 
-    # Create an empty mutated copy
-    mutated_solution = deepcopy(solution)
-    for day in mutated_solution.schedule:
-        room_list = mutated_solution.schedule[day]
-        room_list.clear()
+    # The mutated days are built as new lists, the parent's days and rooms are shared and never changed.
+    # The child's OccupancyIndex is the parent's, kept in sync with each change.
+    mutated_days = {day: [] for day in solution.schedule}
+    changed_days = set()
+    occupancy = solution.occupancy_index().copy()
 
     # A random chance to change an exam room to another random day of the week.
+    touched_slots = set()
     for day in solution.schedule:
         room_list = solution.schedule[day]
         possible_days = [d for d in EXAM_DAYS if d != day]
-        for room in room_list:
+        for i, room in enumerate(room_list):
             if random.random() < mutation_probability:
                 new_day = random.choice(possible_days)
-                mutated_solution.schedule[new_day].append(room)
+                # The day's rooms as recorded - those kept or moved in so far, then the ones still to come.
+                kept = len(mutated_days[day])
+                occupancy.remove_room(day, mutated_days[day] + list(room_list[i:]), kept)
+                occupancy.add_room(new_day, room)
+                mutated_days[new_day].append(room)
+                changed_days.update((day, new_day))
+                touched_slots.update((d, session) for d in (day, new_day) for session in SESSIONS)
             else:
-                mutated_solution.schedule[day].append(room)
+                mutated_days[day].append(room)
 
-    # Change the room to another random room.
-    for day in mutated_solution.schedule:
-        room_list = mutated_solution.schedule[day]
-        for room in room_list:
+    # Change the room to another random room that is free on the day.
+    for day, room_list in mutated_days.items():
+        for i, room in enumerate(room_list):
             if random.random() < mutation_probability:
-                room.room_name = random.choice(CLASSROOMS)
+                free = occupancy.free_rooms(day)
+                if free:
+                    new_room = room.replace(room_name=random.choice(free))
+                    occupancy.replace_room(day, room_list, i, new_room)
+                    room_list[i] = new_room
+                    changed_days.add(day)
+                    touched_slots.update((day, session) for session in SESSIONS)
 
     # Change the exam invigilators of each day to another.
-    for day in mutated_solution.schedule:
-        room_list = mutated_solution.schedule[day]
-        for room in room_list:
+    for day, room_list in mutated_days.items():
+        for i, room in enumerate(room_list):
             if random.random() < mutation_probability:
-                room.morning_invigilator = random.choice(tutors)
-                room.afternoon_invigilator = random.choice(tutors)
+                new_room = room.replace(morning_invigilator=random.choice(tutors), afternoon_invigilator=random.choice(tutors))
+                occupancy.replace_room(day, room_list, i, new_room)
+                room_list[i] = new_room
+                changed_days.add(day)
+                touched_slots.update((day, session) for session in SESSIONS)
+
+    # Unchanged days are shared with the parent.
+    mutated_solution = Solution(solution.fitness)
+    mutated_solution.schedule = {day: tuple(room_list) if day in changed_days else solution.schedule[day] for day, room_list in mutated_days.items()}
+    mutated_solution.occupancy = occupancy
+    if solution.fitness_state is not None:
+        mutated_solution.fitness_state = solution.fitness_state.copy()
+        mutated_solution.touched_slots = set(solution.touched_slots)
+
+    # Report the timeslots that changed, so the cached constraint counts can be updated by the delta.
+    mutated_solution.invalidate(touched_slots)
 
     return mutated_solution
 
@@ -584,113 +3149,958 @@ def apply_mutation(population, mutation_probability, tutors):
     return mutated_population
 
 
-def constraints_check(solution, units, unit_allocation, tutors):
+def array_selection(population, rng):
+    """
+    Elitism and Roulette Wheel Selection on an ArrayPopulation, as selection.
+    Selecting parents with a length of half the population, the two fittest first.
+    :return: The parents as an ArrayPopulation.
+    """
+    fitness = population.fitness
+    num_parents = max(2, ceil(len(population) / 2))
+
+    elite = np.argpartition(fitness, -2)[-2:]
+    elite = elite[np.argsort(fitness[elite])[::-1]]
+    total = fitness.sum()
+    chosen = rng.choice(len(population), size=num_parents - 2, p=fitness / total if total > 0 else None)
+
+    return population.take(np.concatenate((elite, chosen)))
+
+
+def array_crossover(population, crossover_probability, rng):
+    """
+    Crossover on an ArrayPopulation, as apply_crossover.
+    Each parent makes two children from two random parents, crossing over at a random day with the chance crossover_probability.
+    Every random number is drawn in one call, and the days are swapped with one masked select.
+    :return: The children as an ArrayPopulation.
+    """
+    num_parents, num_days = population.exams.shape[:2]
+
+    # Parent a, the offset to a different parent b, whether to cross over, and the crossover point.
+    draws = rng.random((num_parents, 4), dtype=np.float32)
+    parent_a = (draws[:, 0] * num_parents).astype(np.int64)
+    parent_b = (parent_a + 1 + (draws[:, 1] * (num_parents - 1)).astype(np.int64)) % num_parents
+    crossover_point = np.where(draws[:, 2] < crossover_probability, 1 + (draws[:, 3] * num_days).astype(np.int64), num_days)
+
+    # Child a takes the days before the crossover point from parent a and the rest from parent b, child b the opposite.
+    exams_a, exams_b = population.exams[parent_a], population.exams[parent_b]
+    from_a = (np.arange(num_days) < crossover_point[:, None])[:, :, None, None]
+    children = np.stack((np.where(from_a, exams_a, exams_b), np.where(from_a, exams_b, exams_a)), axis=1)
+
+    return ArrayPopulation(children.reshape(-1, *population.exams.shape[1:]))
+
+
+def move_exams(exams, sources, targets):
+    """
+    Helper function.
+    Moves the exams at sources to targets, both (individual, day, room) index arrays, with one scatter.
+    A move onto a room that is taken, or that an earlier move has claimed, is dropped.
+    :return: The number of exams moved.
+    """
+    flat_targets = np.ravel_multi_index(targets, exams.shape[:3])
+    free = np.flatnonzero(exams[targets][:, 0] < 0)
+    _, first = np.unique(flat_targets[free], return_index=True)
+    keep = free[first]
+
+    sources = tuple(index[keep] for index in sources)
+    targets = tuple(index[keep] for index in targets)
+    exams[targets] = exams[sources]
+    exams[sources] = -1
+
+    return len(keep)
+
+
+def array_mutation(population, mutation_probability, num_tutors, rng):
+    """
+    Mutation on an ArrayPopulation in place, as apply_mutation.
+    Each individual has the chance mutation_probability of mutating, and each of its exams then has that chance of:
+        Moving to the same room on another random day.
+        Moving to another random room on its day.
+        Having its invigilators replaced by random tutors.
+    Every random number is drawn in one call, and each change is one array scatter.
+    A move onto a room that is already taken is dropped, rather than searching for a free room.
+    :return: The mutated population.
+    """
+    exams = population.exams
+    num_individuals, num_days, num_rooms = exams.shape[:3]
+
+    # Whether each individual mutates, then per exam a draw for a day move, a room move, new invigilators, and the afternoon invigilator.
+    # A draw below mutation_probability picks the change, and the draw divided by mutation_probability is a fresh random number for its target.
+    draws = rng.random(num_individuals * (1 + num_days * num_rooms * 4), dtype=np.float32)
+    mutates = draws[:num_individuals] < mutation_probability
+    draws = draws[num_individuals:].reshape(num_individuals, num_days, num_rooms, 4)
+    draws[~mutates] = 1
+    rescale = 1 / mutation_probability if mutation_probability > 0 else 0
+
+    # A random chance to change an exam room to another random day of the week.
+    individuals, days, rooms = np.nonzero((draws[..., 0] < mutation_probability) & population.occupied())
+    new_days = (days + 1 + (draws[individuals, days, rooms, 0] * rescale * (num_days - 1)).astype(np.int64)) % num_days
+    move_exams(exams, (individuals, days, rooms), (individuals, new_days, rooms))
+
+    # Change the room to another random room, if it is free on the day.
+    individuals, days, rooms = np.nonzero((draws[..., 1] < mutation_probability) & population.occupied())
+    new_rooms = (rooms + 1 + (draws[individuals, days, rooms, 1] * rescale * (num_rooms - 1)).astype(np.int64)) % num_rooms
+    move_exams(exams, (individuals, days, rooms), (individuals, days, new_rooms))
+
+    # Change the exam invigilators to random tutors.
+    individuals, days, rooms = np.nonzero((draws[..., 2] < mutation_probability) & population.occupied())
+    tutors = (draws[individuals, days, rooms, 2:] * np.array([rescale * num_tutors, num_tutors], dtype=np.float32)).astype(exams.dtype)
+    np.minimum(tutors, num_tutors - 1, out=tutors)
+    exams[individuals, days, rooms, 1] = tutors[:, 0]
+    exams[individuals, days, rooms, 3] = tutors[:, 1]
+
+    return population
+
+
+def array_statistics(population):
+    """
+    Helper function.
+    The fitness min, mean and max of an ArrayPopulation, and its diversity - the fraction of distinct schedules.
+    :return: A dictionary of the statistics.
+    """
+    fitness = population.fitness
+    rows = np.ascontiguousarray(population.exams).reshape(len(population), -1)
+    distinct = len(np.unique(rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize)))))
+
+    return {"min": float(fitness.min()), "mean": float(fitness.mean()), "max": float(fitness.max()), "diversity": distinct / len(population)}
+
+
+def constraints_check(solution, units, unit_allocation, tutors, conflict_index=None, verbose=True):
     """
     Checks if all hard and soft constraints are satisfied.
+    Prints the result of each constraint if verbose, otherwise stops at the first constraint that isn't satisfied.
     :return: If true, the genetic algorithm will return the solution.
     """      
-    au_score, all_units = hard_constraint_all_units(solution, units)
-    de_score, duplicate_exams = hard_constraint_duplicate_exams(solution)
-    ec_score, exam_clash = hard_constraint_exam_clash(solution, unit_allocation)
-    tc_score, tutor_clash = hard_constraint_tutor_clash(solution)
-    uc_score, unit_count = hard_constraint_unit_count(unit_allocation)  
-
-    ce_score, consecutive_exams = soft_constraint_two_exams(solution, unit_allocation)
-    ei_score, equal_invigilators = soft_constraint_invigilation_duties(solution, units, tutors)
-    
-
-    print(f"All Units: {all_units}, Duplicate Exams: {duplicate_exams}, Exam Clash: {exam_clash}, Tutor Clash: {tutor_clash}, Unit Count: {unit_count}, Consecutive Exams: {consecutive_exams}, Equal Invigilators: {equal_invigilators}")
-    print(f"All Units: {au_score}, Duplicate Exams: {de_score}, Exam Clash: {ec_score}, Tutor Clash: {tc_score}, Unit Count: {uc_score}, Consecutive Exams: {ce_score}, Equal Invigilators: {ei_score}")
+    evaluator = scalar_evaluator(units, tutors, unit_allocation, conflict_index)
+    if not verbose:
+        return evaluator.check(solution)
 
-    if all_units and unit_count and exam_clash and duplicate_exams and tutor_clash and consecutive_exams and equal_invigilators:
-        return True
+    results = evaluator.results(solution)
+    print(", ".join(f"{name}: {result['satisfied']}" for name, result in results.items()))
+    print(", ".join(f"{name}: {result['score']}" for name, result in results.items()))
 
-    return False
+    return all(result["satisfied"] for result in results.values())
 
 
-def calculate_fitness(population, units, unit_allocation, tutors):
+def calculate_fitness(population, units, unit_allocation, tutors, conflict_index=None, constraint_timings=None):
     """
     Calculate fitness score for each solution in the population.
+    Pass constraint_timings, a dictionary, to add the time taken by each constraint function to it.
     :return: The population with a fitness score on each solution.
     """
-    for solution in population:
-        au_score, _ = hard_constraint_all_units(solution, units)
-        de_score, _ = hard_constraint_duplicate_exams(solution)
-        ec_score, _ = hard_constraint_exam_clash(solution, unit_allocation)
-        tc_score, _ = hard_constraint_tutor_clash(solution)
-        uc_score, _ = hard_constraint_unit_count(unit_allocation)
+    evaluator = scalar_evaluator(units, tutors, unit_allocation, conflict_index)
+    evaluator.constraint_timings = constraint_timings
 
-        ce_score, _ = soft_constraint_two_exams(solution, unit_allocation)
-        ei_score, _ = soft_constraint_invigilation_duties(solution, units, tutors)
+    return evaluator.calculate_fitness(population)
 
-        fitness = au_score + de_score + ec_score + tc_score + uc_score + ce_score + ei_score        
-        solution.fitness = fitness                           
 
-    return population
+# The ScalarEvaluator of the last calculate_fitness or constraints_check call, and the data it was built for.
+_scalar_evaluator = {}
+
+
+def scalar_evaluator(units, tutors, unit_allocation, conflict_index=None):
+    """
+    Helper function.
+    A ScalarEvaluator for the data, reused while calculate_fitness and constraints_check are passed the same objects,
+    so the conflict index and unit count aren't rebuilt on every call. Pass new objects when the data changes.
+    :return: ScalarEvaluator object.
+    """
+    data = (units, tutors, unit_allocation, conflict_index)
+    if "data" not in _scalar_evaluator or any(new is not old for new, old in zip(data, _scalar_evaluator["data"])):
+        _scalar_evaluator["evaluator"] = ScalarEvaluator(units, tutors, unit_allocation, conflict_index)
+        _scalar_evaluator["data"] = data
+
+    return _scalar_evaluator["evaluator"]
+
+
+# Problem data held by each process pool worker, see init_fitness_worker.
+_worker_data = {}
+
+
+def init_fitness_worker(units, tutors, unit_allocation, evaluation):
+    """
+    Process pool initializer.
+    Builds the worker's copy of the problem data, and its evaluator, once when the pool starts.
+    :return: None
+    """
+    encoding = Encoding(units, tutors)
+    _worker_data["encoding"] = encoding
+
+    # Batch scoring works on genomes directly, scalar scoring needs them decoded into solutions.
+    _worker_data["decode"] = evaluation != "batch"
+    if evaluation == "batch":
+        _worker_data["fitness_function"] = BatchEvaluator(units, tutors, unit_allocation, encoding=encoding).calculate_fitness
+    else:
+        _worker_data["fitness_function"] = ScalarEvaluator(units, tutors, unit_allocation).calculate_fitness
+
+
+def fitness_worker(genomes):
+    """
+    Process pool task.
+    Scores a chunk of (genes, day_offsets) genomes with the worker's problem data.
+    :return: A tuple of fitness values.
+    """
+    population = [Genome(genes, day_offsets) for genes, day_offsets in genomes]
+    if _worker_data["decode"]:
+        population = [decode_genome(genome, _worker_data["encoding"]) for genome in population]
+
+    _worker_data["fitness_function"](population)
+
+    return tuple(solution.fitness for solution in population)
+
+
+def make_fitness_function(evaluation, units, tutors, unit_allocation, conflict_index, fitness_cache=None, constraint_timings=None):
+    """
+    Pick how fitness is scored.
+    evaluation is "scalar" one solution at a time, "batch" the whole population with NumPy,
+    "delta" re-counting only the timeslots that mutation touched, or an evaluator object with calculate_fitness.
+    constraint_timings is passed to the ScalarEvaluator for "scalar", and ignored otherwise.
+    :return: A function that scores a population in place and returns it.
+    """
+    if not isinstance(evaluation, str):
+        fitness_function = evaluation.calculate_fitness
+    elif evaluation == "batch":
+        fitness_function = BatchEvaluator(units, tutors, unit_allocation, conflict_index).calculate_fitness
+    elif evaluation == "delta":
+        fitness_function = DeltaEvaluator(units, tutors, unit_allocation, conflict_index).calculate_fitness
+    else:
+        fitness_function = ScalarEvaluator(units, tutors, unit_allocation, conflict_index, constraint_timings).calculate_fitness
+
+    if fitness_cache is not None:
+        fitness_function = partial(fitness_cache.calculate_fitness, fitness_function=fitness_function)
+
+    return fitness_function
+
+
+def evolve_generation(population, crossover_probability, mutation_probability, tutors, fitness_function, timer=NULL_TIMER, local_search=None,
+                      repair=None, selection_method="roulette"):
+    """
+    One generation of the genetic algorithm.
+    Scores the population, applies selection, crossover, and mutation, and scores the new population.
+    Crossover children are only scored once mutated, as nothing reads their scores before then.
+    selection_method is passed to selection.
+    Pass a CrossoverRepair to repair the crossover children, a LocalSearch to improve the best mutated solutions,
+    and a PhaseTimer to total the time of each phase.
+    :return: The mutated population with a fitness score on each solution.
+    """
+    # Calculate the fitness of each solution.
+    with timer("evaluation"):
+        population_fitness = fitness_function(population)
+
+    # Selection
+    with timer("selection"):
+        parents = selection(population_fitness, selection_method)
+
+    # Crossover
+    with timer("crossover"):
+        crossover_population = apply_crossover(parents, crossover_probability, repair)
+
+    # Mutation
+    with timer("mutation"):
+        mutated_population = apply_mutation(crossover_population, mutation_probability, tutors)
+    with timer("evaluation"):
+        mutated_fitness = fitness_function(mutated_population)
+
+    # Local search
+    if local_search is not None:
+        with timer("local_search"):
+            local_search.apply(mutated_fitness)
 
+    return mutated_fitness
 
-def genetic_algorithm(population_size, max_generations, crossover_probability, mutation_probability, units, tutors, unit_allocation):
+
+def population_statistics(population):
+    """
+    Helper function.
+    The fitness min, mean and max of a population, and its diversity - the fraction of distinct schedules.
+    :return: A dictionary of the statistics.
+    """
+    fitness = [solution.fitness for solution in population]
+    distinct = len({schedule_key(solution) for solution in population})
+
+    return {"min": min(fitness), "mean": sum(fitness) / len(fitness), "max": max(fitness), "diversity": distinct / len(population)}
+
+
+def cache_statistics(fitness_cache, hits=0, misses=0):
+    """
+    Helper function.
+    The lookups a fitness cache has had since it had hits and misses.
+    :return: A dictionary of the hits, misses and hit rate.
+    """
+    hits = fitness_cache.hits - hits
+    misses = fitness_cache.misses - misses
+
+    return {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+
+def genetic_algorithm(population_size, max_generations, crossover_probability, mutation_probability, units, tutors, unit_allocation, conflict_index=None,
+                      evaluation="scalar", fitness_cache=None, telemetry=None, checkpointer=None, resume_state=None, seeded_fraction=0.0,
+                      local_search=None, repair=None, selection_method="roulette", initial_population=None):
     """
     The genetic algorithm.
     Generates a random population. 
     Checks fitness.
     Applies selection, crossover, and mutation.
     Checks new fitness and replaces the old population.
+    evaluation picks how fitness is scored - "scalar" one solution at a time, "batch" the whole population with NumPy,
+    or "delta" re-counting only the timeslots that mutation touched.
+    It can also be an evaluator object, e.g. a ParallelEvaluator, whose calculate_fitness scores a population.
+    Pass a FitnessCache to skip schedules that have already been scored.
+    telemetry receives the progress of each generation, see Telemetry. Printed with PrintTelemetry by default.
+    Pass a Checkpointer to save the run's state periodically, and resume_state (from read_checkpoint) to continue a run,
+    see resume_genetic_algorithm.
+    seeded_fraction of the first population is built from the student conflict graph, see seeded_solution.
+    Pass initial_population to start from those solutions instead of a random population, see resolve_timetable.
+    Pass a LocalSearch to improve the best solutions of each generation, and a CrossoverRepair to repair the crossover children.
+    selection_method picks the parents, see selection.
     :return: The best solution.
     """
+    if telemetry is None:
+        telemetry = PrintTelemetry()
 
     best_solution = None
     previous_best = None
     stagnant = 0
+    satisfied = False
+    generation = 0
+    start_generation = 0
+    parameters = {"population_size": population_size, "max_generations": max_generations,
+        "crossover_probability": crossover_probability, "mutation_probability": mutation_probability,
+        "selection_method": selection_method, "repair": repair is not None, "local_search": local_search is not None}
+    encoding = Encoding(units, tutors) if checkpointer is not None or resume_state is not None else None
+
+    # Index the students of each unit once for the clash checks.
+    if conflict_index is None:
+        conflict_index = build_conflict_index(unit_allocation)
+
+    # Measure each generation only if telemetry is listening.
+    timer = PhaseTimer() if telemetry.enabled else NULL_TIMER
+    constraint_timings = defaultdict(float) if telemetry.enabled else None
+
+    fitness_function = make_fitness_function(evaluation, units, tutors, unit_allocation, conflict_index, fitness_cache, constraint_timings)
+    checker = ScalarEvaluator(units, tutors, unit_allocation, conflict_index)
+
+    run_start = perf_counter()
+    if resume_state is not None:
+        start_generation = generation = resume_state["generation"]
+
+    telemetry.on_start({**parameters, "evaluation": evaluation if isinstance(evaluation, str) else type(evaluation).__name__,
+        "units": len(units), "tutors": len(tutors), "students": len(unit_allocation), "start_generation": start_generation})
+
+    try:
+        # Generate population, start from the given one, or restore it from a checkpoint.
+        if resume_state is None and initial_population is not None:
+            population = [list(initial_population)]
+        elif resume_state is None:
+            population = [generate_population(population_size, units, tutors, conflict_index, seeded_fraction)]
+        else:
+            population = [[decode_genome(Genome(*genome), encoding) for genome in resume_state["population"]]]
+            best_solution = decode_genome(Genome(*resume_state["best_solution"]), encoding)
+            stagnant = resume_state["stagnant"]
+            previous_best = resume_state["previous_best"]
+            random.setstate(resume_state["random_state"])
+
+        # For each generation.
+        for i in range(start_generation, max_generations):
+            generation = i + 1
+            generation_start = perf_counter()
+            if fitness_cache is not None:
+                hits, misses = fitness_cache.hits, fitness_cache.misses
+
+            # Selection, crossover and mutation.
+            mutated_fitness = evolve_generation(population[0], crossover_probability, mutation_probability, tutors, fitness_function, timer,
+                local_search, repair, selection_method)
+
+            # Get the solution with the highest fitness and assign it as best_solution.
+            solution1, _ = elitism(mutated_fitness)
+            if best_solution is None:
+                stagnant = 0
+                best_solution = solution1.copy()
+            
+            # Replace if a better solution is found.
+            elif solution1.fitness > best_solution.fitness:
+                stagnant = 0
+                best_solution = solution1.copy()
+            
+            # Add 1 to stagnant if there's no improvement to fitness.
+            if best_solution.fitness == previous_best:
+                stagnant += 1
+            
+            # Set the current solution to the previous best to check stagnation 
+            previous_best = best_solution.fitness
+
+            # Check if all hard and soft constraints are fulfilled.
+            if telemetry.enabled:
+                constraints = checker.results(best_solution)
+                satisfied = all(result["satisfied"] for result in constraints.values())
+
+                record = {"generation": generation, "best_fitness": best_solution.fitness, "stagnant": stagnant,
+                    "fitness": population_statistics(mutated_fitness), "phases": dict(timer.timings),
+                    "constraint_times": dict(constraint_timings), "constraints": constraints, "time": perf_counter() - generation_start}
+                if fitness_cache is not None:
+                    record["cache"] = cache_statistics(fitness_cache, hits, misses)
+                telemetry.on_generation(record)
+                timer.timings.clear()
+                constraint_timings.clear()
+            else:
+                satisfied = checker.check(best_solution)
 
-    # Generate population.
-    population = [generate_population(population_size, units, tutors)]
+            # Return the optimal solution if so.
+            if satisfied:
+                return best_solution
 
-    # For each generation.
-    for i in range(max_generations):
+            # If not then replace population.
+            population.clear()
+            population.append(mutated_fitness)
 
-        # Calculate the fitness of each solution.
-        population_fitness = calculate_fitness(population[0], units, unit_allocation, tutors)
+            if checkpointer is not None and checkpointer.due(generation):
+                checkpointer.save(checkpoint_state(generation, mutated_fitness, best_solution, stagnant, previous_best, encoding, parameters))
 
-        # Selection
-        parents = selection(population_fitness)
+        return best_solution
 
-        # Crossover
-        crossover_population = apply_crossover(parents, crossover_probability)
-        crossover_fitness = calculate_fitness(crossover_population, units, unit_allocation, tutors)
+    finally:
+        if checkpointer is not None:
+            checkpointer.wait()
+        record = {"generations": generation, "best_fitness": None if best_solution is None else best_solution.fitness,
+            "satisfied": satisfied, "time": perf_counter() - run_start}
+        if fitness_cache is not None:
+            record["cache"] = cache_statistics(fitness_cache)
+        telemetry.on_finish(record)
 
-        # Mutation
-        mutated_population = apply_mutation(crossover_fitness, mutation_probability, tutors)
-        mutated_fitness = calculate_fitness(mutated_population, units, unit_allocation, tutors)
 
-        # Get the solution with the highest fitness and assign it as best_solution.
-        solution1, _ = elitism(mutated_fitness)
-        if best_solution is None:
-            stagnant = 0
-            best_solution = deepcopy(solution1)
-        
-        # Replace if a better solution is found.
-        elif solution1.fitness > best_solution.fitness:
-            stagnant = 0
-            best_solution = deepcopy(solution1)
-        
-        # Add 1 to stagnant if there's no improvement to fitness.
-        if best_solution.fitness == previous_best:
-            stagnant += 1
-        
-        # Set the current solution to the previous best to check stagnation 
-        previous_best = deepcopy(best_solution.fitness)
-        print(f"\nGeneration: {i+1},Current best fitness: {best_solution.fitness},Stagnant: {stagnant}")
-        
-        # Check if all hard and soft constraints are fulfilled and return optimal solution if so.
-        if constraints_check(best_solution, units, unit_allocation, tutors):
-            print("All hard constraints satisfied")
+def resume_genetic_algorithm(checkpoint_path, units, tutors, unit_allocation, conflict_index=None, evaluation="scalar", fitness_cache=None,
+                             telemetry=None, checkpointer=None, max_generations=None, local_search=None, repair=None, selection_method=None):
+    """
+    Continue a genetic algorithm run from its checkpoint, with the parameters it was started with.
+    Gives the same result as the run would have without stopping, for the same units, tutors and students.
+    max_generations can extend the run, and selection_method defaults to the run's.
+    The run's repair and local search must be passed again - a CrossoverRepair and LocalSearch if it used them, otherwise None.
+    :return: The best solution.
+    """
+    state = read_checkpoint(checkpoint_path)
+    if state is None:
+        raise FileNotFoundError(f"No checkpoint at {checkpoint_path}")
+
+    parameters = state["parameters"]
+    if max_generations is None:
+        max_generations = parameters["max_generations"]
+    if selection_method is None:
+        selection_method = parameters.get("selection_method", "roulette")
+
+    # Checkpoints from before these were recorded can't be checked.
+    for name, operator in (("repair", repair), ("local_search", local_search)):
+        if name in parameters and parameters[name] != (operator is not None):
+            used = "used" if parameters[name] else "did not use"
+            raise ValueError(f"The checkpointed run {used} {name.replace('_', ' ')}, pass the same {name} to resume it.")
+
+    return genetic_algorithm(parameters["population_size"], max_generations, parameters["crossover_probability"], parameters["mutation_probability"],
+        units, tutors, unit_allocation, conflict_index, evaluation, fitness_cache, telemetry, checkpointer, resume_state=state, local_search=local_search,
+        repair=repair, selection_method=selection_method)
+
+
+def diff_data(old_data, new_data):
+    """
+    The changes between two sets of problem data, each the (units, tutors, students + units) that load_data returns.
+    :return: DataChanges object.
+    """
+    old_units, old_tutors, old_students = old_data
+    new_units, new_tutors, new_students = new_data
+    old_codes = {unit[0] for unit in old_units}
+    new_codes = {unit[0] for unit in new_units}
+
+    # Units whose students changed, of the units in both.
+    old_index, new_index = build_conflict_index(old_students), build_conflict_index(new_students)
+    changed_units = {code for code in old_codes & new_codes if old_index.unit_students.get(code, set()) != new_index.unit_students.get(code, set())}
+
+    return DataChanges(new_codes - old_codes, old_codes - new_codes, set(new_tutors) - set(old_tutors), set(old_tutors) - set(new_tutors), changed_units)
+
+
+def adapt_solution(solution, units, tutors, unit_allocation, conflict_index=None):
+    """
+    Fit a previous timetable to changed problem data, keeping as much of it as possible.
+    Exams of units no longer in units are removed, and new units are placed in the least clashing timeslots, see CrossoverRepair.
+    Invigilators no longer in tutors are replaced by the tutor free in that timeslot with the fewest duties.
+    :return: The adapted solution.
+    """
+    if conflict_index is None:
+        conflict_index = build_conflict_index(unit_allocation)
+
+    adapted = CrossoverRepair(units, tutors, unit_allocation, conflict_index).repair(solution).copy()
+
+    # Duties and timeslots of the remaining invigilators.
+    available = set(tutors)
+    duties = Counter()
+    busy = defaultdict(set)
+    for day, room_list in adapted.schedule.items():
+        for room in room_list:
+            for session in SESSIONS:
+                tutor = getattr(room, f"{session}_invigilator")
+                if tutor in available:
+                    duties[tutor] += 1
+                    busy[(day, session)].add(tutor)
+
+    # Replace the invigilators that are no longer available.
+    for day, room_list in adapted.schedule.items():
+        rooms = list(room_list)
+        for i, room in enumerate(rooms):
+            for session in SESSIONS:
+                if getattr(room, f"{session}_invigilator") in available:
+                    continue
+                free = [tutor for tutor in tutors if tutor not in busy[(day, session)]] or tutors
+                tutor = min(free, key=lambda tutor: duties[tutor])
+                rooms[i] = room = room.replace(**{f"{session}_invigilator": tutor})
+                duties[tutor] += 1
+                busy[(day, session)].add(tutor)
+        adapted.schedule[day] = tuple(rooms)
+
+    adapted.invalidate()
+    return adapted
+
+
+def resolve_timetable(previous_solution, units, tutors, unit_allocation, changes=None, population_size=30, max_generations=20,
+                      crossover_probability=0.8, mutation_probability=0.5, perturbation=0.1, slot_penalty=0.5, change_penalty=0.1,
+                      conflict_index=None, evaluation="delta", telemetry=None):
+    """
+    Re-solve a timetable after the units, tutors or enrollments change, starting from the previous best solution.
+    The previous solution is adapted to the new data, see adapt_solution, and the population is that solution and mutations of it
+    with the chance perturbation, instead of a random population.
+    Fitness is less a StabilityPenalty of slot_penalty per exam that moved timeslot and change_penalty per exam that changed room or invigilator,
+    so the new timetable stays close to the previous one. Exams of the units in changes, see diff_data, move without a penalty.
+    With "delta" evaluation the perturbed solutions share the adapted solution's constraint counts, and only re-count the timeslots they change.
+    If nothing changed and the previous solution satisfies every constraint, it is returned as it is.
+    :return: The best solution.
+    """
+    if conflict_index is None:
+        conflict_index = build_conflict_index(unit_allocation)
+
+    adapted = adapt_solution(previous_solution, units, tutors, unit_allocation, conflict_index)
+    checker = ScalarEvaluator(units, tutors, unit_allocation, conflict_index)
+    if changes is not None and not changes and checker.check(adapted):
+        return previous_solution
+
+    fitness_function = make_fitness_function(evaluation, units, tutors, unit_allocation, conflict_index)
+    stability = StabilityPenalty(previous_solution, fitness_function, slot_penalty, change_penalty,
+        exempt=() if changes is None else changes.affected_units())
+
+    # Score the adapted solution once, so its perturbations start from its constraint counts.
+    stability.calculate_fitness([adapted])
+    population = [adapted] + [mutation(adapted, perturbation, tutors) for _ in range(population_size - 1)]
+
+    return genetic_algorithm(population_size, max_generations, crossover_probability, mutation_probability, units, tutors, unit_allocation,
+        conflict_index, evaluation=stability, telemetry=telemetry, repair=CrossoverRepair(units, tutors, unit_allocation, conflict_index),
+        initial_population=population)
+
+
+def tournament_pick(population):
+    """
+    Helper function.
+    Binary tournament - the fitter of two random solutions.
+    :return: A solution.
+    """
+    solution_a, solution_b = random.sample(population, 2)
+    return solution_a if solution_a.fitness >= solution_b.fitness else solution_b
+
+
+def steady_state_algorithm(population_size, max_steps, crossover_probability, mutation_probability, units, tutors, unit_allocation, conflict_index=None,
+                           evaluation="scalar", fitness_cache=None, telemetry=None, repair=None, offspring=2, report_interval=None):
+    """
+    The steady state genetic algorithm, an alternative to genetic_algorithm.
+    Keeps a fixed size population. Each step picks two parents by binary tournament, applies crossover and mutation to make
+    `offspring` children, scores only them, and replaces the worst solutions in place if the children are fitter.
+    Children identical to a parent or to each other are dropped unscored, so the population never holds the same schedule twice over.
+    The worst solutions are found with a min-heap of (fitness, index), so a step costs O(offspring log population_size),
+    and the population and heap never grow.
+    evaluation, fitness_cache and repair are as for genetic_algorithm.
+    telemetry gets a generation record every report_interval steps, population_size // offspring by default.
+    :return: The best solution.
+    """
+    if telemetry is None:
+        telemetry = PrintTelemetry()
+    if report_interval is None:
+        report_interval = max(1, population_size // offspring)
+
+    if conflict_index is None:
+        conflict_index = build_conflict_index(unit_allocation)
+
+    timer = PhaseTimer() if telemetry.enabled else NULL_TIMER
+    constraint_timings = defaultdict(float) if telemetry.enabled else None
+    fitness_function = make_fitness_function(evaluation, units, tutors, unit_allocation, conflict_index, fitness_cache, constraint_timings)
+    checker = ScalarEvaluator(units, tutors, unit_allocation, conflict_index)
+
+    # Children only matter if they beat the worst solution, so scalar evaluation can skip the student-based constraints of the rest.
+    if evaluation == "scalar" and fitness_cache is None:
+        fitness_function = ScalarEvaluator(units, tutors, unit_allocation, conflict_index, constraint_timings).calculate_fitness
+        bounded = True
+    else:
+        bounded = False
+
+    run_start = perf_counter()
+    telemetry.on_start({"population_size": population_size, "max_steps": max_steps, "crossover_probability": crossover_probability,
+        "mutation_probability": mutation_probability, "evaluation": evaluation if isinstance(evaluation, str) else type(evaluation).__name__,
+        "units": len(units), "tutors": len(tutors), "students": len(unit_allocation), "offspring": offspring})
+
+    best_solution = None
+    satisfied = False
+    stagnant = 0
+    step = 0
+    report_best = None
+
+    try:
+        # Generate and score the population, and order it worst first in the heap.
+        population = fitness_function(generate_population(population_size, units, tutors))
+        heap = [(solution.fitness, i) for i, solution in enumerate(population)]
+        heapq.heapify(heap)
+        best_solution = max(population, key=get_fitness)
+        satisfied = checker.check(best_solution)
+        if satisfied:
             return best_solution
+        interval_start = perf_counter()
+        if fitness_cache is not None:
+            hits, misses = fitness_cache.hits, fitness_cache.misses
+
+        for step in range(1, max_steps + 1):
+            # Selection
+            with timer("selection"):
+                parents = [tournament_pick(population) for _ in range(offspring)]
+
+            # Crossover
+            with timer("crossover"):
+                children = []
+                for i in range(0, offspring, 2):
+                    parent_a, parent_b = parents[i], parents[(i + 1) % offspring]
+                    if random.random() < crossover_probability:
+                        pair = crossover(parent_a, parent_b)
+                        if repair is not None:
+                            pair = [repair.repair(child) for child in pair]
+                    else:
+                        pair = [parent_a, parent_b]
+                    children.extend(pair)
+                children = children[:offspring]
+
+            # Mutation
+            with timer("mutation"):
+                children = apply_mutation(children, mutation_probability, tutors)
+
+            # An unchanged child is its parent, already in the population.
+            seen = {schedule_key(parent) for parent in parents}
+            unique = []
+            for child in children:
+                key = schedule_key(child)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(child)
+            children = unique
+
+            with timer("evaluation"):
+                children = fitness_function(children, heap[0][0]) if bounded else fitness_function(children)
+
+            # Replace the worst solutions with fitter children.
+            for child in children:
+                worst_fitness, worst = heap[0]
+                if child.fitness > worst_fitness:
+                    population[worst] = child
+                    heapq.heapreplace(heap, (child.fitness, worst))
+
+                    if child.fitness > best_solution.fitness:
+                        best_solution = child
+                        satisfied = checker.check(best_solution)
+
+            if satisfied:
+                break
+
+            # Report every interval of steps as a generation.
+            if step % report_interval == 0:
+                stagnant = stagnant + 1 if best_solution.fitness == report_best else 0
+                report_best = best_solution.fitness
+                if telemetry.enabled:
+                    record = {"generation": step // report_interval, "step": step, "best_fitness": best_solution.fitness, "stagnant": stagnant,
+                        "fitness": population_statistics(population), "phases": dict(timer.timings), "constraint_times": dict(constraint_timings),
+                        "constraints": checker.results(best_solution),
+                        "time": perf_counter() - interval_start}
+                    if fitness_cache is not None:
+                        record["cache"] = cache_statistics(fitness_cache, hits, misses)
+                        hits, misses = fitness_cache.hits, fitness_cache.misses
+                    telemetry.on_generation(record)
+                    timer.timings.clear()
+                    constraint_timings.clear()
+                interval_start = perf_counter()
+
+        return best_solution
+
+    finally:
+        record = {"generations": step // report_interval, "steps": step, "best_fitness": None if best_solution is None else best_solution.fitness,
+            "satisfied": satisfied, "time": perf_counter() - run_start}
+        if fitness_cache is not None:
+            record["cache"] = cache_statistics(fitness_cache)
+        telemetry.on_finish(record)
+
+
+def vectorized_algorithm(population_size, max_generations, crossover_probability, mutation_probability, units, tutors, unit_allocation,
+                         conflict_index=None, telemetry=None, seeded_fraction=0.0):
+    """
+    The genetic algorithm on an ArrayPopulation, an alternative to genetic_algorithm for large populations. Requires NumPy.
+    Selection, crossover and mutation are vectorized over the whole population, see array_selection, array_crossover and array_mutation,
+    and fitness is scored with a BatchEvaluator. Only the best solution is converted back into a Solution, for reporting.
+    The operators draw from a NumPy generator seeded from random, so random.seed still repeats a run.
+    telemetry and seeded_fraction are as for genetic_algorithm.
+    :return: The best solution.
+    """
+    if np is None:
+        raise ImportError("The vectorized genetic algorithm requires NumPy.")
+    if telemetry is None:
+        telemetry = PrintTelemetry()
 
-        # If not then replace population.
-        else:
-            population.clear()
-            population.append(mutated_fitness)
+    if conflict_index is None:
+        conflict_index = build_conflict_index(unit_allocation)
+
+    encoding = Encoding(units, tutors)
+    evaluator = BatchEvaluator(units, tutors, unit_allocation, conflict_index, encoding)
+    checker = ScalarEvaluator(units, tutors, unit_allocation, conflict_index)
+    timer = PhaseTimer() if telemetry.enabled else NULL_TIMER
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    best_solution = None
+    previous_best = None
+    stagnant = 0
+    satisfied = False
+    generation = 0
+
+    run_start = perf_counter()
+    telemetry.on_start({"population_size": population_size, "max_generations": max_generations, "crossover_probability": crossover_probability,
+        "mutation_probability": mutation_probability, "evaluation": "vectorized", "units": len(units), "tutors": len(tutors),
+        "students": len(unit_allocation), "start_generation": 0})
+
+    try:
+        # Generate and score the population.
+        population = encode_population(generate_population(population_size, units, tutors, conflict_index, seeded_fraction), encoding)
+        with timer("evaluation"):
+            evaluator.array_fitness(population)
+
+        for i in range(max_generations):
+            generation = i + 1
+            generation_start = perf_counter()
+
+            # Selection, crossover and mutation.
+            with timer("selection"):
+                parents = array_selection(population, rng)
+            with timer("crossover"):
+                children = array_crossover(parents, crossover_probability, rng)
+            with timer("mutation"):
+                array_mutation(children, mutation_probability, len(tutors), rng)
+            with timer("evaluation"):
+                evaluator.array_fitness(children)
+
+            # Replace the best solution if a better one is found.
+            best = int(np.argmax(children.fitness))
+            if best_solution is None or children.fitness[best] > best_solution.fitness:
+                stagnant = 0
+                best_solution = decode_array_solution(children, best, encoding)
+
+            # Add 1 to stagnant if there's no improvement to fitness.
+            if best_solution.fitness == previous_best:
+                stagnant += 1
+            previous_best = best_solution.fitness
+
+            # Check if all hard and soft constraints are fulfilled.
+            if telemetry.enabled:
+                constraints = checker.results(best_solution)
+                satisfied = all(result["satisfied"] for result in constraints.values())
+                telemetry.on_generation({"generation": generation, "best_fitness": best_solution.fitness, "stagnant": stagnant,
+                    "fitness": array_statistics(children), "phases": dict(timer.timings), "constraint_times": {}, "constraints": constraints,
+                    "time": perf_counter() - generation_start})
+                timer.timings.clear()
+            else:
+                satisfied = checker.check(best_solution)
+
+            if satisfied:
+                return best_solution
+
+            population = children
+
+        return best_solution
+
+    finally:
+        telemetry.on_finish({"generations": generation, "best_fitness": None if best_solution is None else best_solution.fitness,
+            "satisfied": satisfied, "time": perf_counter() - run_start})
+
+
+def run_island(island_id, seed, population_size, max_generations, crossover_probability, mutation_probability, units, tutors, unit_allocation,
+               evaluation, migration_interval, migration_size, inboxes, neighbours, sources, reports, stop_event):
+    """
+    Process target for island_algorithm.
+    Runs the genetic algorithm loop on one sub-population, exchanging its best solutions with its neighbours every migration_interval generations.
+    Reports its best solution to the coordinator, and stops early once any island satisfies every constraint.
+    Always finishes with a ("done", island, satisfied, error) report. error is None, or the exception and its traceback,
+    and an error stops every island.
+    :return: None
+    """
+    satisfied = False
+    error = None
+    try:
+        random.seed(seed)
+        conflict_index = build_conflict_index(unit_allocation)
+        encoding = Encoding(units, tutors)
+        fitness_function = make_fitness_function(evaluation, units, tutors, unit_allocation, conflict_index)
+        checker = ScalarEvaluator(units, tutors, unit_allocation, conflict_index)
+
+        population = generate_population(population_size, units, tutors)
+        best_solution = None
+
+        for i in range(max_generations):
+            if stop_event.is_set():
+                break
+
+            population = evolve_generation(population, crossover_probability, mutation_probability, tutors, fitness_function)
+
+            solution1 = max(population, key=get_fitness)
+            if best_solution is None or solution1.fitness > best_solution.fitness:
+                best_solution = solution1.copy()
+                genome = encode_solution(best_solution, encoding)
+                reports.put(("best", island_id, i + 1, genome.genes, genome.day_offsets, best_solution.fitness))
+
+                # Check if all hard and soft constraints are fulfilled and stop every island if so.
+                if checker.check(best_solution):
+                    satisfied = True
+                    stop_event.set()
+                    break
+
+            # Migration - send the best solutions to each neighbour, and replace the worst solutions with the ones received.
+            if (i + 1) % migration_interval == 0 and i + 1 < max_generations:
+                population.sort(key=get_fitness, reverse=True)
+                migrants = [encode_solution(solution, encoding) for solution in population[:migration_size]]
+                for neighbour in neighbours:
+                    inboxes[neighbour].put([(genome.genes, genome.day_offsets, genome.fitness) for genome in migrants])
+
+                received = []
+                for _ in range(sources):
+                    while not stop_event.is_set():
+                        try:
+                            received.extend(inboxes[island_id].get(timeout=0.1))
+                            break
+                        except queue.Empty:
+                            continue
+
+                received = received[:len(population)]
+                if received:
+                    population[-len(received):] = [decode_genome(Genome(genes, day_offsets, fitness), encoding) for genes, day_offsets, fitness in received]
+
+    except Exception as exception:
+        # Send the exception itself if it can be pickled, so the coordinator can raise it.
+        try:
+            pickle.dumps(exception)
+        except Exception:
+            exception = RuntimeError(f"{type(exception).__name__}: {exception}")
+        error = exception, traceback.format_exc()
+        stop_event.set()
+    finally:
+        # Don't wait for migrants that nobody will read before exiting.
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+        reports.put(("done", island_id, satisfied, error))
+
+
+def island_algorithm(num_islands, population_size, max_generations, crossover_probability, mutation_probability, units, tutors, unit_allocation,
+                     migration_interval=5, migration_size=2, topology="ring", evaluation="scalar", seed=None, telemetry=None):
+    """
+    The island model genetic algorithm.
+    Runs num_islands independent sub-populations of population_size, each in its own process.
+    Every migration_interval generations the islands send their migration_size best solutions to their neighbours.
+    topology is "ring" (each island sends to the next) or "full" (each island sends to every other island).
+    The run stops on every island once one of them satisfies all constraints.
+    If an island raises an exception, or its process dies, every island is stopped and the error is raised here.
+    telemetry gets a generation record each time an island improves on its best solution, with the island, the best fitness
+    across the islands, and the island reports since that last improved as stagnant. Printed with PrintTelemetry by default.
+    :return: The best solution across the islands.
+    """
+    if telemetry is None:
+        telemetry = PrintTelemetry()
+
+    if topology == "ring":
+        neighbours = [[(island + 1) % num_islands] for island in range(num_islands)]
+    elif topology == "full":
+        neighbours = [[other for other in range(num_islands) if other != island] for island in range(num_islands)]
+    else:
+        raise ValueError(f"Unknown migration topology: {topology}")
+    sources = [sum(island in targets for targets in neighbours) for island in range(num_islands)]
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    inboxes = [multiprocessing.Queue() for _ in range(num_islands)]
+    reports = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+
+    islands = [multiprocessing.Process(target=run_island, args=(island, seed + island, population_size, max_generations, crossover_probability,
+            mutation_probability, units, tutors, unit_allocation, evaluation, migration_interval, migration_size, inboxes, neighbours[island],
+            sources[island], reports, stop_event))
+        for island in range(num_islands)]
+    run_start = perf_counter()
+    telemetry.on_start({"num_islands": num_islands, "population_size": population_size, "max_generations": max_generations,
+        "crossover_probability": crossover_probability, "mutation_probability": mutation_probability, "migration_interval": migration_interval,
+        "migration_size": migration_size, "topology": topology, "evaluation": evaluation if isinstance(evaluation, str) else type(evaluation).__name__,
+        "seed": seed, "units": len(units), "tutors": len(tutors), "students": len(unit_allocation)})
+    for island in islands:
+        island.start()
+
+    # Coordinate the global best until every island has finished.
+    encoding = Encoding(units, tutors)
+    checker = ScalarEvaluator(units, tutors, unit_allocation) if telemetry.enabled else None
+    best_solution = None
+    satisfied = False
+    finished = set()
+    error = None
+    stagnant = 0
+    generation = 0
+    try:
+        while len(finished) < num_islands and error is None:
+            try:
+                report = reports.get(timeout=0.5)
+            except queue.Empty:
+                # An island that exited without its done report has died, e.g. it was killed.
+                # Its last reports can still be in the queue, so only fail once the queue stays empty.
+                dead = [island for island, process in enumerate(islands) if island not in finished and process.exitcode is not None]
+                if dead and reports.empty():
+                    island = dead[0]
+                    error = RuntimeError(f"Island {island} exited with code {islands[island].exitcode} before finishing."), None
+                continue
+
+            if report[0] == "done":
+                _, island, island_satisfied, island_error = report
+                finished.add(island)
+                satisfied = satisfied or island_satisfied
+                if island_error is not None:
+                    error = island_error
+                continue
+
+            _, island, island_generation, genes, day_offsets, fitness = report
+            generation = max(generation, island_generation)
+            if best_solution is None or fitness > best_solution.fitness:
+                best_solution = decode_genome(Genome(genes, day_offsets, fitness), encoding)
+                stagnant = 0
+            else:
+                stagnant += 1
+
+            if telemetry.enabled:
+                telemetry.on_generation({"generation": island_generation, "island": island, "island_fitness": fitness,
+                    "best_fitness": best_solution.fitness, "stagnant": stagnant, "constraints": checker.results(best_solution),
+                    "time": perf_counter() - run_start})
+
+    finally:
+        # Stop the other islands if one failed, or the coordinator was interrupted.
+        if error is not None or len(finished) < num_islands:
+            stop_event.set()
+        for island in islands:
+            island.join(timeout=5)
+            if island.is_alive():
+                island.terminate()
+                island.join()
+        telemetry.on_finish({"generations": generation, "best_fitness": None if best_solution is None else best_solution.fitness,
+            "satisfied": satisfied, "time": perf_counter() - run_start})
+
+    if error is not None:
+        exception, island_traceback = error
+        if island_traceback is None:
+            raise exception
+        raise exception from RuntimeError(f"Island traceback:\n{island_traceback}")
 
     return best_solution
 
@@ -703,7 +4113,9 @@ def main():
     :return: None
     """
     # Load the data.
-    unit_list, tutor_list, student_units = load_data()
+    unit_list, tutor_list, student_units = load_data(snapshot_path=SNAPSHOT_FILE)
+    conflict_index = build_conflict_index(student_units)
+    fitness_cache = FitnessCache()
 
     # Set parameters.
     population_size = 100
@@ -712,12 +4124,13 @@ def main():
     mutation_prob = 0.5
 
     # Generate Solution.
-    solution = genetic_algorithm(population_size, max_generations, crossover_prob, mutation_prob, unit_list, tutor_list, student_units)
+    solution = genetic_algorithm(population_size, max_generations, crossover_prob, mutation_prob, unit_list, tutor_list, student_units, conflict_index, fitness_cache=fitness_cache)
 
     # Print Results.
     print("\n")
     print(solution)
     print(f"\nPopulation Size: {population_size}\nMax Generations: {max_generations}\nCrossover Probability: {crossover_prob}\nMutation Probability: {mutation_prob}")
+    print(fitness_cache)
 
 
 if __name__ == "__main__":
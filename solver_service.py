@@ -0,0 +1,612 @@
+"""
+A long-running local solver service for the exam timetable genetic algorithm.
+
+Keeps the parsed data and conflict indexes warm in its worker processes, runs solve jobs with their own parameters
+on a pool with a concurrency limit, and streams each job's progress. Jobs can be cancelled, and their results are JSON.
+
+    python solver_service.py --port 8765 --workers 2
+    python solver_service.py --socket /tmp/exam_timetable.sock
+
+API, over HTTP on a TCP port or a Unix socket:
+    POST   /jobs              Submit a job, the body is a JSON object of parameters, see JOB_DEFAULTS.
+    GET    /jobs              Every job's status.
+    GET    /jobs/<id>         A job's status, and its result once done.
+    GET    /jobs/<id>/events  A job's progress events as JSON lines, streamed until the job finishes.
+    DELETE /jobs/<id>         Cancel a job.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import exam_timetable as et
+
+
+# Parameters of a job and their defaults. units, tutors and students are the CSV files to solve.
+JOB_DEFAULTS = {
+    "algorithm": "genetic",
+    "population_size": 100,
+    "max_generations": 50,
+    "crossover_probability": 0.8,
+    "mutation_probability": 0.5,
+    "evaluation": "scalar",
+    "selection_method": "roulette",
+    "seeded_fraction": 0.0,
+    "seed": None,
+    "units": et.UNITS_FILE,
+    "tutors": et.TUTORS_FILE,
+    "students": et.STUDENT_UNITS_FILE,
+}
+ALGORITHMS = ["genetic", "steady_state", "vectorized"]
+EVALUATIONS = ["scalar", "delta", "batch"]
+FINISHED = {"done", "failed", "cancelled"}
+WORKER_CONTEXT = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None)
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+    503: "Service Unavailable"}
+
+
+class JobCancelled(Exception):
+    """
+    Raised in a worker to stop a job that has been cancelled.
+    """
+
+
+class ServiceUnavailable(Exception):
+    """
+    Raised when the service can't start a job, e.g. its process pool can't be rebuilt.
+    """
+
+
+class QueueTelemetry(et.Telemetry):
+    """
+    A class used to send a job's progress from a worker process to the service, as (job id, event, record) messages.
+    Stops the job at the next generation once its cancel_event is set.
+    """
+    def __init__(self, job_id, progress, cancel_event):
+        super().__init__()
+        self.job_id = job_id
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+    def send(self, event, record):
+        self.progress.put((self.job_id, event, record))
+
+    def on_start(self, record):
+        self.send("start", record)
+
+    def on_generation(self, record):
+        self.send("generation", record)
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.job_id)
+
+    def on_finish(self, record):
+        self.send("finish", record)
+
+
+class Job:
+    """
+    A class used to track a solve job in the service.
+    events holds the job's progress records in order, and changed is set and replaced each time one arrives.
+    """
+    def __init__(self, job_id, parameters):
+        self.job_id = job_id
+        self.parameters = parameters
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.future = None
+        self.executor = None
+        self.cancel_event = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.changed = asyncio.Event()
+
+    def __repr__(self):
+        output = f"Job: {self.job_id}, Status: {self.status}, Events: {len(self.events)}"
+        return output
+
+    def done(self):
+        return self.status in FINISHED
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def summary(self, include_result=False):
+        """
+        The job's status as a JSON-ready dictionary.
+        :return: A dictionary.
+        """
+        best_fitness = None
+        for event in reversed(self.events):
+            if event.get("best_fitness") is not None:
+                best_fitness = event["best_fitness"]
+                break
+
+        summary = {"id": self.job_id, "status": self.status, "parameters": self.parameters, "created": self.created,
+            "started": self.started, "finished": self.finished, "events": len(self.events), "best_fitness": best_fitness}
+        if self.error is not None:
+            summary["error"] = self.error
+        if include_result:
+            summary["result"] = self.result
+
+        return summary
+
+
+# Datasets loaded by each worker process, see worker_dataset.
+_worker_datasets = {}
+
+
+def worker_dataset(paths):
+    """
+    The units, tutors, students + units and conflict index of a dataset, kept in the worker between jobs.
+    Reloaded if one of the CSV files has changed.
+    :return: (units, tutors, students + units, conflict index)
+    """
+    stamps = [et.source_stamp(path) for path in paths]
+    cached = _worker_datasets.get(paths)
+    if cached is not None and cached[0] == stamps:
+        return cached[1]
+
+    units, tutors, student_units = et.load_data(*paths)
+    dataset = units, tutors, student_units, et.build_conflict_index(student_units)
+    _worker_datasets[paths] = stamps, dataset
+
+    return dataset
+
+
+def warm_worker(paths):
+    """
+    Process pool task.
+    Loads a dataset ahead of the first job that needs it.
+    :return: None
+    """
+    worker_dataset(paths)
+
+
+def solution_record(solution, units, tutors, student_units, conflict_index):
+    """
+    Helper function.
+    A solution and its constraint results as a JSON-ready dictionary.
+    :return: A dictionary.
+    """
+    schedule = {}
+    for day, room_list in solution.schedule.items():
+        schedule[day] = [{"room": room.room_name,
+            "morning_unit": list(room.morning_unit), "morning_invigilator": room.morning_invigilator,
+            "afternoon_unit": list(room.afternoon_unit), "afternoon_invigilator": room.afternoon_invigilator} for room in room_list]
+
+    constraints = et.ScalarEvaluator(units, tutors, student_units, conflict_index).results(solution)
+
+    return {"fitness": solution.fitness, "satisfied": all(result["satisfied"] for result in constraints.values()),
+        "constraints": constraints, "schedule": schedule}
+
+
+def run_job(job_id, parameters, progress, cancel_event):
+    """
+    Process pool task.
+    Runs one job with the worker's copy of its dataset, sending progress events and then its result,
+    error, or cancellation as the last message.
+    :return: None
+    """
+    try:
+        if cancel_event.is_set():
+            raise JobCancelled(job_id)
+
+        units, tutors, student_units, conflict_index = worker_dataset((parameters["units"], parameters["tutors"], parameters["students"]))
+        random.seed(parameters["seed"])
+        telemetry = QueueTelemetry(job_id, progress, cancel_event)
+        population_size, max_generations = parameters["population_size"], parameters["max_generations"]
+        crossover_probability, mutation_probability = parameters["crossover_probability"], parameters["mutation_probability"]
+
+        if parameters["algorithm"] == "steady_state":
+            max_steps = max_generations * max(1, population_size // 2)
+            solution = et.steady_state_algorithm(population_size, max_steps, crossover_probability, mutation_probability, units, tutors,
+                student_units, conflict_index, evaluation=parameters["evaluation"], telemetry=telemetry)
+        elif parameters["algorithm"] == "vectorized":
+            solution = et.vectorized_algorithm(population_size, max_generations, crossover_probability, mutation_probability, units, tutors,
+                student_units, conflict_index, telemetry=telemetry, seeded_fraction=parameters["seeded_fraction"])
+        else:
+            solution = et.genetic_algorithm(population_size, max_generations, crossover_probability, mutation_probability, units, tutors,
+                student_units, conflict_index, evaluation=parameters["evaluation"], telemetry=telemetry,
+                seeded_fraction=parameters["seeded_fraction"], selection_method=parameters["selection_method"])
+
+    except JobCancelled:
+        progress.put((job_id, "cancelled", {}))
+    except Exception as error:
+        progress.put((job_id, "error", {"error": f"{type(error).__name__}: {error}"}))
+    else:
+        progress.put((job_id, "result", solution_record(solution, units, tutors, student_units, conflict_index)))
+
+
+def job_parameters(request):
+    """
+    Check a job's parameters and fill in the defaults.
+    :return: A dictionary of every parameter in JOB_DEFAULTS.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Job parameters must be a JSON object.")
+
+    unknown = set(request) - set(JOB_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+    parameters = {**JOB_DEFAULTS, **request}
+    for name in ("population_size", "max_generations"):
+        if not isinstance(parameters[name], int) or parameters[name] < 2:
+            raise ValueError(f"{name} must be an integer of at least 2.")
+    for name in ("crossover_probability", "mutation_probability", "seeded_fraction"):
+        if not isinstance(parameters[name], (int, float)) or not 0 <= parameters[name] <= 1:
+            raise ValueError(f"{name} must be a number from 0 to 1.")
+    if parameters["algorithm"] not in ALGORITHMS:
+        raise ValueError(f"algorithm must be one of {', '.join(ALGORITHMS)}.")
+    if parameters["evaluation"] not in EVALUATIONS:
+        raise ValueError(f"evaluation must be one of {', '.join(EVALUATIONS)}.")
+    if parameters["selection_method"] not in et.SELECTION_METHODS:
+        raise ValueError(f"selection_method must be one of {', '.join(et.SELECTION_METHODS)}.")
+    if parameters["seed"] is not None and not isinstance(parameters["seed"], int):
+        raise ValueError("seed must be an integer.")
+    for name in ("units", "tutors", "students"):
+        if not isinstance(parameters[name], str):
+            raise ValueError(f"{name} must be a file path.")
+
+    return parameters
+
+
+class SolverService:
+    """
+    A class used to run solve jobs on a process pool of at most `workers` at once, keeping the last `history` finished jobs.
+    Workers send progress through a manager queue, which a thread forwards to the event loop.
+    If a worker process dies the pool is broken, so it is replaced, and the jobs it held are marked failed.
+    Use it as an async context manager, or call start and close.
+    """
+    def __init__(self, workers=2, history=100, preload=(et.UNITS_FILE, et.TUTORS_FILE, et.STUDENT_UNITS_FILE)):
+        self.workers = workers
+        self.history = history
+        self.preload = preload
+        self.jobs = OrderedDict()
+        self.loop = None
+        self.manager = None
+        self.progress = None
+        self.executor = None
+        self.forwarder = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.manager = multiprocessing.Manager()
+        self.progress = self.manager.Queue()
+        self.forwarder = threading.Thread(target=self.forward_progress, daemon=True)
+        self.forwarder.start()
+        self.start_executor()
+
+    def start_executor(self):
+        """
+        Start a new process pool, and load the usual dataset in each worker before the first job arrives.
+        Workers come from a fork server where there is one, so they don't inherit the open client connections,
+        which would then never close.
+        :return: None
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=WORKER_CONTEXT)
+        if self.preload is not None:
+            for _ in range(self.workers):
+                self.executor.submit(warm_worker, tuple(self.preload))
+
+    def restart_executor(self, broken):
+        """
+        Replace a broken process pool, failing the unfinished jobs that were on it.
+        Does nothing if broken has already been replaced.
+        :return: None
+        """
+        if broken is not self.executor:
+            return
+
+        for job in self.jobs.values():
+            if job.executor is broken and not job.done():
+                job.error = "BrokenProcessPool: a worker process died."
+                self.finish(job, "failed")
+                job.notify()
+
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start_executor()
+
+    def close(self):
+        for job in self.jobs.values():
+            if not job.done():
+                job.cancel_event.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.progress.put(None)
+        self.forwarder.join()
+        self.manager.shutdown()
+
+    def forward_progress(self):
+        """
+        Thread target.
+        Passes each progress message from the workers to on_progress on the event loop, until a None message.
+        :return: None
+        """
+        while True:
+            try:
+                message = self.progress.get()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            self.loop.call_soon_threadsafe(self.on_progress, *message)
+
+    def submit(self, request):
+        """
+        Queue a job with the parameters in request, see job_parameters.
+        :return: Job object.
+        """
+        job = Job(uuid.uuid4().hex[:12], job_parameters(request))
+        job.cancel_event = self.manager.Event()
+
+        # A pool broken since the last job is replaced, and the job tried once more on the new pool.
+        for attempt in range(2):
+            try:
+                job.executor = self.executor
+                job.future = self.executor.submit(run_job, job.job_id, job.parameters, self.progress, job.cancel_event)
+                break
+            except BrokenProcessPool:
+                self.restart_executor(job.executor)
+        else:
+            raise ServiceUnavailable("The worker pool is broken and could not be restarted.")
+
+        job.future.add_done_callback(lambda future: self.loop.call_soon_threadsafe(self.on_done, job, future))
+        self.jobs[job.job_id] = job
+        self.prune()
+
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. A queued job is dropped at once, a running job stops at its next generation.
+        :return: The Job object, or None if there is no such job.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.done():
+            return job
+
+        if not job.future.cancel():
+            job.cancel_event.set()
+            job.status = "cancelling"
+            job.notify()
+
+        return job
+
+    def finish(self, job, status):
+        if not job.done():
+            job.status = status
+            job.finished = time.time()
+
+    def on_progress(self, job_id, event, record):
+        """
+        Record a progress message from a worker.
+        The result, error, or cancelled message is the last one a job sends.
+        :return: None
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+
+        if event == "start":
+            job.started = time.time()
+            if job.status == "queued":
+                job.status = "running"
+        elif event == "result":
+            job.result = record
+            self.finish(job, "done")
+        elif event == "error":
+            job.error = record["error"]
+            self.finish(job, "failed")
+        elif event == "cancelled":
+            self.finish(job, "cancelled")
+
+        job.events.append({"event": event, **record})
+        job.notify()
+
+    def on_done(self, job, future):
+        """
+        Finish jobs that won't send a last message - cancelled before they started, or lost with their worker.
+        A lost worker breaks the pool, which is replaced.
+        :return: None
+        """
+        if future.cancelled():
+            self.finish(job, "cancelled")
+        elif future.exception() is not None:
+            job.error = f"{type(future.exception()).__name__}: {future.exception()}"
+            self.finish(job, "failed")
+            if isinstance(future.exception(), BrokenProcessPool):
+                self.restart_executor(job.executor)
+        else:
+            return
+        job.notify()
+
+    def prune(self):
+        """
+        Drop the oldest finished jobs beyond the history limit.
+        :return: None
+        """
+        finished = [job_id for job_id, job in self.jobs.items() if job.done()]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    async def events(self, job):
+        """
+        A job's progress events, waiting for new ones until the job finishes.
+        :return: An async generator of event dictionaries.
+        """
+        sent = 0
+        while True:
+            changed = job.changed
+            while sent < len(job.events):
+                yield job.events[sent]
+                sent += 1
+            if job.done():
+                return
+            await changed.wait()
+
+
+async def read_request(reader):
+    """
+    Helper function.
+    Reads an HTTP request.
+    :return: (method, path, body bytes)
+    """
+    request_line = await reader.readline()
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+
+    return method.upper(), target.split("?", 1)[0].rstrip("/") or "/", body
+
+
+def write_head(writer, status, content_type, length=None):
+    """
+    Helper function.
+    Writes the status line and headers of a response. Without a length, the body runs until the connection closes.
+    :return: None
+    """
+    lines = [f"HTTP/1.1 {status} {HTTP_REASONS[status]}", f"Content-Type: {content_type}", "Connection: close"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+def write_json(writer, status, body):
+    """
+    Helper function.
+    Writes a JSON response.
+    :return: None
+    """
+    data = json.dumps(body, default=str).encode()
+    write_head(writer, status, "application/json", len(data))
+    writer.write(data)
+
+
+async def handle_connection(service, reader, writer):
+    """
+    Serve one HTTP request, see the module docstring for the routes.
+    :return: None
+    """
+    streaming = False
+    try:
+        try:
+            method, path, body = await read_request(reader)
+        except (ValueError, asyncio.IncompleteReadError):
+            write_json(writer, 400, {"error": "Malformed request."})
+            return
+
+        parts = path.strip("/").split("/")
+        job = service.jobs.get(parts[1]) if len(parts) > 1 and parts[0] == "jobs" else None
+
+        if parts == ["jobs"] and method == "GET":
+            write_json(writer, 200, [job.summary() for job in service.jobs.values()])
+        elif parts == ["jobs"] and method == "POST":
+            try:
+                job = service.submit(json.loads(body or b"{}"))
+            except ValueError as error:
+                write_json(writer, 400, {"error": str(error)})
+                return
+            except ServiceUnavailable as error:
+                write_json(writer, 503, {"error": str(error)})
+                return
+            write_json(writer, 202, job.summary())
+        elif parts[0] != "jobs" or len(parts) > 3 or (len(parts) == 3 and parts[2] != "events"):
+            write_json(writer, 404, {"error": "Not found."})
+        elif job is None:
+            write_json(writer, 404, {"error": f"No job {parts[1]}."})
+        elif len(parts) == 3 and method == "GET":
+            # Stream the events as JSON lines until the job finishes.
+            write_head(writer, 200, "application/x-ndjson")
+            streaming = True
+            async for event in service.events(job):
+                writer.write(json.dumps(event, default=str).encode() + b"\n")
+                await writer.drain()
+        elif len(parts) == 2 and method == "GET":
+            write_json(writer, 200, job.summary(include_result=True))
+        elif len(parts) == 2 and method == "DELETE":
+            write_json(writer, 200, service.cancel(job.job_id).summary())
+        else:
+            write_json(writer, 405, {"error": f"{method} is not allowed on {path}."})
+
+    except ConnectionError:
+        pass
+    except Exception as error:
+        # Answer rather than drop the connection, unless a stream has already started.
+        if not streaming:
+            write_json(writer, 500, {"error": f"{type(error).__name__}: {error}"})
+    finally:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(host="127.0.0.1", port=8765, socket_path=None, workers=2, history=100):
+    """
+    Run the service until it is interrupted, on a Unix socket if socket_path is set, otherwise on host and port.
+    :return: None
+    """
+    async with SolverService(workers, history) as service:
+        handler = lambda reader, writer: handle_connection(service, reader, writer)
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(handler, path=socket_path)
+            print(f"Solver service listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(handler, host, port)
+            print(f"Solver service listening on http://{host}:{port}")
+
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """
+    Main function.
+    Starts the solver service.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Run the exam timetable solver service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port.")
+    parser.add_argument("--workers", type=int, default=2, help="The most jobs to run at once.")
+    parser.add_argument("--history", type=int, default=100, help="The number of finished jobs to keep.")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket, args.workers, args.history))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
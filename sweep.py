@@ -0,0 +1,313 @@
+"""
+Parallel hyperparameter sweep for the exam timetable genetic algorithm.
+
+Runs a grid or random search over the population size, crossover and mutation probabilities with several seeds each,
+in parallel across cores. Successive halving races the configurations - every configuration runs a few generations,
+and only the best third go on to the next rung with three times the generations, up to max_generations.
+The survivors carry on from their checkpoints rather than starting again.
+Reports the time to a feasible solution (every hard constraint satisfied), the best fitness, and evaluations per second.
+
+    python sweep.py --seeds 3 --max-generations 50
+    python sweep.py --search random --samples 30 --instance 100,2000,60,20,10 --output sweep_results.json
+    python sweep.py --units term2/units.csv --tutors term2/tutors.csv --students term2/students.csv
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, inf
+
+import benchmark
+import exam_timetable as et
+
+
+# Values searched by default - every combination for grid search, and the range of each for random search.
+SEARCH_SPACE = {
+    "population_size": [50, 100, 200],
+    "crossover_probability": [0.6, 0.8, 1.0],
+    "mutation_probability": [0.1, 0.3, 0.5, 0.7],
+}
+HARD_CONSTRAINTS = et.CONSTRAINT_NAMES[:5]
+
+
+class SweepTelemetry(et.Telemetry):
+    """
+    A class used to record when a run first has a feasible solution - one satisfying every hard constraint - and its best fitness.
+    A resumed run carries on from the time it had already run for, and when it was feasible if it already was.
+    """
+    def __init__(self, elapsed=0.0, time_to_feasible=None):
+        super().__init__()
+        self.start = None
+        self.elapsed = elapsed
+        self.time_to_feasible = time_to_feasible
+        self.generations = 0
+        self.satisfied = False
+
+    def on_start(self, record):
+        self.start = time.perf_counter()
+        self.generations = record["start_generation"]
+
+    def on_generation(self, record):
+        self.generations = record["generation"]
+        if self.time_to_feasible is None and all(record["constraints"][name]["satisfied"] for name in HARD_CONSTRAINTS):
+            self.time_to_feasible = self.elapsed + time.perf_counter() - self.start
+
+    def on_finish(self, record):
+        self.satisfied = record["satisfied"]
+
+
+class CountingEvaluator:
+    """
+    A class used to count the solutions a fitness function scores.
+    """
+    def __init__(self, fitness_function):
+        self.fitness_function = fitness_function
+        self.evaluations = 0
+
+    def calculate_fitness(self, population):
+        self.evaluations += len(population)
+        return self.fitness_function(population)
+
+
+# Problem data held by each process pool worker, see init_sweep_worker.
+_worker_data = {}
+
+
+def init_sweep_worker(instance_parameters, evaluation, data_paths=(et.UNITS_FILE, et.TUTORS_FILE, et.STUDENT_UNITS_FILE)):
+    """
+    Process pool initializer.
+    Loads the data once per worker - the units, tutors and students CSV files at data_paths,
+    or a synthetic instance of the given size, see benchmark.generate_instance.
+    :return: None
+    """
+    if instance_parameters is None:
+        units, tutors, student_units = et.load_data(*data_paths)
+    else:
+        instance = benchmark.generate_instance(**instance_parameters, seed=0)
+        et.CLASSROOMS, et.EXAM_DAYS = instance.classrooms, instance.exam_days
+        units, tutors, student_units = instance.units, instance.tutors, instance.students
+
+    conflict_index = et.build_conflict_index(student_units)
+    _worker_data.update(units=units, tutors=tutors, student_units=student_units, conflict_index=conflict_index,
+        fitness_function=et.make_fitness_function(evaluation, units, tutors, student_units, conflict_index))
+
+
+def run_trial(configuration, seed, max_generations, checkpoint_path=None, previous=None):
+    """
+    Process pool task.
+    Runs the genetic algorithm with a configuration and seed up to max_generations.
+    If checkpoint_path is set the run is checkpointed there when it gets to max_generations.
+    Pass the previous trial of the configuration and seed to resume it from that checkpoint instead of starting again -
+    its time and evaluations are added to this trial's. A trial that already satisfied every constraint is returned as it is.
+    :return: A dictionary of the configuration, seed, and the run's results.
+    """
+    if previous is not None and previous["satisfied"]:
+        return previous
+
+    checkpointer = None if checkpoint_path is None else et.Checkpointer(checkpoint_path, every=max_generations)
+    evaluator = CountingEvaluator(_worker_data["fitness_function"])
+    data = _worker_data["units"], _worker_data["tutors"], _worker_data["student_units"], _worker_data["conflict_index"]
+
+    start = time.perf_counter()
+    if previous is None:
+        random.seed(seed)
+        telemetry = SweepTelemetry()
+        solution = et.genetic_algorithm(configuration["population_size"], max_generations, configuration["crossover_probability"],
+            configuration["mutation_probability"], *data, evaluation=evaluator, telemetry=telemetry, checkpointer=checkpointer)
+    else:
+        telemetry = SweepTelemetry(previous["time"], previous["time_to_feasible"])
+        solution = et.resume_genetic_algorithm(checkpoint_path, *data, evaluation=evaluator, telemetry=telemetry, checkpointer=checkpointer,
+            max_generations=max_generations)
+    elapsed = time.perf_counter() - start
+
+    evaluations = evaluator.evaluations
+    if previous is not None:
+        elapsed += previous["time"]
+        evaluations += previous["evaluations"]
+
+    return {"configuration": configuration, "seed": seed, "generations": telemetry.generations, "best_fitness": solution.fitness,
+        "feasible": telemetry.time_to_feasible is not None, "time_to_feasible": telemetry.time_to_feasible, "satisfied": telemetry.satisfied,
+        "time": elapsed, "evaluations": evaluations, "evaluations_per_second": evaluations / elapsed if elapsed else 0.0}
+
+
+def grid_configurations(space):
+    """
+    Every combination of the values in the search space.
+    :return: A list of configuration dictionaries.
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configurations(space, samples, rng):
+    """
+    Configurations drawn at random from the range of each parameter in the search space.
+    :return: A list of configuration dictionaries.
+    """
+    configurations = []
+    for _ in range(samples):
+        configuration = {}
+        for name, values in space.items():
+            low, high = min(values), max(values)
+            configuration[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else round(rng.uniform(low, high), 2)
+        configurations.append(configuration)
+
+    return configurations
+
+
+def summarize(configuration, trials):
+    """
+    Helper function.
+    Combines the trials of a configuration across its seeds.
+    Time to feasible is the mean over the seeds that found a feasible solution.
+    :return: A dictionary of the configuration's results.
+    """
+    fitness = [trial["best_fitness"] for trial in trials]
+    feasible_times = [trial["time_to_feasible"] for trial in trials if trial["feasible"]]
+
+    return {"configuration": configuration, "seeds": len(trials),
+        "best_fitness": max(fitness), "mean_fitness": sum(fitness) / len(fitness), "worst_fitness": min(fitness),
+        "feasible_rate": len(feasible_times) / len(trials),
+        "time_to_feasible": sum(feasible_times) / len(feasible_times) if feasible_times else None,
+        "time": sum(trial["time"] for trial in trials) / len(trials),
+        "evaluations_per_second": sum(trial["evaluations_per_second"] for trial in trials) / len(trials)}
+
+
+def rank_key(summary):
+    """
+    Helper function.
+    Orders configurations by how often they reach a feasible solution, then how quickly, then their mean fitness.
+    :return: A sort key, lowest first.
+    """
+    time_to_feasible = inf if summary["time_to_feasible"] is None else summary["time_to_feasible"]
+    return -summary["feasible_rate"], time_to_feasible, -summary["mean_fitness"]
+
+
+def successive_halving(configurations, seeds, executor, min_generations=5, max_generations=50, eta=3):
+    """
+    Race the configurations with successive halving.
+    Each rung runs every surviving configuration with every seed in parallel up to the rung's generations.
+    The best 1 / eta of them go on to the next rung with eta times the generations, up to max_generations,
+    resuming each run from its checkpoint in a temporary directory rather than starting it again.
+    A configuration whose best seed is below the leader's worst seed is dropped as clearly worse, even if it would otherwise survive.
+    :return: A list of rungs, each a dictionary of its generations and its configuration summaries, best first.
+    """
+    survivors = list(range(len(configurations)))
+    generations = min(min_generations, max_generations)
+    previous = {}
+    rungs = []
+
+    with tempfile.TemporaryDirectory(prefix="sweep_") as checkpoint_directory:
+        while survivors:
+            jobs = [(index, seed) for index in survivors for seed in seeds]
+            paths = [os.path.join(checkpoint_directory, f"{index}_{seed}.checkpoint") for index, seed in jobs]
+            trials = list(executor.map(run_trial, [configurations[index] for index, _ in jobs], [seed for _, seed in jobs],
+                itertools.repeat(generations), paths, [previous.get(job) for job in jobs]))
+            previous = dict(zip(jobs, trials))
+
+            summaries = [summarize(configurations[index], [previous[index, seed] for seed in seeds]) for index in survivors]
+            order = sorted(range(len(survivors)), key=lambda i: rank_key(summaries[i]))
+            summaries = [summaries[i] for i in order]
+            rungs.append({"generations": generations, "configurations": summaries})
+            print(f"Rung {len(rungs)}: {len(survivors)} configurations, {generations} generations, best {summaries[0]['configuration']}")
+
+            if generations >= max_generations or len(survivors) == 1:
+                break
+
+            leader = summaries[0]
+            kept = order[:ceil(len(order) / eta)]
+            survivors = [survivors[i] for i, summary in zip(kept, summaries) if summary["best_fitness"] >= leader["worst_fitness"]]
+            generations = min(generations * eta, max_generations)
+
+    return rungs
+
+
+def print_report(rungs):
+    """
+    Print the configurations of the last rung, best first.
+    :return: None
+    """
+    rung = rungs[-1]
+    print(f"\nResults after {rung['generations']} generations:")
+    print(f"{'Population':>10} {'Crossover':>9} {'Mutation':>8} {'Feasible':>8} {'To feasible (s)':>15} {'Best':>6} {'Mean':>6} {'Evals/s':>8}")
+    for summary in rung["configurations"]:
+        configuration = summary["configuration"]
+        time_to_feasible = "-" if summary["time_to_feasible"] is None else f"{summary['time_to_feasible']:.3f}"
+        print(f"{configuration['population_size']:>10} {configuration['crossover_probability']:>9} {configuration['mutation_probability']:>8} "
+            f"{summary['feasible_rate']:>8.0%} {time_to_feasible:>15} {summary['best_fitness']:>6.2f} {summary['mean_fitness']:>6.2f} "
+            f"{summary['evaluations_per_second']:>8.0f}")
+
+
+def parse_list(text, kind):
+    """
+    Helper function.
+    Parses a comma separated command line list.
+    :return: A list of values of kind.
+    """
+    return [kind(value) for value in text.split(",")]
+
+
+def main():
+    """
+    Main function.
+    Runs the sweep, prints the surviving configurations, and saves every rung if an output file is given.
+    :return: The exit status.
+    """
+    parser = argparse.ArgumentParser(description="Sweep the exam timetable genetic algorithm's parameters.")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=20, help="Configurations to draw for random search.")
+    parser.add_argument("--population-sizes", type=lambda text: parse_list(text, int), default=SEARCH_SPACE["population_size"])
+    parser.add_argument("--crossover", type=lambda text: parse_list(text, float), default=SEARCH_SPACE["crossover_probability"])
+    parser.add_argument("--mutation", type=lambda text: parse_list(text, float), default=SEARCH_SPACE["mutation_probability"])
+    parser.add_argument("--seeds", type=int, default=3, help="Runs of each configuration, with seeds 0 to seeds - 1.")
+    parser.add_argument("--min-generations", type=int, default=5, help="Generations of the first rung.")
+    parser.add_argument("--max-generations", type=int, default=50, help="Generations of the last rung.")
+    parser.add_argument("--eta", type=int, default=3, help="1 / eta of the configurations survive each rung.")
+    parser.add_argument("--evaluation", choices=["scalar", "delta", "batch"], default="scalar")
+    parser.add_argument("--units", default=et.UNITS_FILE, help="The units CSV file.")
+    parser.add_argument("--tutors", default=et.TUTORS_FILE, help="The tutors CSV file.")
+    parser.add_argument("--students", default=et.STUDENT_UNITS_FILE, help="The students + units CSV file.")
+    parser.add_argument("--instance", type=lambda text: parse_list(text, int),
+        help="Sweep a synthetic instance of units,students,tutors,rooms,days instead of the CSV files.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="Where to save every rung as JSON.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for drawing random search configurations.")
+    args = parser.parse_args()
+
+    space = {"population_size": args.population_sizes, "crossover_probability": args.crossover, "mutation_probability": args.mutation}
+    if args.search == "grid":
+        configurations = grid_configurations(space)
+    else:
+        configurations = random_configurations(space, args.samples, random.Random(args.seed))
+
+    data_paths = (args.units, args.tutors, args.students)
+    instance_parameters = None
+    if args.instance is not None:
+        instance_parameters = dict(zip(("num_units", "num_students", "num_tutors", "num_rooms", "num_days"), args.instance))
+    else:
+        # A worker that can't load its data only shows up as a broken process pool, so check first.
+        missing = [path for path in data_paths if not os.path.isfile(path)]
+        if missing:
+            print(f"No such file: {', '.join(missing)}")
+            return 1
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_sweep_worker, initargs=(instance_parameters, args.evaluation, data_paths)) as executor:
+        rungs = successive_halving(configurations, list(range(args.seeds)), executor, args.min_generations, args.max_generations, args.eta)
+
+    print_report(rungs)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"data": None if instance_parameters else data_paths, "instance": instance_parameters, "evaluation": args.evaluation, "seeds": args.seeds, "rungs": rungs}, output, indent=2)
+        print(f"Results saved to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Tests for checkpointing a genetic algorithm run and resuming it.
+
+    python -m pytest -q test_checkpoint.py
+"""
+import random
+
+import pytest
+
+import exam_timetable as et
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students and the conflict index.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students)
+
+
+@pytest.mark.parametrize("evaluation", ["scalar", "delta"])
+def test_resumed_run_matches_uninterrupted_run(data, tmp_path, evaluation):
+    units, tutors, students, conflict_index = data
+    checkpoint_path = str(tmp_path / "run.checkpoint")
+    telemetry = et.QuietTelemetry()
+
+    random.seed(1)
+    uninterrupted = et.genetic_algorithm(20, 6, 0.8, 0.3, units, tutors, students, conflict_index, evaluation=evaluation, telemetry=telemetry)
+
+    random.seed(1)
+    with et.Checkpointer(checkpoint_path, every=3) as checkpointer:
+        et.genetic_algorithm(20, 3, 0.8, 0.3, units, tutors, students, conflict_index, evaluation=evaluation, telemetry=telemetry,
+            checkpointer=checkpointer)
+    assert et.read_checkpoint(checkpoint_path)["generation"] == 3
+
+    random.seed(2)
+    resumed = et.resume_genetic_algorithm(checkpoint_path, units, tutors, students, conflict_index, evaluation=evaluation, telemetry=telemetry,
+        max_generations=6)
+
+    assert resumed.fitness == uninterrupted.fitness
+    assert et.schedule_key(resumed) == et.schedule_key(uninterrupted)
+
+
+def test_checkpoint_is_written_whole(tmp_path):
+    checkpoint_path = str(tmp_path / "run.checkpoint")
+    state = {"generation": 1, "population": []}
+
+    et.write_checkpoint(checkpoint_path, state)
+
+    assert et.read_checkpoint(checkpoint_path) == state
+    assert not (tmp_path / "run.checkpoint.tmp").exists()
+
+
+def test_missing_and_foreign_checkpoints(tmp_path):
+    assert et.read_checkpoint(str(tmp_path / "missing.checkpoint")) is None
+    with pytest.raises(FileNotFoundError):
+        et.resume_genetic_algorithm(str(tmp_path / "missing.checkpoint"), [], [], [])
+
+    foreign_path = tmp_path / "foreign.checkpoint"
+    foreign_path.write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        et.read_checkpoint(str(foreign_path))
+
+
+def test_resume_needs_the_same_operators(data, tmp_path):
+    units, tutors, students, conflict_index = data
+    checkpoint_path = str(tmp_path / "run.checkpoint")
+    repair = et.CrossoverRepair(units, tutors, students, conflict_index)
+
+    random.seed(3)
+    with et.Checkpointer(checkpoint_path, every=1) as checkpointer:
+        et.genetic_algorithm(10, 1, 0.8, 0.3, units, tutors, students, conflict_index, telemetry=et.QuietTelemetry(), checkpointer=checkpointer,
+            repair=repair)
+
+    with pytest.raises(ValueError, match="repair"):
+        et.resume_genetic_algorithm(checkpoint_path, units, tutors, students, conflict_index, max_generations=2)
+
+
+def test_checkpointer_needs_a_schedule(tmp_path):
+    with pytest.raises(ValueError):
+        et.Checkpointer(str(tmp_path / "run.checkpoint"))
+
+    checkpointer = et.Checkpointer(str(tmp_path / "run.checkpoint"), every=5)
+    assert [generation for generation in range(1, 16) if checkpointer.due(generation)] == [5, 10, 15]
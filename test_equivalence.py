@@ -0,0 +1,174 @@
+"""
+Equivalence tests for the fitness evaluators.
+
+The batch, delta and parallel evaluators must give the same scores as the scalar constraint functions,
+on random, crossed and mutated populations, and on schedules built to hit the edge cases -
+students with several units, a unit sitting twice in one timeslot, and empty schedules.
+
+    python -m pytest -q test_equivalence.py
+"""
+import csv
+import os
+import random
+
+import pytest
+
+import exam_timetable as et
+
+
+DATA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    """
+    The bundled units and tutors, with students enrolled in 1 to 4 units each so they can clash.
+    :return: units, tutors, students + units, and the conflict index.
+    """
+    rng = random.Random(0)
+    units, tutors, _ = et.load_data(os.path.join(DATA_DIRECTORY, et.UNITS_FILE), os.path.join(DATA_DIRECTORY, et.TUTORS_FILE),
+        os.path.join(DATA_DIRECTORY, et.STUDENT_UNITS_FILE))
+    codes = [unit[0] for unit in units]
+
+    students_path = tmp_path_factory.mktemp("data") / "students.csv"
+    with open(students_path, "w", newline="") as students_file:
+        writer = csv.writer(students_file)
+        writer.writerow(["ID", "Student Name", "Unitcode"])
+        for student in range(200):
+            for code in rng.sample(codes, rng.randint(1, 4)):
+                writer.writerow([student, f"Student{student + 1}", code])
+
+    units, tutors, student_units = et.load_data(os.path.join(DATA_DIRECTORY, et.UNITS_FILE), os.path.join(DATA_DIRECTORY, et.TUTORS_FILE),
+        str(students_path))
+    assert any(len(student.units) > 1 for student in student_units)
+
+    return units, tutors, student_units, et.build_conflict_index(student_units)
+
+
+def edge_case_solutions(units, tutors, population):
+    """
+    Helper function.
+    An empty schedule, a schedule with one empty day, and one with a unit twice in the same timeslot.
+    :return: A list of solutions.
+    """
+    empty = et.Solution()
+
+    one_empty_day = population[0].copy()
+    one_empty_day.schedule[et.EXAM_DAYS[0]] = ()
+    one_empty_day.invalidate()
+
+    # The same unit in the morning of two rooms on one day, and the same invigilator for both.
+    duplicate_in_slot = population[1].copy()
+    day = et.EXAM_DAYS[1]
+    unit = units[0]
+    duplicate_in_slot.schedule[day] = duplicate_in_slot.schedule[day] + (
+        et.ExamRoom(et.CLASSROOMS[0], unit, tutors[0], units[1], tutors[1]),
+        et.ExamRoom(et.CLASSROOMS[1], unit, tutors[0], units[2], tutors[2]))
+    duplicate_in_slot.invalidate()
+
+    return [empty, one_empty_day, duplicate_in_slot]
+
+
+@pytest.fixture(scope="module")
+def population(data):
+    """
+    Random solutions, their crossed and mutated children, and the edge cases.
+    :return: A list of solutions.
+    """
+    units, tutors, student_units, conflict_index = data
+    random.seed(1)
+
+    parents = et.generate_population(20, units, tutors, conflict_index)
+    crossed = et.apply_crossover(parents, 1.0)
+    mutated = [et.mutation(solution, 0.3, tutors) for solution in crossed]
+
+    return parents + crossed + mutated + edge_case_solutions(units, tutors, parents)
+
+
+def scalar_scores(data, solution):
+    """
+    Helper function.
+    The scalar constraint functions' scores for a solution.
+    :return: A (au, de, ec, tc, uc, ce, ei) score tuple.
+    """
+    units, tutors, student_units, conflict_index = data
+    results = et.ScalarEvaluator(units, tutors, student_units, conflict_index).results(solution)
+
+    return tuple(results[name]["score"] for name in et.CONSTRAINT_NAMES)
+
+
+def scalar_fitness(data, solution):
+    return sum(scalar_scores(data, solution))
+
+
+def test_batch_constraint_scores_match_scalar(data, population):
+    pytest.importorskip("numpy")
+    units, tutors, student_units, conflict_index = data
+    evaluator = et.BatchEvaluator(units, tutors, student_units, conflict_index)
+
+    for solution, scores in zip(population, evaluator.constraint_scores(population)):
+        assert scores == pytest.approx(scalar_scores(data, solution))
+
+
+def test_batch_empty_population(data):
+    pytest.importorskip("numpy")
+    units, tutors, student_units, conflict_index = data
+
+    assert et.BatchEvaluator(units, tutors, student_units, conflict_index).constraint_scores([]) == []
+
+
+def test_delta_matches_scalar(data, population):
+    units, tutors, student_units, conflict_index = data
+    evaluator = et.DeltaEvaluator(units, tutors, student_units, conflict_index)
+
+    for solution in population:
+        assert evaluator.evaluate(solution.copy()) == pytest.approx(scalar_fitness(data, solution))
+
+
+def test_delta_matches_scalar_after_moves(data, population):
+    """
+    The delta state is carried from parent to child, so chains of mutations and local search moves must stay exact.
+    """
+    units, tutors, student_units, conflict_index = data
+    evaluator = et.DeltaEvaluator(units, tutors, student_units, conflict_index)
+    local_search = et.LocalSearch(units, tutors, student_units, conflict_index)
+    random.seed(2)
+
+    for solution in population[:10] + population[-3:]:
+        solution = solution.copy()
+        evaluator.evaluate(solution)
+        for _ in range(5):
+            solution = et.mutation(solution, 0.3, tutors)
+            assert evaluator.evaluate(solution) == pytest.approx(scalar_fitness(data, solution))
+
+            move = local_search.random_move(solution)
+            if move is not None:
+                solution = local_search.apply_move(solution, move)
+                assert evaluator.evaluate(solution) == pytest.approx(scalar_fitness(data, solution))
+
+
+@pytest.mark.parametrize("evaluation", ["scalar", "batch"])
+def test_parallel_matches_scalar(data, population, evaluation):
+    if evaluation == "batch":
+        pytest.importorskip("numpy")
+    units, tutors, student_units, conflict_index = data
+
+    with et.ParallelEvaluator(units, tutors, student_units, workers=2, evaluation=evaluation) as evaluator:
+        scored = evaluator.calculate_fitness([solution.copy() for solution in population])
+
+    for solution, parallel in zip(population, scored):
+        assert parallel.fitness == pytest.approx(scalar_fitness(data, solution))
+
+
+def test_parallel_run_matches_serial_run(data):
+    units, tutors, student_units, conflict_index = data
+    telemetry = et.QuietTelemetry()
+
+    random.seed(3)
+    serial = et.genetic_algorithm(20, 5, 0.8, 0.3, units, tutors, student_units, conflict_index, telemetry=telemetry)
+    with et.ParallelEvaluator(units, tutors, student_units, workers=2) as evaluator:
+        random.seed(3)
+        parallel = et.genetic_algorithm(20, 5, 0.8, 0.3, units, tutors, student_units, conflict_index, evaluation=evaluator, telemetry=telemetry)
+
+    assert parallel.fitness == serial.fitness
+    assert et.schedule_key(parallel) == et.schedule_key(serial)
@@ -0,0 +1,118 @@
+"""
+Tests for loading the problem data - the CSV files, the binary snapshot, and the indexes built from them.
+
+    python -m pytest -q test_loading.py
+"""
+import csv
+import os
+
+import pytest
+
+import exam_timetable as et
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    return str(path)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    """
+    Small units, tutors and students files, with students on several rows.
+    :return: units, tutors and students paths.
+    """
+    units = write_csv(tmp_path / "units.csv", ["Unitcode", "Name"], [[f"U{i}", f"Unit {i}"] for i in range(6)])
+    tutors = write_csv(tmp_path / "tutors.csv", ["Tutor_Name"], [[f"Tutor{i}"] for i in range(3)])
+    students = write_csv(tmp_path / "students.csv", ["ID", "Student Name", "Unitcode"], [
+        [1, "Student1", "U0"], [1, "Student1", "U1"], [2, "Student2", "U1"], [2, "Student2", "U2"],
+        [3, "Student3", "U3"], [1, "Student1", "U2"], [4, "Student4", "U0"]])
+
+    return units, tutors, students
+
+
+def student_rows(student_units):
+    return [(student.student_id, student.name, student.units) for student in student_units]
+
+
+def test_snapshot_round_trip(paths, tmp_path):
+    snapshot_path = str(tmp_path / "data.snapshot")
+    parsed = et.load_data(*paths, snapshot_path=snapshot_path)
+    assert os.path.exists(snapshot_path)
+
+    mapped = et.load_data(*paths, snapshot_path=snapshot_path)
+    assert mapped[:2] == parsed[:2]
+    assert student_rows(mapped[2]) == student_rows(parsed[2])
+    assert isinstance(mapped[2].offsets, memoryview)
+
+
+def test_changed_csv_invalidates_snapshot(paths, tmp_path):
+    snapshot_path = str(tmp_path / "data.snapshot")
+    et.load_data(*paths, snapshot_path=snapshot_path)
+
+    with open(paths[2], "a", newline="") as students_file:
+        csv.writer(students_file).writerow([5, "Student5", "U5"])
+    _, _, student_units = et.load_data(*paths, snapshot_path=snapshot_path)
+
+    assert [student.student_id for student in student_units][-1] == "5"
+
+
+@pytest.mark.parametrize("length", [0, 5, 12, 30, -3])
+def test_truncated_snapshot_is_a_miss(paths, tmp_path, length):
+    snapshot_path = str(tmp_path / "data.snapshot")
+    parsed = et.load_data(*paths, snapshot_path=snapshot_path)
+    with open(snapshot_path, "rb") as snapshot:
+        contents = snapshot.read()
+    with open(snapshot_path, "wb") as snapshot:
+        snapshot.write(contents[:length])
+
+    loaded = et.load_data(*paths, snapshot_path=snapshot_path)
+
+    assert student_rows(loaded[2]) == student_rows(parsed[2])
+    with open(snapshot_path, "rb") as snapshot:
+        assert snapshot.read() == contents
+
+
+def test_table_conflict_index_matches_students(paths):
+    pytest.importorskip("numpy")
+    _, _, table = et.load_data(*paths)
+    from_table = et.build_conflict_index(table)
+    from_students = et.build_conflict_index(list(table))
+
+    assert from_table.unit_masks == from_students.unit_masks
+    assert from_table.conflicts == from_students.conflicts
+    assert from_table.unit_students == from_students.unit_students
+    assert from_table.student_bits == from_students.student_bits
+    assert et.hard_constraint_unit_count(table) == et.hard_constraint_unit_count(list(table))
+
+
+def test_students_on_several_rows_are_merged(paths):
+    _, _, student_units = et.load_data(*paths)
+
+    assert student_rows(student_units) == [("1", "Student1", {"U0", "U1", "U2"}), ("2", "Student2", {"U1", "U2"}),
+        ("3", "Student3", {"U3"}), ("4", "Student4", {"U0"})]
+
+
+@pytest.mark.parametrize("order", [[8, 9, 10, 11], [10, 9, 11, 8]])
+def test_student_order_is_kept(tmp_path, order):
+    rows = [[student, f"Student{student}", code] for student in order for code in ("U0", "U1")]
+    rows.append([order[0], f"Student{order[0]}", "U2"])
+    students_path = write_csv(tmp_path / "students.csv", ["ID", "Student Name", "Unitcode"], rows)
+
+    student_units = et.load_students(students_path)
+
+    assert [student.student_id for student in student_units] == [str(student) for student in order]
+    assert [len(student.units) for student in student_units] == [3, 2, 2, 2]
+
+
+def test_invalid_enrolments_warn(tmp_path):
+    rows = [[1, "Student1", f"U{i}"] for i in range(5)] + [[2, "Student2", "U0"]]
+    students_path = write_csv(tmp_path / "students.csv", ["ID", "Student Name", "Unitcode"], rows)
+
+    with pytest.warns(UserWarning, match="1 students"):
+        student_units = et.load_students(students_path)
+    assert et.hard_constraint_unit_count(student_units) == (2.5, False)
@@ -0,0 +1,94 @@
+"""
+Tests for the memetic local search stage.
+
+    python -m pytest -q test_local_search.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+import exam_timetable as et
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students and the conflict index.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students)
+
+
+def scheduled_units(solution):
+    return Counter(getattr(room, f"{session}_unit")[0] for room_list in solution.schedule.values()
+        for room in room_list for session in et.SESSIONS)
+
+
+def test_moves_keep_every_exam(data):
+    units, tutors, students, conflict_index = data
+    local_search = et.LocalSearch(units, tutors, students, conflict_index)
+    random.seed(1)
+    solution = et.generate_population(1, units, tutors, conflict_index)[0]
+
+    for _ in range(200):
+        move = local_search.random_move(solution)
+        if move is None:
+            continue
+        moved = local_search.apply_move(solution, move)
+        assert scheduled_units(moved) == scheduled_units(solution)
+
+        if move[0] == "room":
+            day, i, new_day, classroom = move[1]
+            assert classroom not in {room.room_name for room in solution.schedule[new_day]}
+            assert moved.schedule[new_day][-1].room_name == classroom
+            assert len(moved.schedule[day]) == len(solution.schedule[day]) - 1
+        solution = moved
+
+
+@pytest.mark.parametrize("method", ["hill", "tabu"])
+def test_improve_never_makes_a_solution_worse(data, method):
+    units, tutors, students, conflict_index = data
+    local_search = et.LocalSearch(units, tutors, students, conflict_index, budget=200, method=method)
+    scorer = et.ScalarEvaluator(units, tutors, students, conflict_index)
+    random.seed(2)
+
+    for solution in et.generate_population(5, units, tutors, conflict_index):
+        solution.fitness = scorer.evaluate(solution)
+        key = et.schedule_key(solution)
+
+        improved = local_search.improve(solution)
+
+        assert improved.fitness >= solution.fitness
+        assert improved.fitness == pytest.approx(scorer.evaluate(improved.copy()))
+        assert et.schedule_key(solution) == key
+
+
+def test_hill_climbing_improves_invigilation(data):
+    """
+    Only the equal invigilators constraint is left unsatisfied, the plateau the local search is for.
+    """
+    units, tutors, students, _ = data
+    conflict_index = et.build_conflict_index([])
+    local_search = et.LocalSearch(units, tutors, [], conflict_index, budget=500)
+    scorer = et.ScalarEvaluator(units, tutors, [], conflict_index)
+    random.seed(3)
+
+    solution = et.generate_population(1, units, [tutors[0]], conflict_index)[0]
+    solution.fitness = scorer.evaluate(solution)
+    improved = local_search.improve(solution)
+
+    assert improved.fitness > solution.fitness
+    assert local_search.improvements == 1
+
+
+def test_unknown_method(data):
+    units, tutors, students, conflict_index = data
+
+    with pytest.raises(ValueError):
+        et.LocalSearch(units, tutors, students, conflict_index, method="anneal")
@@ -0,0 +1,101 @@
+"""
+Tests for the occupancy index - its free queries, and that the operators keep it in sync with the schedule.
+
+    python -m pytest -q test_occupancy.py
+"""
+import random
+
+import pytest
+
+import exam_timetable as et
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students and the conflict index.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students)
+
+
+def assert_in_sync(solution):
+    occupancy = solution.occupancy
+    fresh = et.OccupancyIndex(solution, occupancy.conflict_index)
+
+    assert occupancy.rooms == fresh.rooms
+    assert occupancy.tutors == fresh.tutors
+    assert occupancy.students == fresh.students
+
+
+def test_free_queries(data):
+    units, tutors, students, conflict_index = data
+    random.seed(1)
+    solution = et.generate_population(1, units, tutors)[0]
+    occupancy = et.OccupancyIndex(solution, conflict_index)
+
+    for day in et.EXAM_DAYS:
+        used = {room.room_name for room in solution.schedule[day]}
+        assert set(occupancy.free_rooms(day)) == set(et.CLASSROOMS) - used
+        for session in et.SESSIONS:
+            slot = (day, session)
+            codes = {getattr(room, f"{session}_unit")[0] for room in solution.schedule[day]}
+            invigilators = {getattr(room, f"{session}_invigilator") for room in solution.schedule[day]}
+            assert all(occupancy.room_free(slot, classroom) == (classroom not in used) for classroom in et.CLASSROOMS)
+            assert all(occupancy.tutor_free(slot, tutor) == (tutor not in invigilators) for tutor in tutors)
+            assert all(occupancy.student_free(slot, student.student_id) == student.units.isdisjoint(codes) for student in students)
+
+
+def test_removing_a_clashing_room_keeps_the_other(data):
+    units, tutors, _, conflict_index = data
+    day, slot = et.EXAM_DAYS[0], (et.EXAM_DAYS[0], et.SESSIONS[0])
+    solution = et.Solution()
+    solution.schedule[day] = (et.ExamRoom(et.CLASSROOMS[0], units[0], tutors[0], units[1], tutors[1]),
+        et.ExamRoom(et.CLASSROOMS[0], units[0], tutors[0], units[2], tutors[2]))
+    occupancy = et.OccupancyIndex(solution, conflict_index)
+    assert occupancy.room_clashes(slot) == 1 and occupancy.tutor_clashes(slot) == 1
+
+    occupancy.remove_room(day, solution.schedule[day], 1)
+
+    assert not occupancy.room_free(slot, et.CLASSROOMS[0]) and not occupancy.tutor_free(slot, tutors[0])
+    assert occupancy.room_clashes(slot) == 0 and occupancy.tutor_clashes(slot) == 0 and occupancy.exam_clashes(slot) == 0
+
+
+def test_operators_keep_the_index_in_sync(data):
+    units, tutors, students, conflict_index = data
+    evaluator = et.DeltaEvaluator(units, tutors, students, conflict_index)
+    local_search = et.LocalSearch(units, tutors, students, conflict_index)
+    repair = et.CrossoverRepair(units, tutors, students, conflict_index)
+    random.seed(2)
+
+    population = evaluator.calculate_fitness(et.generate_population(10, units, tutors))
+    for _ in range(5):
+        children = [repair.repair(child) for child in et.apply_crossover(population, 0.8)]
+        population = []
+        for child in children:
+            child = et.mutation(child, 0.3, tutors)
+            move = local_search.random_move(child)
+            if move is not None:
+                child = local_search.apply_move(child, move)
+            assert_in_sync(child)
+            population.append(child)
+        evaluator.calculate_fitness(population)
+        for solution in population:
+            assert_in_sync(solution)
+
+
+def test_mutation_keeps_the_students_in_sync(data):
+    units, tutors, students, conflict_index = data
+    evaluator = et.DeltaEvaluator(units, tutors, students, conflict_index)
+    random.seed(3)
+
+    for solution in evaluator.calculate_fitness(et.generate_population(10, units, tutors)):
+        for _ in range(5):
+            solution = et.mutation(solution, 0.3, tutors)
+            assert solution.occupancy.conflict_index is conflict_index
+            assert_in_sync(solution)
@@ -0,0 +1,92 @@
+"""
+Tests for repairing the duplicate and missing units of crossover children.
+
+    python -m pytest -q test_repair.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+import exam_timetable as et
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students and the conflict index.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students)
+
+
+def scheduled_units(solution):
+    return Counter(getattr(room, f"{session}_unit")[0] for room_list in solution.schedule.values()
+        for room in room_list for session in et.SESSIONS)
+
+
+def test_repaired_children_sit_every_unit_once(data):
+    units, tutors, students, conflict_index = data
+    repair = et.CrossoverRepair(units, tutors, students, conflict_index)
+    random.seed(1)
+    parents = et.generate_population(20, units, tutors)
+
+    for _ in range(50):
+        for child in et.crossover(*random.sample(parents, 2)):
+            scheduled = scheduled_units(repair.repair(child))
+
+            assert set(scheduled) == {unit[0] for unit in units}
+            # Only an odd unit out, or an odd half-empty room, keeps a duplicate.
+            assert sum(scheduled.values()) - len(units) <= 2
+    assert repair.repaired > 0
+
+
+def test_complete_child_is_returned_as_it_is(data):
+    units, tutors, students, conflict_index = data
+    repair = et.CrossoverRepair(units, tutors, students, conflict_index)
+    random.seed(2)
+    solution = et.seeded_solution(units, tutors, conflict_index)
+
+    assert repair.repair(solution) is solution
+    assert (repair.children, repair.repaired) == (1, 0)
+
+
+def test_duplicate_is_kept_in_its_least_clashing_timeslot():
+    """
+    A sits on Monday morning, and again on Tuesday morning with B, which shares a student with it.
+    The Tuesday exam becomes a hole, and the missing unit F fills it.
+    """
+    units = [(code, f"Unit {code}") for code in "ABCDEF"]
+    tutors = ["Tutor0", "Tutor1"]
+    students = [et.StudentData("Student1", {"A", "B"}, "1")]
+    unit = dict(units)
+    monday, tuesday = et.EXAM_DAYS[0], et.EXAM_DAYS[1]
+    solution = et.Solution()
+    solution.schedule[monday] = (et.ExamRoom(et.CLASSROOMS[0], ("A", unit["A"]), tutors[0], ("C", unit["C"]), tutors[0]),)
+    solution.schedule[tuesday] = (et.ExamRoom(et.CLASSROOMS[0], ("B", unit["B"]), tutors[0], ("D", unit["D"]), tutors[0]),
+        et.ExamRoom(et.CLASSROOMS[1], ("A", unit["A"]), tutors[1], ("E", unit["E"]), tutors[1]))
+
+    repair = et.CrossoverRepair(units, tutors, students)
+    repaired = repair.repair(solution)
+
+    assert repaired.schedule[monday][0].morning_unit[0] == "A"
+    assert [room.morning_unit[0] for room in repaired.schedule[tuesday]] == ["B", "F"]
+    assert (repair.duplicates_removed, repair.missing_placed) == (1, 1)
+
+
+def test_units_no_longer_in_units_are_removed(data):
+    units, tutors, students, conflict_index = data
+    random.seed(4)
+    solution = et.seeded_solution(units, tutors, conflict_index)
+    remaining = units[:-3]
+
+    repaired = et.CrossoverRepair(remaining, tutors, students, conflict_index).repair(solution)
+
+    scheduled = scheduled_units(repaired)
+    assert set(scheduled) == {unit[0] for unit in remaining}
+    assert sum(scheduled.values()) - len(remaining) <= 1
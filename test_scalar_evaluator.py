@@ -0,0 +1,94 @@
+"""
+Tests for the tiered scalar evaluator, and the scoring it saves the genetic algorithm.
+
+    python -m pytest -q test_scalar_evaluator.py
+"""
+import random
+
+import pytest
+
+import exam_timetable as et
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students and the conflict index.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students)
+
+
+@pytest.fixture(scope="module")
+def population(data):
+    units, tutors, _, _ = data
+    random.seed(1)
+
+    return et.generate_population(30, units, tutors)
+
+
+def test_threshold_bounds_only_solutions_that_cant_beat_it(data, population):
+    units, tutors, students, conflict_index = data
+    evaluator = et.ScalarEvaluator(units, tutors, students, conflict_index)
+    exact = [evaluator.evaluate(solution) for solution in population]
+
+    for threshold in (sorted(exact)[len(exact) // 2], max(exact) + evaluator.EXAM_CLASH_MAX + evaluator.TWO_EXAMS_MAX):
+        for solution, fitness in zip(population, exact):
+            bounded = evaluator.evaluate(solution, threshold)
+            if bounded > threshold:
+                assert bounded == fitness
+            else:
+                assert fitness <= bounded <= threshold
+    assert evaluator.skipped > 0
+
+
+def test_check_matches_results(data, population):
+    units, tutors, students, conflict_index = data
+    evaluator = et.ScalarEvaluator(units, tutors, students, conflict_index)
+
+    for solution in population:
+        expected = all(result["satisfied"] for result in et.ScalarEvaluator(units, tutors, students, conflict_index).results(solution).values())
+        assert evaluator.check(solution) == expected
+
+
+def test_module_functions_reuse_their_evaluator(data, population):
+    units, tutors, students, conflict_index = data
+
+    evaluator = et.scalar_evaluator(units, tutors, students, conflict_index)
+    assert et.scalar_evaluator(units, tutors, students, conflict_index) is evaluator
+    assert et.scalar_evaluator(list(units), tutors, students, conflict_index) is not evaluator
+
+    scored = et.calculate_fitness([solution.copy() for solution in population], units, students, tutors, conflict_index)
+    assert [solution.fitness for solution in scored] == [evaluator.evaluate(solution) for solution in population]
+    assert et.constraints_check(population[0], units, students, tutors, conflict_index, verbose=False) == evaluator.check(population[0])
+
+
+class CountingEvaluator:
+    """
+    A class used to count the solutions scored.
+    """
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.scored = 0
+
+    def calculate_fitness(self, population):
+        self.scored += len(population)
+        return self.evaluator.calculate_fitness(population)
+
+
+def test_crossover_children_are_scored_once_mutated(data):
+    """
+    Each generation scores its population and its mutated children, and nothing in between.
+    """
+    units, tutors, students, conflict_index = data
+    evaluator = CountingEvaluator(et.ScalarEvaluator(units, tutors, students, conflict_index))
+    random.seed(2)
+
+    et.genetic_algorithm(20, 5, 0.8, 0.3, units, tutors, students, conflict_index, evaluation=evaluator, telemetry=et.QuietTelemetry())
+
+    assert evaluator.scored == 5 * 2 * 20
@@ -0,0 +1,44 @@
+"""
+Tests for the seeded solutions built from the student conflict graph.
+
+    python -m pytest -q test_seeding.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+import exam_timetable as et
+
+
+def problem(num_units, seed=0):
+    """
+    Helper function.
+    num_units units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors and the conflict index.
+    """
+    rng = random.Random(seed)
+    units = [(f"U{i}", f"Unit {i}") for i in range(num_units)]
+    tutors = [f"Tutor{i}" for i in range(30)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(300)]
+
+    return units, tutors, et.build_conflict_index(students)
+
+
+@pytest.mark.parametrize("num_units", [7, 26, 27, 99, 121])
+def test_seeded_solution_schedules_every_unit_without_room_clashes(num_units):
+    units, tutors, conflict_index = problem(num_units)
+    random.seed(num_units)
+
+    solution = et.seeded_solution(units, tutors, conflict_index)
+
+    scheduled = Counter(getattr(room, f"{session}_unit")[0] for room_list in solution.schedule.values()
+        for room in room_list for session in et.SESSIONS)
+    assert set(scheduled) == {unit[0] for unit in units}
+    # Only an odd unit out sits twice, paired with a duplicate.
+    assert sum(scheduled.values()) - len(units) <= 1
+
+    if num_units <= 2 * len(et.CLASSROOMS) * len(et.EXAM_DAYS):
+        for room_list in solution.schedule.values():
+            room_names = [room.room_name for room in room_list]
+            assert len(room_names) == len(set(room_names))
@@ -0,0 +1,73 @@
+"""
+Tests for the parent selection methods.
+
+    python -m pytest -q test_selection.py
+"""
+import random
+from collections import Counter
+from math import ceil, floor
+
+import pytest
+
+import exam_timetable as et
+
+
+def population_with(fitness):
+    return [et.Solution(value) for value in fitness]
+
+
+@pytest.mark.parametrize("method", ["roulette", "tournament", "sus"])
+def test_selection_keeps_the_two_fittest_first(method):
+    random.seed(1)
+    population = population_with([random.uniform(1, 50) for _ in range(21)])
+
+    parents = et.selection(population, method)
+
+    best = sorted(population, key=et.get_fitness, reverse=True)
+    assert parents[:2] == best[:2]
+    assert len(parents) == ceil(len(population) / 2)
+    assert all(parent in population for parent in parents)
+
+
+def test_selection_takes_a_function():
+    population = population_with(range(1, 11))
+
+    parents = et.selection(population, lambda population, k: population[:k])
+
+    assert parents == [population[9], population[8]] + population[:3]
+
+
+def test_sus_selects_each_solution_close_to_its_expected_count():
+    random.seed(2)
+    population = population_with([1, 2, 3, 4, 10, 20])
+    total = sum(solution.fitness for solution in population)
+    k = 40
+
+    for _ in range(20):
+        counts = Counter(et.sus_selection(population, k))
+        assert sum(counts.values()) == k
+        for solution in population:
+            expected = k * solution.fitness / total
+            assert floor(expected) <= counts[solution] <= ceil(expected)
+
+
+def test_sus_without_fitness_selects_at_random():
+    random.seed(3)
+    population = population_with([0, 0, 0])
+
+    assert len(et.sus_selection(population, 5)) == 5
+
+
+def test_roulette_never_selects_zero_fitness():
+    random.seed(4)
+    population = population_with([0, 5, 0, 5])
+
+    assert all(solution.fitness == 5 for solution in et.roulette_selection(population, 100))
+
+
+def test_tournament_pressure():
+    random.seed(5)
+    population = population_with(range(10))
+
+    assert all(solution.fitness == 9 for solution in et.tournament_selection(population, 20, tournament_size=200))
+    assert len(set(et.tournament_selection(population, 200, tournament_size=1))) > 5
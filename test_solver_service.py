@@ -0,0 +1,244 @@
+"""
+Tests for the solver service - job parameters, the worker task, and jobs run, streamed and cancelled through the service.
+
+    python -m pytest -q test_solver_service.py
+"""
+import asyncio
+import json
+import os
+import queue
+import threading
+
+import pytest
+
+import exam_timetable as et
+import solver_service as ss
+
+
+DATA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DATA_FILES = {"units": os.path.join(DATA_DIRECTORY, et.UNITS_FILE), "tutors": os.path.join(DATA_DIRECTORY, et.TUTORS_FILE),
+    "students": os.path.join(DATA_DIRECTORY, et.STUDENT_UNITS_FILE)}
+SMALL_JOB = {"population_size": 6, "max_generations": 3, "seed": 0, **DATA_FILES}
+LONG_JOB = {"population_size": 20, "max_generations": 100000, "seed": 0, **DATA_FILES}
+
+
+class CancellingQueue(queue.Queue):
+    """
+    A class used to cancel a job from its own progress, once its first generation is sent.
+    """
+    def __init__(self, cancel_event):
+        super().__init__()
+        self.cancel_event = cancel_event
+
+    def put(self, message, *args, **kwargs):
+        if message[1] == "generation":
+            self.cancel_event.set()
+        super().put(message, *args, **kwargs)
+
+
+def drain(progress):
+    messages = []
+    while not progress.empty():
+        messages.append(progress.get())
+
+    return messages
+
+
+def run_service(test, **options):
+    """
+    Helper function.
+    Runs test(service) on a started one-worker service, without preloading.
+    :return: The test's return value.
+    """
+    async def main():
+        async with ss.SolverService(workers=1, preload=None, **options) as service:
+            return await test(service)
+
+    return asyncio.run(asyncio.wait_for(main(), 120))
+
+
+async def wait_until_done(service, job):
+    return [event async for event in service.events(job)]
+
+
+def test_job_parameters_fill_defaults():
+    parameters = ss.job_parameters({"population_size": 10})
+
+    assert set(parameters) == set(ss.JOB_DEFAULTS)
+    assert parameters["population_size"] == 10
+    assert parameters["algorithm"] == ss.JOB_DEFAULTS["algorithm"]
+
+
+@pytest.mark.parametrize("request_body", [[], {"colour": "red"}, {"population_size": 1}, {"max_generations": 2.5},
+    {"mutation_probability": 1.5}, {"algorithm": "annealing"}, {"evaluation": "guess"}, {"selection_method": "lottery"},
+    {"seed": "zero"}, {"units": 3}])
+def test_job_parameters_reject_bad_requests(request_body):
+    with pytest.raises(ValueError):
+        ss.job_parameters(request_body)
+
+
+@pytest.mark.parametrize("algorithm", ss.ALGORITHMS)
+def test_run_job_sends_progress_then_result(algorithm):
+    if algorithm == "vectorized":
+        pytest.importorskip("numpy")
+    progress = queue.Queue()
+
+    ss.run_job("job", ss.job_parameters({**SMALL_JOB, "algorithm": algorithm}), progress, threading.Event())
+    messages = drain(progress)
+
+    assert {job_id for job_id, _, _ in messages} == {"job"}
+    assert messages[0][1] == "start"
+    assert [event for _, event, _ in messages].count("generation") >= 1
+    assert messages[-1][1] == "result"
+    result = messages[-1][2]
+    assert set(result["constraints"]) == set(et.CONSTRAINT_NAMES)
+    assert set(result["schedule"]) == set(et.EXAM_DAYS)
+    json.dumps(result)
+
+
+def test_run_job_is_repeatable_with_a_seed():
+    results = []
+    for _ in range(2):
+        progress = queue.Queue()
+        ss.run_job("job", ss.job_parameters(SMALL_JOB), progress, threading.Event())
+        results.append(drain(progress)[-1][2])
+
+    assert results[0] == results[1]
+
+
+def test_run_job_cancelled_before_start():
+    progress, cancel_event = queue.Queue(), threading.Event()
+    cancel_event.set()
+
+    ss.run_job("job", ss.job_parameters(SMALL_JOB), progress, cancel_event)
+
+    assert drain(progress) == [("job", "cancelled", {})]
+
+
+def test_run_job_cancelled_at_a_generation():
+    cancel_event = threading.Event()
+    progress = CancellingQueue(cancel_event)
+
+    ss.run_job("job", ss.job_parameters(LONG_JOB), progress, cancel_event)
+    events = [event for _, event, _ in drain(progress)]
+
+    assert events[:2] == ["start", "generation"]
+    assert events.count("generation") == 1
+    assert events[-1] == "cancelled"
+
+
+def test_run_job_reports_errors():
+    progress = queue.Queue()
+
+    ss.run_job("job", ss.job_parameters({**SMALL_JOB, "units": os.path.join(DATA_DIRECTORY, "missing.csv")}), progress, threading.Event())
+    messages = drain(progress)
+
+    assert messages[-1][1] == "error"
+    assert "FileNotFoundError" in messages[-1][2]["error"]
+
+
+def test_worker_dataset_is_kept_between_jobs():
+    paths = (DATA_FILES["units"], DATA_FILES["tutors"], DATA_FILES["students"])
+
+    assert ss.worker_dataset(paths) is ss.worker_dataset(paths)
+
+
+def test_service_runs_a_job():
+    async def test(service):
+        job = service.submit(SMALL_JOB)
+        events = await wait_until_done(service, job)
+        return job, events
+
+    job, events = run_service(test)
+
+    assert job.status == "done"
+    assert [event["event"] for event in events][0] == "start"
+    assert events[-1]["event"] == "result"
+    summary = job.summary(include_result=True)
+    assert summary["result"]["fitness"] == job.result["fitness"]
+    assert summary["best_fitness"] is not None
+    json.dumps(summary)
+
+
+def test_service_cancels_queued_and_running_jobs():
+    async def test(service):
+        running = service.submit(LONG_JOB)
+        queued = service.submit(SMALL_JOB)
+        while running.status != "running":
+            await running.changed.wait()
+
+        service.cancel(queued.job_id)
+        service.cancel(running.job_id)
+        await wait_until_done(service, queued)
+        await wait_until_done(service, running)
+        return running, queued
+
+    running, queued = run_service(test)
+
+    assert queued.status == "cancelled"
+    assert "start" not in [event["event"] for event in queued.events]
+    assert running.status == "cancelled"
+    assert running.events[-1]["event"] == "cancelled"
+
+
+def test_service_keeps_history_of_finished_jobs():
+    async def test(service):
+        jobs = []
+        for _ in range(3):
+            jobs.append(service.submit(SMALL_JOB))
+            await wait_until_done(service, jobs[-1])
+        service.prune()
+        return jobs, list(service.jobs)
+
+    jobs, kept = run_service(test, history=1)
+
+    assert kept == [jobs[-1].job_id]
+
+
+def test_service_rejects_bad_requests():
+    async def test(service):
+        with pytest.raises(ValueError):
+            service.submit({"algorithm": "annealing"})
+        return service.jobs
+
+    assert not run_service(test)
+
+
+def test_http_api():
+    async def request(port, method, path, body=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = json.dumps(body).encode() if body is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), content
+
+    async def test(service):
+        server = await asyncio.start_server(lambda reader, writer: ss.handle_connection(service, reader, writer), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            status, content = await request(port, "POST", "/jobs", SMALL_JOB)
+            job_id = json.loads(content)["id"]
+            _, stream = await request(port, "GET", f"/jobs/{job_id}/events")
+            responses = {
+                "submit": status,
+                "events": [json.loads(line)["event"] for line in stream.splitlines()],
+                "job": await request(port, "GET", f"/jobs/{job_id}"),
+                "list": await request(port, "GET", "/jobs"),
+                "bad": (await request(port, "POST", "/jobs", {"algorithm": "annealing"}))[0],
+                "missing": (await request(port, "GET", "/jobs/nothing"))[0],
+                "method": (await request(port, "PUT", f"/jobs/{job_id}"))[0],
+            }
+        return job_id, responses
+
+    job_id, responses = run_service(test)
+
+    assert responses["submit"] == 202
+    assert responses["events"][0] == "start" and responses["events"][-1] == "result"
+    status, content = responses["job"]
+    assert status == 200 and json.loads(content)["status"] == "done" and json.loads(content)["result"] is not None
+    status, content = responses["list"]
+    assert status == 200 and [job["id"] for job in json.loads(content)] == [job_id]
+    assert (responses["bad"], responses["missing"], responses["method"]) == (400, 404, 405)
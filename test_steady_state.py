@@ -0,0 +1,82 @@
+"""
+Tests for the steady state genetic algorithm.
+
+    python -m pytest -q test_steady_state.py
+"""
+import random
+
+import pytest
+
+import exam_timetable as et
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students and the conflict index.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students)
+
+
+class CountingEvaluator:
+    """
+    A class used to count the solutions scored, and to keep every solution it scored.
+    """
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.scored = []
+
+    def calculate_fitness(self, population):
+        self.scored.extend(population)
+        return self.evaluator.calculate_fitness(population)
+
+
+class RecordingTelemetry(et.Telemetry):
+    def __init__(self):
+        super().__init__()
+        self.finish = None
+
+    def on_finish(self, record):
+        self.finish = record
+
+
+def test_unchanged_children_are_not_rescored(data):
+    """
+    Without crossover or mutation every child is a parent, so only the first population is ever scored.
+    """
+    units, tutors, students, conflict_index = data
+    evaluator = CountingEvaluator(et.ScalarEvaluator(units, tutors, students, conflict_index))
+    random.seed(1)
+
+    et.steady_state_algorithm(10, 20, 0.0, 0.0, units, tutors, students, conflict_index, evaluation=evaluator, telemetry=et.QuietTelemetry())
+
+    assert len(evaluator.scored) == 10
+
+
+def test_population_holds_no_duplicate_solutions(data):
+    units, tutors, students, conflict_index = data
+    evaluator = CountingEvaluator(et.ScalarEvaluator(units, tutors, students, conflict_index))
+    random.seed(2)
+
+    best = et.steady_state_algorithm(10, 50, 0.8, 0.3, units, tutors, students, conflict_index, evaluation=evaluator, telemetry=et.QuietTelemetry())
+
+    assert len({id(solution) for solution in evaluator.scored}) == len(evaluator.scored)
+    assert best.fitness == max(solution.fitness for solution in evaluator.scored)
+
+
+def test_satisfied_first_population_stops_before_the_first_step(data, monkeypatch):
+    units, tutors, students, conflict_index = data
+    monkeypatch.setattr(et.ScalarEvaluator, "check", lambda self, solution: True)
+    telemetry = RecordingTelemetry()
+    random.seed(3)
+
+    et.steady_state_algorithm(10, 20, 0.8, 0.3, units, tutors, students, conflict_index, telemetry=telemetry)
+
+    assert telemetry.finish["steps"] == 0
+    assert telemetry.finish["satisfied"]
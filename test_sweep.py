@@ -0,0 +1,141 @@
+"""
+Tests for the hyperparameter sweep - the search spaces, resumed trials, and successive halving.
+
+    python -m pytest -q test_sweep.py
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import exam_timetable as et
+import sweep
+
+
+DATA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DATA_PATHS = (os.path.join(DATA_DIRECTORY, et.UNITS_FILE), os.path.join(DATA_DIRECTORY, et.TUTORS_FILE),
+    os.path.join(DATA_DIRECTORY, et.STUDENT_UNITS_FILE))
+SPACE = {"population_size": [6, 10], "crossover_probability": [0.6, 1.0], "mutation_probability": [0.1, 0.5, 0.9]}
+
+
+class SerialExecutor:
+    """
+    A class used to run the sweep's tasks in this process, in order.
+    """
+    def map(self, function, *iterables):
+        return map(function, *iterables)
+
+
+@pytest.fixture(autouse=True)
+def worker_data():
+    sweep.init_sweep_worker(None, "scalar", DATA_PATHS)
+
+
+@pytest.fixture
+def recorded_trials(monkeypatch):
+    """
+    Records the arguments of every trial the sweep runs.
+    :return: A list of (configuration, seed, max_generations, checkpoint_path, previous) tuples.
+    """
+    calls = []
+    run_trial = sweep.run_trial
+
+    def recording_trial(*arguments):
+        calls.append(arguments)
+        return run_trial(*arguments)
+
+    monkeypatch.setattr(sweep, "run_trial", recording_trial)
+
+    return calls
+
+
+def trial_results(trial):
+    return {name: trial[name] for name in ("configuration", "seed", "generations", "best_fitness", "satisfied")}
+
+
+def test_grid_configurations():
+    configurations = sweep.grid_configurations(SPACE)
+
+    assert len(configurations) == 2 * 2 * 3
+    assert len({tuple(configuration.items()) for configuration in configurations}) == len(configurations)
+    assert {"population_size": 10, "crossover_probability": 0.6, "mutation_probability": 0.9} in configurations
+
+
+def test_random_configurations_are_in_range():
+    configurations = sweep.random_configurations(SPACE, 50, random.Random(0))
+
+    assert len(configurations) == 50
+    for configuration in configurations:
+        assert isinstance(configuration["population_size"], int)
+        for name, values in SPACE.items():
+            assert min(values) <= configuration[name] <= max(values)
+    assert configurations == sweep.random_configurations(SPACE, 50, random.Random(0))
+
+
+def test_summarize_and_rank():
+    trials = [{"best_fitness": 3.0, "feasible": True, "time_to_feasible": 1.0, "time": 2.0, "evaluations_per_second": 10.0},
+        {"best_fitness": 1.0, "feasible": False, "time_to_feasible": None, "time": 4.0, "evaluations_per_second": 20.0}]
+    summary = sweep.summarize({}, trials)
+
+    assert (summary["best_fitness"], summary["mean_fitness"], summary["worst_fitness"]) == (3.0, 2.0, 1.0)
+    assert (summary["feasible_rate"], summary["time_to_feasible"], summary["time"]) == (0.5, 1.0, 3.0)
+
+    never_feasible = {**summary, "feasible_rate": 0.0, "time_to_feasible": None, "mean_fitness": 9.0}
+    slower = {**summary, "time_to_feasible": 5.0}
+    assert sorted([never_feasible, slower, summary], key=sweep.rank_key) == [summary, slower, never_feasible]
+
+
+def test_resumed_trial_matches_uninterrupted_trial(tmp_path):
+    configuration = {"population_size": 8, "crossover_probability": 0.8, "mutation_probability": 0.5}
+    uninterrupted = sweep.run_trial(configuration, 1, 9)
+
+    first = sweep.run_trial(configuration, 1, 3, str(tmp_path / "trial.checkpoint"))
+    resumed = sweep.run_trial(configuration, 1, 9, str(tmp_path / "trial.checkpoint"), first)
+
+    assert trial_results(resumed) == trial_results(uninterrupted)
+    assert resumed["evaluations"] == uninterrupted["evaluations"]
+    assert resumed["time"] >= first["time"]
+
+
+def test_satisfied_trial_is_not_run_again():
+    previous = {"satisfied": True, "generations": 3}
+
+    assert sweep.run_trial({}, 0, 9, None, previous) is previous
+
+
+def test_successive_halving_continues_survivors(recorded_trials):
+    configurations = sweep.grid_configurations(SPACE)
+    seeds = [0, 1]
+
+    rungs = sweep.successive_halving(configurations, seeds, SerialExecutor(), min_generations=2, max_generations=10, eta=3)
+
+    assert [rung["generations"] for rung in rungs] == [2, 6, 10][:len(rungs)]
+    assert len(rungs) > 1
+    assert len(rungs[0]["configurations"]) == len(configurations)
+    for rung, next_rung in zip(rungs, rungs[1:]):
+        survivors = [summary["configuration"] for summary in next_rung["configurations"]]
+        assert 0 < len(survivors) <= -(-len(rung["configurations"]) // 3)
+        assert all(survivor in [summary["configuration"] for summary in rung["configurations"]] for survivor in survivors)
+
+    # Every trial after the first rung carries on from its own previous trial and checkpoint.
+    first_rung = len(configurations) * len(seeds)
+    assert all(previous is None for *_, previous in recorded_trials[:first_rung])
+    for configuration, seed, generations, path, previous in recorded_trials[first_rung:]:
+        assert (previous["configuration"], previous["seed"]) == (configuration, seed)
+        assert previous["generations"] < generations or previous["satisfied"]
+        assert path.endswith(f"_{seed}.checkpoint")
+
+
+def test_successive_halving_on_a_process_pool():
+    configurations = sweep.grid_configurations(SPACE)[:4]
+
+    with ProcessPoolExecutor(max_workers=2, initializer=sweep.init_sweep_worker, initargs=(None, "scalar", DATA_PATHS)) as executor:
+        pooled = sweep.successive_halving(configurations, [0], executor, min_generations=2, max_generations=2)
+    serial = sweep.successive_halving(configurations, [0], SerialExecutor(), min_generations=2, max_generations=2)
+
+    def results(rungs):
+        return sorted((sorted(summary["configuration"].items()), summary["best_fitness"]) for summary in rungs[0]["configurations"])
+
+    assert len(pooled) == 1
+    assert results(pooled) == results(serial)
@@ -0,0 +1,117 @@
+"""
+Tests for the vectorized operators on an ArrayPopulation.
+
+    python -m pytest -q test_vectorized.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+import exam_timetable as et
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    26 units, a few tutors, and students enrolled in 1 to 3 units each.
+    :return: units, tutors, students, the conflict index and the encoding.
+    """
+    rng = random.Random(0)
+    units = [(f"U{i}", f"Unit {i}") for i in range(26)]
+    tutors = [f"Tutor{i}" for i in range(8)]
+    students = [et.StudentData(f"Student{i}", rng.sample([unit[0] for unit in units], rng.randint(1, 3)), str(i)) for i in range(200)]
+
+    return units, tutors, students, et.build_conflict_index(students), et.Encoding(units, tutors)
+
+
+@pytest.fixture
+def population(data):
+    units, tutors, _, conflict_index, encoding = data
+    random.seed(1)
+
+    return et.encode_population(et.generate_population(20, units, tutors), encoding)
+
+
+def unit_counts(exams):
+    """
+    Helper function.
+    How many times each unit id is sat by an individual.
+    :return: A Counter of unit id to exams.
+    """
+    occupied = exams[..., 0] >= 0
+    return Counter(exams[occupied][:, 0].tolist() + exams[occupied][:, 2].tolist())
+
+
+def test_array_fitness_matches_scalar(data, population):
+    units, tutors, students, conflict_index, encoding = data
+    evaluator = et.BatchEvaluator(units, tutors, students, conflict_index, encoding)
+    scalar = et.ScalarEvaluator(units, tutors, students, conflict_index)
+
+    evaluator.array_fitness(population)
+
+    for i in range(len(population)):
+        assert population.fitness[i] == pytest.approx(scalar.evaluate(et.decode_array_solution(population, i, encoding)))
+
+
+def test_array_selection_keeps_the_two_fittest_first(population):
+    population.fitness = np.arange(len(population), dtype=np.float64)
+
+    parents = et.array_selection(population, np.random.default_rng(2))
+
+    assert len(parents) == len(population) // 2
+    assert parents.fitness[:2].tolist() == [19, 18]
+
+
+def test_array_crossover_children_take_whole_days_from_their_parents(population):
+    children = et.array_crossover(population, 1.0, np.random.default_rng(3))
+
+    assert children.exams.shape == (2 * len(population), *population.exams.shape[1:])
+    parent_days = [{day.tobytes() for day in population.exams[:, d]} for d in range(population.exams.shape[1])]
+    for child in children.exams:
+        assert all(day.tobytes() in parent_days[d] for d, day in enumerate(child))
+
+
+def test_array_crossover_without_crossing_copies_parents(population):
+    children = et.array_crossover(population, 0.0, np.random.default_rng(4))
+    parents = {individual.tobytes() for individual in population.exams}
+
+    assert all(child.tobytes() in parents for child in children.exams)
+
+
+def test_array_mutation_keeps_every_exam(data, population):
+    _, tutors, _, _, _ = data
+    before = population.exams.copy()
+
+    et.array_mutation(population, 0.5, len(tutors), np.random.default_rng(5))
+
+    assert not np.array_equal(before, population.exams)
+    for old, new in zip(before, population.exams):
+        assert unit_counts(new) == unit_counts(old)
+    invigilators = population.exams[population.occupied()][:, [1, 3]]
+    assert invigilators.min() >= 0 and invigilators.max() < len(tutors)
+
+
+def test_array_mutation_without_mutating(data, population):
+    _, tutors, _, _, _ = data
+    before = population.exams.copy()
+
+    et.array_mutation(population, 0.0, len(tutors), np.random.default_rng(6))
+
+    assert np.array_equal(before, population.exams)
+
+
+def test_vectorized_algorithm_is_repeatable(data):
+    units, tutors, students, conflict_index, _ = data
+    scalar = et.ScalarEvaluator(units, tutors, students, conflict_index)
+
+    runs = []
+    for _ in range(2):
+        random.seed(7)
+        runs.append(et.vectorized_algorithm(20, 5, 0.8, 0.3, units, tutors, students, conflict_index, telemetry=et.QuietTelemetry()))
+
+    assert runs[0].fitness == runs[1].fitness
+    assert et.schedule_key(runs[0]) == et.schedule_key(runs[1])
+    assert runs[0].fitness == pytest.approx(scalar.evaluate(runs[0]))